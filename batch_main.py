@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import argparse
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import List, Tuple
+from core_logic import SeleniumApp, LOGIN_URL
+from startup import BackgroundStartup
+from driver_backend import DriverBackend, DockerBackend, make_backend
+from metrics import METRICS_FOLDER
+from utils import setup_logger
+from dotenv import load_dotenv
+
+logger = setup_logger()  # Setup logging
+load_dotenv()
+
+BATCH_LOG_FOLDER = os.path.join('logs', 'batch')
+# Host ports per docker job: its own container plus the containers of its crawl workers
+DOCKER_PORT_STRIDE = 20
+# Job keys passed through to SeleniumApp, with their defaults
+JOB_OPTIONS = {
+    'workers': 1, 'http_workers': 0, 'parse_workers': 0, 'output_format': 'csv', 'normalize': False,
+    'max_pages': None, 'listing_controls': True, 'incremental': True, 'resume': False, 'login_url': LOGIN_URL,
+    'archive': False,
+}
+
+
+def load_batch_config(filepath: str) -> Tuple[int, List[dict]]:
+    """
+    # Read a batch config: {"concurrency": N, "defaults": {...}, "accounts": [{...}, ...]}.
+    # Every account needs a username, a password (or password_env, the name of an env var holding it)
+    # and crawl_from (YYYY-MM-DD); crawl_to, name and the JOB_OPTIONS keys are optional, defaults apply to all.
+    # Returns (concurrency, jobs).
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    defaults = config.get('defaults', {})
+    jobs = []
+    for i, account in enumerate(config.get('accounts', [])):
+        job = {**defaults, **account, 'index': i}
+        job['name'] = job.get('name') or job.get('username')
+        if not job.get('username'):
+            raise ValueError(f"account #{i + 1} has no username")
+        if not job.get('password') and job.get('password_env'):
+            job['password'] = os.environ.get(job['password_env'])
+        if not job.get('password'):
+            raise ValueError(f"account {job['name']} has no password (or password_env is not set)")
+        try:
+            job['crawluntil_time'] = datetime.strptime(job['crawl_from'], "%Y-%m-%d")
+            # the window end day is included
+            job['crawlto_time'] = datetime.strptime(job['crawl_to'], "%Y-%m-%d") + timedelta(days=1) if job.get('crawl_to') else None
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"account {job['name']} needs crawl_from (and optionally crawl_to) as YYYY-MM-DD: {e}")
+        if job['crawlto_time'] is not None and job['crawlto_time'] <= job['crawluntil_time']:
+            raise ValueError(f"account {job['name']}: crawl_to must not be before crawl_from")
+        jobs.append(job)
+    names = [job['name'] for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("account names must be unique, they name the output folders")
+    return int(config.get('concurrency', 2)), jobs
+
+
+def job_backend(job: dict) -> DriverBackend:
+    backend = make_backend(job.get('backend'), job.get('grid_url'))
+    if backend.name == 'docker':
+        # Every job runs its own container, on its own ports
+        offset = DOCKER_PORT_STRIDE * (job['index'] + 1)
+        backend = DockerBackend(f"selenium-chrome-batch-{job['index']}", 4444 + offset, 7900 + offset)
+    return backend
+
+
+def run_job(job: dict) -> dict:
+    # One account in one pool process: its own browser session, output folder shipnotices/<name>/ and console log
+    start = time.time()
+    os.makedirs(BATCH_LOG_FOLDER, exist_ok=True)
+    log_filepath = os.path.join(BATCH_LOG_FOLDER, f"{job['name']}.log")
+    result = {'name': job['name'], 'username': job['username'], 'status': 'failed', 'rows': 0, 'output': None, 'log': log_filepath}
+    with open(log_filepath, 'a', encoding='utf-8') as log_file, redirect_stdout(log_file):
+        try:
+            startup = BackgroundStartup(lean_profile=job.get('lean_browser', False), backend=job_backend(job)).start()
+            options = {key: job.get(key, default) for key, default in JOB_OPTIONS.items()}
+            app = SeleniumApp(job['username'], job['password'], job['crawluntil_time'], crawlto_time=job['crawlto_time'],
+                              startup=startup, job_name=job['name'], interactive=False, **options)
+            app.run()
+            if app.sink:
+                result['rows'], result['output'] = app.sink.count, app.sink.filepath
+            result['status'] = 'ok' if app.completed else 'failed'
+        except Exception as e:
+            logger.error(f"batch job {job['name']} failed: {repr(e)}")
+            result['error'] = repr(e)
+    result['seconds'] = round(time.time() - start, 2)
+    return result
+
+
+def print_summary(results: List[dict], wall_seconds: float):
+    print(f"\n{'account':24s} {'status':8s} {'rows':>8s} {'duration':>10s}  output")
+    for r in sorted(results, key=lambda r: r['name']):
+        print(f"{r['name'][:24]:24s} {r['status']:8s} {r['rows']:>8d} {r['seconds']:>9.1f}s  {r['output'] or r['log']}")
+    failed = sum(r['status'] != 'ok' for r in results)
+    print(f"{len(results)} accounts, {sum(r['rows'] for r in results)} rows in {wall_seconds:.1f}s"
+          f" (sequential {sum(r['seconds'] for r in results):.1f}s), {failed} failed")
+
+
+def main(args):
+    try:
+        concurrency, jobs = load_batch_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f"Invalid batch config: {e}")
+        return 1
+    concurrency = max(1, args.concurrency or concurrency)
+    print(f"Crawling {len(jobs)} accounts, {concurrency} at a time. Console output of each job goes to {BATCH_LOG_FOLDER}/<account>.log")
+
+    start = time.time()
+    results = []
+    with ProcessPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(run_job, job): job for job in jobs}
+        try:
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:  # the job process died
+                    result = {'name': job['name'], 'username': job['username'], 'status': 'failed', 'rows': 0,
+                              'output': None, 'log': None, 'seconds': 0.0, 'error': repr(e)}
+                results.append(result)
+                print(f"{result['name']}: {result['status']}, {result['rows']} rows in {result['seconds']:.1f}s")
+        except KeyboardInterrupt:
+            print('\nBatch interrupted, waiting for the running jobs to stop...')
+            executor.shutdown(cancel_futures=True)
+    wall_seconds = time.time() - start
+    print_summary(results, wall_seconds)
+
+    os.makedirs(METRICS_FOLDER, exist_ok=True)
+    summary_filepath = os.path.join(METRICS_FOLDER, f"batch-{datetime.fromtimestamp(start).strftime('%Y%m%d-%H%M%S')}.json")
+    with open(summary_filepath, 'w', encoding='utf-8') as f:
+        json.dump({'wall_seconds': round(wall_seconds, 2), 'concurrency': concurrency, 'jobs': results}, f, indent=2)
+    print(f"Batch summary saved to {summary_filepath}")
+    return 0 if all(r['status'] == 'ok' for r in results) else 1
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Crawl several iExchangeWeb accounts concurrently from a batch config")
+    arg_parser.add_argument("config", help="JSON batch config, see batch.example.json")
+    arg_parser.add_argument("--concurrency", type=int, default=int(os.environ.get("IEXWEB_BATCH_CONCURRENCY", 0)), help="Accounts crawled at the same time (overrides the config's concurrency)")
+    sys.exit(main(arg_parser.parse_args()))
@@ -0,0 +1,58 @@
+import os
+import time
+import argparse
+from fake_iexweb import FakeMailbox, FakeIExWebServer, FAKE_PORT
+from driver_backend import BACKENDS, make_backend
+from startup import BackgroundStartup
+from metrics import Histogram
+
+
+def measure_backend(name: str, grid_url: str, base_url: str, n_commands: int, n_pages: int) -> dict:
+    # Startup (backend ready + WebDriver session), then the latency of single WebDriver commands and of page loads
+    start = time.perf_counter()
+    startup = BackgroundStartup(backend=make_backend(name, grid_url)).start()
+    try:
+        selhelp = startup.wait()
+        startup_seconds = time.perf_counter() - start
+        selhelp.login_iExWeb(f"{base_url}/ieweb/general/login", 'bench', 'bench')
+        command, page = Histogram(), Histogram()
+        for _ in range(n_commands):
+            t = time.perf_counter()
+            selhelp.driver.execute_script("return document.title;")
+            command.observe(time.perf_counter() - t)
+        for n in range(1, n_pages + 1):
+            t = time.perf_counter()
+            selhelp.driver.get(f"{base_url}/ieweb/mailbox/sent?page={n}")
+            selhelp.scan_sentmail_rows()
+            page.observe(time.perf_counter() - t)
+    finally:
+        startup.shutdown()
+    return {'startup': startup_seconds, 'command': command.summary(), 'page': page.summary()}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare startup time and WebDriver command latency of the driver backends against the fake iExchangeWeb server")
+    arg_parser.add_argument("--backends", nargs='+', default=['docker', 'local'], choices=BACKENDS)
+    arg_parser.add_argument("--grid-url", default=os.environ.get("IEXWEB_GRID_URL"), help="Hub URL for the grid backend")
+    arg_parser.add_argument("--commands", type=int, default=200, help="Single WebDriver commands timed per backend")
+    arg_parser.add_argument("--pages", type=int, default=20, help="Sent mail page loads timed per backend")
+    arg_parser.add_argument("--port", type=int, default=FAKE_PORT)
+    args = arg_parser.parse_args()
+
+    server = FakeIExWebServer(FakeMailbox(max(args.pages * 10, 200)), args.port).serve_in_background()
+    results = {}
+    try:
+        for name in args.backends:
+            # the container reaches this machine through host.docker.internal
+            host = 'host.docker.internal' if name == 'docker' else 'localhost'
+            results[name] = measure_backend(name, args.grid_url, f"http://{host}:{args.port}", args.commands, args.pages)
+    finally:
+        server.shutdown()
+
+    for name, r in results.items():
+        print(f"{name:7s} startup {r['startup']:.2f}s | command mean {r['command']['mean'] * 1000:.2f}ms "
+              f"p90 {r['command']['p90'] * 1000:.2f}ms | page load mean {r['page']['mean'] * 1000:.1f}ms p90 {r['page']['p90'] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import time
+import argparse
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from fake_iexweb import FakeMailbox, FakeIExWebServer, FAKE_PORT
+from sentmail_listing import SENTMAIL_TABLE_XPATH
+from startup import BackgroundStartup
+from driver_backend import BACKENDS, make_backend
+from metrics import Histogram
+
+
+def time_page_loads(selhelp, base_url: str, mailbox: FakeMailbox, n_pages: int) -> dict:
+    # Listing and item page loads, each timed from driver.get() until the data the crawler reads is there
+    listing, item = Histogram(), Histogram()
+    for page in range(1, n_pages + 1):
+        start = time.perf_counter()
+        selhelp.driver.get(f"{base_url}/ieweb/mailbox/sent?page={page}")
+        WebDriverWait(selhelp.driver, 60).until(EC.presence_of_element_located((By.XPATH, SENTMAIL_TABLE_XPATH + '//tr')))
+        listing.observe(time.perf_counter() - start)
+    for mail_id, _, _, asn in mailbox.mails:
+        if item.count >= n_pages:
+            break
+        if asn is None:
+            continue
+        start = time.perf_counter()
+        selhelp.driver.get(f"{base_url}/ieweb/mailbox/item?id={mail_id}")
+        selhelp.fetch_current_item_html()
+        item.observe(time.perf_counter() - start)
+    return {'listing': listing.summary(), 'item': item.summary()}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare page-load latency of the default and the lean browser profile against the fake iExchangeWeb server")
+    arg_parser.add_argument("--pages", type=int, default=20, help="Listing pages and item pages loaded per profile")
+    arg_parser.add_argument("--asset-delay", type=float, default=0.1, help="Seconds the fake server takes per stylesheet, font or image")
+    arg_parser.add_argument("--port", type=int, default=FAKE_PORT)
+    arg_parser.add_argument("--fake-host", help="Host name of this machine as seen by the browser, default host.docker.internal for the docker backend, else localhost")
+    arg_parser.add_argument("--backend", default=os.environ.get("IEXWEB_BACKEND"), choices=BACKENDS, help="Where Chrome runs (default docker)")
+    arg_parser.add_argument("--grid-url", default=os.environ.get("IEXWEB_GRID_URL"), help="Selenium Grid hub URL instead of the local Docker container")
+    args = arg_parser.parse_args()
+
+    mailbox = FakeMailbox(max(args.pages * 10, 200))
+    server = FakeIExWebServer(mailbox, args.port, asset_delay=args.asset_delay).serve_in_background()
+    fake_host = args.fake_host or ('host.docker.internal' if (args.backend or ('grid' if args.grid_url else 'docker')) == 'docker' else 'localhost')
+    base_url = f"http://{fake_host}:{args.port}"
+    results = {}
+    try:
+        for name, lean in (('default', False), ('lean', True)):
+            startup = BackgroundStartup(lean_profile=lean, backend=make_backend(args.backend, args.grid_url)).start()
+            try:
+                selhelp = startup.wait()
+                selhelp.login_iExWeb(f"{base_url}/ieweb/general/login", 'bench', 'bench')
+                results[name] = time_page_loads(selhelp, base_url, mailbox, args.pages)
+            finally:
+                startup.shutdown()
+    finally:
+        server.shutdown()
+
+    print(f"page loads with {args.asset_delay}s per asset, {args.pages} of each kind:")
+    for kind in ('listing', 'item'):
+        for name, result in results.items():
+            s = result[kind]
+            print(f"  {kind:8s} {name:8s} mean {s['mean']:.3f}s  p50 {s['p50']:.3f}s  p90 {s['p90']:.3f}s")
+        if len(results) == 2:
+            print(f"  {kind:8s} speedup  x{results['default'][kind]['mean'] / results['lean'][kind]['mean']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
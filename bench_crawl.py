@@ -0,0 +1,86 @@
+import os
+import time
+import resource
+import argparse
+import tempfile
+import tracemalloc
+from fake_iexweb import FakeMailbox, FakeIExWebServer, FAKE_PORT
+from startup import BackgroundStartup
+from driver_backend import BACKENDS, make_backend
+from row_sink import CsvRowSink
+from http_fetch import HttpFetcher
+from parse_pipeline import ParsePipeline
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark an end-to-end crawl against the local fake iExchangeWeb server")
+    arg_parser.add_argument("--mails", type=int, default=500, help="Sent mails in the synthetic mailbox")
+    arg_parser.add_argument("--port", type=int, default=FAKE_PORT)
+    arg_parser.add_argument("--fake-host", help="Host name of this machine as seen by the browser, default host.docker.internal for the docker backend, else localhost (with --http-workers it must resolve here too, e.g. the host's LAN IP)")
+    arg_parser.add_argument("--backend", default=os.environ.get("IEXWEB_BACKEND"), choices=BACKENDS, help="Where Chrome runs (default docker)")
+    arg_parser.add_argument("--grid-url", default=os.environ.get("IEXWEB_GRID_URL"), help="Selenium Grid hub URL instead of the local Docker container")
+    arg_parser.add_argument("--http-workers", type=int, default=0, help="Fetch listing and item pages over http with N workers")
+    arg_parser.add_argument("--parse-workers", type=int, default=0, help="Parse item documents in N worker processes")
+    arg_parser.add_argument("--no-listing-controls", action="store_true", help="Keep the site's default search and page size")
+    args = arg_parser.parse_args()
+
+    mailbox = FakeMailbox(args.mails)
+    server = FakeIExWebServer(mailbox, args.port).serve_in_background()
+    n_notices = len({asn for _, _, _, asn in mailbox.mails if asn})
+    print(f"{len(mailbox.mails)} synthetic mails, {n_notices} ship notices back to {mailbox.oldest}")
+
+    backend = make_backend(args.backend, args.grid_url)
+    fake_host = args.fake_host or ('host.docker.internal' if backend.name == 'docker' else 'localhost')
+    startup = BackgroundStartup(backend=backend).start()
+    fetcher = pipeline = None
+    try:
+        selhelp = startup.wait()
+        tracemalloc.start()
+        selhelp.login_iExWeb(f"http://{fake_host}:{args.port}/ieweb/general/login", 'bench', 'bench')
+        if args.http_workers:
+            fetcher = HttpFetcher(max_workers=args.http_workers)
+            fetcher.load_driver_session(selhelp.driver)
+
+        def crawl(pipeline=None):
+            # One crawl of the whole mailbox from the first sent mail page: rows, notices, WebDriver commands, seconds
+            selhelp.navigate_sentmail()
+            if not args.no_listing_controls:
+                selhelp.use_listing_controls()
+            notices_before, commands_before = startup.metrics.counters.get('notices', 0), startup.metrics.summary()['webdriver']['commands']
+            with tempfile.TemporaryDirectory() as tmpdir:
+                sink = CsvRowSink(os.path.join(tmpdir, 'bench.csv'))
+                start = time.perf_counter()
+                rows_written = selhelp.crawl_shipnotices_until(crawluntil_time=mailbox.oldest, sink=sink, fetcher=fetcher, pipeline=pipeline)
+                sink.close()
+                elapsed = time.perf_counter() - start
+            return (rows_written, startup.metrics.counters.get('notices', 0) - notices_before,
+                    startup.metrics.summary()['webdriver']['commands'] - commands_before, elapsed)
+
+        sequential = None
+        if args.parse_workers:
+            # baseline of the measured speedup: the same crawl parsing on the driver thread
+            # (it runs first, so the pipelined crawl gets a warm browser)
+            sequential = crawl()
+            pipeline = ParsePipeline(processes=args.parse_workers)
+        rows_written, notices, commands, elapsed = crawl(pipeline)
+    finally:
+        if pipeline:
+            pipeline.close()
+        startup.shutdown()
+        server.shutdown()
+
+    _, peak_traced = tracemalloc.get_traced_memory()
+    if sequential:
+        sequential_rows, sequential_notices, _, sequential_elapsed = sequential
+        print(f"sequential crawl: {sequential_notices} notices, {sequential_rows} rows in {sequential_elapsed:.2f}s "
+              f"({sequential_notices / sequential_elapsed:.2f} notices/s)")
+    print(f"crawl: {notices} notices, {rows_written} rows in {elapsed:.2f}s ({notices / elapsed:.2f} notices/s)")
+    if sequential:
+        print(f"measured speedup with {args.parse_workers} parse workers: x{sequential_elapsed / elapsed:.2f}")
+    print(f"WebDriver round-trips: {commands} ({commands / max(notices, 1):.1f} per notice)")
+    # ru_maxrss is in KB on Linux
+    print(f"peak memory: {peak_traced / 2**20:.1f} MB traced python allocations, {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB max RSS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from normalize import normalize_shipnotices
+from utils import parse_creation_date
+
+
+def make_synthetic_rows(n_rows: int, seed: int=0) -> pd.DataFrame:
+    # Raw scraped rows as strings, with ~1% duplicate ASNs (resent notices) and ~0.1% broken rows
+    rng = np.random.default_rng(seed)
+    n_notices = max(n_rows // 3, 1)
+    notice = rng.integers(0, n_notices, n_rows)
+    minutes = rng.integers(0, 60 * 24 * 365, n_notices)[notice]  # one creation time per notice
+    resent = rng.random(n_rows) < 0.01
+    minutes[resent] += 60 * 24
+    created = pd.Timestamp('2024-01-01') + pd.to_timedelta(minutes, unit='m')
+    df = pd.DataFrame({
+        'ship_to': np.char.add('SHIP TO ', (notice % 50).astype(str)),
+        'ship_notice_num': np.char.add('ASN', notice.astype(str)),
+        'create_datetime': created.strftime('%-m/%-d/%y %-I:%M %p'),
+        'order_num': (100000 + notice % 900000).astype(str),
+        'buyer_part_num': np.char.add('BP-', rng.integers(0, 5000, n_rows).astype(str)),
+        'ship_quantity': rng.integers(1, 5000, n_rows).astype(str),
+    })
+    broken = rng.random(n_rows) < 0.001
+    df.loc[broken, 'ship_quantity'] = 'n/a'
+    return df
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the post-crawl normalization stage")
+    arg_parser.add_argument("--rows", type=int, default=1_000_000)
+    arg_parser.add_argument("--baseline-rows", type=int, default=50_000, help="Rows timed with the per-value utils.parse_creation_date")
+    args = arg_parser.parse_args()
+
+    df = make_synthetic_rows(args.rows)
+    print(f"{len(df)} synthetic rows")
+
+    start = time.perf_counter()
+    clean, rejects = normalize_shipnotices(df)
+    elapsed = time.perf_counter() - start
+    print(f"normalize_shipnotices: {elapsed:.2f}s ({len(df)/elapsed:,.0f} rows/s), {len(clean)} clean, {len(rejects)} rejected")
+
+    sample = df['create_datetime'].head(args.baseline_rows).tolist()
+    start = time.perf_counter()
+    for value in sample:
+        parse_creation_date(value)
+    elapsed = time.perf_counter() - start
+    print(f"parse_creation_date per value: {len(sample)/elapsed:,.0f} rows/s (create_datetime only)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import json
+import time
+import argparse
+import threading
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from selenium_helper import SeleniumHelper
+from driver_backend import is_selenium_server_up
+from utils import setup_logger
+
+logger = setup_logger()
+
+SELENIUM_EXECUTOR = 'http://localhost:4444/wd/hub'
+SELENIUM_STATUS_URL = 'http://localhost:4444/status'
+
+
+class BrowserDaemon:
+    """
+    # Keeps the selenium docker container and one WebDriver session alive between runs.
+    # Runs lease the session over a small local http api; the daemon shuts everything down after idle_timeout.
+    # A lease must be renewed (daemon_client does it every 30s) or it expires after lease_timeout,
+    # so a run that crashed without releasing does not hold the session forever.
+    """
+    def __init__(self, idle_timeout=1800, lease_timeout=120, lean_profile=False):
+        self.idle_timeout = idle_timeout
+        self.lease_timeout = lease_timeout
+        self.helper = SeleniumHelper(script_start_time=time.time(), lean_profile=lean_profile)
+        self.lock = threading.Lock()
+        self.last_used = time.time()
+        self.leased_at = None
+        self.homeurl = None
+        self.username = None
+        self.server = None
+
+    def boot(self):
+        # Reuse a container that is already up, otherwise start it
+        if not is_selenium_server_up(SELENIUM_STATUS_URL):
+            self.helper.setup_selenium_env()
+        self.helper.init_webdriver(timeout=60, command_executor=SELENIUM_EXECUTOR)
+        print(f"Browser daemon session {self.helper.driver.session_id} is ready.")
+
+    def is_healthy(self):
+        try:
+            self.helper.driver.current_url
+            return True
+        except Exception as e:
+            logger.error(f"browser daemon session is unhealthy: {e}")
+            return False
+
+    def ensure_session(self):
+        # Health check; replace the WebDriver session if Chrome died
+        if self.helper.driver is not None and self.is_healthy():
+            return
+        try:
+            if self.helper.driver is not None:
+                self.helper.driver.quit()
+        except Exception:
+            pass
+        self.homeurl = self.username = None
+        self.boot()
+
+    def session_info(self):
+        return {
+            'executor': SELENIUM_EXECUTOR,
+            'session_id': self.helper.driver.session_id,
+            'homeurl': self.homeurl,
+            'username': self.username,
+            'idle_timeout': self.idle_timeout,
+        }
+
+    def lease_expired(self) -> bool:
+        # Called with the lock held. Drops a lease that was not renewed in time.
+        if self.leased_at is not None and time.time() - self.leased_at >= self.lease_timeout:
+            logger.error(f"browser daemon lease expired after {self.lease_timeout}s without renewal, the run is gone")
+            self.last_used = self.leased_at
+            self.leased_at = None
+        return self.leased_at is None
+
+    def attach(self):
+        with self.lock:
+            if not self.lease_expired():
+                return 409, {'error': 'session is in use by another run'}
+            self.ensure_session()
+            self.leased_at = self.last_used = time.time()
+            return 200, self.session_info()
+
+    def renew(self):
+        with self.lock:
+            if self.leased_at is None:
+                return 409, {'error': 'no lease to renew'}
+            self.leased_at = self.last_used = time.time()
+            return 200, {'renewed': True}
+
+    def release(self, payload):
+        with self.lock:
+            self.leased_at = None
+            self.last_used = time.time()
+            if payload.get('homeurl'):
+                self.homeurl = payload['homeurl']
+                self.username = payload.get('username')
+            return 200, {'released': True}
+
+    def health(self):
+        with self.lock:
+            healthy = self.is_healthy()
+            info = self.session_info() if healthy else {}
+            return (200 if healthy else 503), {'healthy': healthy, 'leased': self.leased_at is not None,
+                                               'idle_seconds': round(time.time() - self.last_used, 1), **info}
+
+    def watch_idle(self):
+        while True:
+            time.sleep(10)
+            with self.lock:
+                idle = self.lease_expired() and time.time() - self.last_used > self.idle_timeout
+            if idle:
+                print(f"Browser daemon idle for {self.idle_timeout}s, shutting down.")
+                self.shutdown()
+                return
+
+    def shutdown(self):
+        with self.lock:
+            try:
+                if self.helper.driver:
+                    self.helper.driver.quit()
+                self.helper.backend.stop()
+            except Exception as e:
+                logger.error(f"Error occurred while stopping browser daemon: {e}")
+        if self.server:
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def serve(self, port):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _payload(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+            def do_GET(self):
+                if self.path == '/health':
+                    self._reply(*daemon.health())
+                else:
+                    self._reply(404, {'error': 'not found'})
+
+            def do_POST(self):
+                if self.path == '/attach':
+                    self._reply(*daemon.attach())
+                elif self.path == '/renew':
+                    self._reply(*daemon.renew())
+                elif self.path == '/release':
+                    self._reply(*daemon.release(self._payload()))
+                elif self.path == '/shutdown':
+                    self._reply(200, {'shutdown': True})
+                    daemon.shutdown()
+                else:
+                    self._reply(404, {'error': 'not found'})
+
+            def log_message(self, format, *args):
+                logger.info(f"browser daemon: {format % args}")
+
+        self.boot()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=self.watch_idle, daemon=True).start()
+        print(f"Browser daemon listening on http://localhost:{port} (idle timeout {self.idle_timeout}s). Hit Ctrl-C to stop.")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            self.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep a warm Selenium container and WebDriver session between crawler runs.")
+    parser.add_argument('action', choices=['start', 'stop', 'status'], help="Action to perform on the browser daemon.")
+    parser.add_argument('--port', type=int, default=4455, help="Local port of the daemon api.")
+    parser.add_argument('--idle-timeout', type=int, default=1800, help="Seconds without a run before the daemon stops the browser and container.")
+    parser.add_argument('--lean-browser', action='store_true', help="Start the session with the lean browser profile (see browser_profile.py).")
+    args = parser.parse_args()
+
+    daemon_url = f"http://localhost:{args.port}"
+    if args.action == 'start':
+        BrowserDaemon(idle_timeout=args.idle_timeout, lean_profile=args.lean_browser).serve(args.port)
+    elif args.action == 'stop':
+        requests.post(f"{daemon_url}/shutdown", timeout=30)
+        print('Browser daemon stopped.')
+    else:
+        try:
+            print(requests.get(f"{daemon_url}/health", timeout=5).json())
+        except requests.exceptions.RequestException:
+            print('Browser daemon is not running.')
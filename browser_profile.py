@@ -0,0 +1,64 @@
+from typing import Iterable, List
+from selenium import webdriver
+from utils import setup_logger
+
+logger = setup_logger()
+
+# Only the page text is scraped, these assets are never needed
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'gif', 'svg', 'webp', 'ico', 'bmp')
+FONT_EXTENSIONS = ('woff', 'woff2', 'ttf', 'otf', 'eot')
+STYLESHEET_EXTENSIONS = ('css',)
+# Chrome services that make network requests or use CPU in the background of a scraping session
+DISABLED_FEATURES = ('SidePanelPinning', 'Translate', 'OptimizationHints', 'MediaRouter', 'InterestFeedContentSuggestions',
+                     'CalculateNativeWinOcclusion', 'AutofillServerCommunication')
+LEAN_ARGUMENTS = (
+    '--headless=new', '--disable-gpu', '--disable-extensions', '--disable-background-networking',
+    '--disable-component-update', '--disable-default-apps', '--disable-sync', '--disable-client-side-phishing-detection',
+    '--disable-domain-reliability', '--disable-breakpad', '--no-first-run', '--no-default-browser-check',
+    '--metrics-recording-only', '--mute-audio', '--blink-settings=imagesEnabled=false',
+)
+# Block list for Chrome's content settings (2 = block)
+LEAN_PREFS = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.default_content_setting_values.notifications': 2,
+}
+
+
+def chrome_options(lean: bool=False) -> webdriver.ChromeOptions:
+    """
+    # ChromeOptions of a crawl session. The lean profile runs headless, returns from driver.get() at DOMContentLoaded
+    # (the crawler waits for the elements it needs anyway) and turns off images and the background services.
+    # Fonts and stylesheets are blocked per session with block_url_patterns(), there is no switch for them.
+    """
+    options = webdriver.ChromeOptions()
+    options.add_argument("--incognito")
+    if not lean:
+        options.add_argument("--disable-features=SidePanelPinning")
+        return options
+    options.add_argument(f"--disable-features={','.join(DISABLED_FEATURES)}")
+    for argument in LEAN_ARGUMENTS:
+        options.add_argument(argument)
+    options.add_experimental_option('prefs', LEAN_PREFS)
+    options.page_load_strategy = 'eager'
+    return options
+
+
+def url_patterns(extensions: Iterable[str]) -> List[str]:
+    # Network.setBlockedURLs wildcards, with and without a query string
+    return [pattern for ext in extensions for pattern in (f"*.{ext}", f"*.{ext}?*")]
+
+
+def block_url_patterns(driver, patterns: List[str]) -> bool:
+    """
+    # Block requests matching the patterns for the rest of the session, through the Chrome DevTools protocol.
+    # The Remote driver has no CDP command, chromedriver's endpoint is reached through the Selenium server.
+    # Returns False (and leaves the session as it is) if the server does not pass CDP commands through.
+    """
+    driver.command_executor.add_command('executeCdpCommand', 'POST', '/session/$sessionId/goog/cdp/execute')
+    try:
+        driver.execute('executeCdpCommand', {'cmd': 'Network.enable', 'params': {}})
+        driver.execute('executeCdpCommand', {'cmd': 'Network.setBlockedURLs', 'params': {'urls': patterns}})
+        return True
+    except Exception as e:
+        logger.warning(f"could not block asset requests over CDP: {repr(e)}")
+        return False
@@ -0,0 +1,87 @@
+import os
+import json
+import time
+import hashlib
+from datetime import datetime
+from typing import List, Optional
+from shipnotice_parser import ShipNoticeRow
+from state_store import listing_key
+from utils import setup_logger
+
+logger = setup_logger()
+
+CHECKPOINT_FOLDER = '.checkpoints'
+
+
+class CrawlCheckpoint:
+    """
+    # Append-only JSON lines journal of a running crawl: the output file, every ship notice extracted
+    # (page, row, listing key and its rows) and every page whose rows reached the output file.
+    # A resumed crawl skips the notices already written and reuses the extracted ones instead of reopening them.
+    """
+    def __init__(self, username: str, crawluntil: datetime, crawlto: Optional[datetime]=None):
+        window = f"{crawluntil.isoformat()}|{crawlto.isoformat()}" if crawlto else crawluntil.isoformat()
+        key = hashlib.sha256(f"{username}|{window}".encode('utf-8')).hexdigest()[:16]
+        folderpath = os.path.join(os.getcwd(), CHECKPOINT_FOLDER)
+        os.makedirs(folderpath, exist_ok=True)
+        self.filepath = os.path.join(folderpath, f"{crawluntil.strftime('%Y%m%d')}-{key}.jsonl")
+        self.output_filepath = None
+        self.notices = {}  # listing key -> rows of that notice
+        self.written_keys = set()  # listing keys whose rows are in the output file
+        self.last_page = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.filepath)
+
+    def load(self):
+        # Replay the journal of an interrupted crawl
+        with open(self.filepath, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn last line of a crash
+                if record['type'] == 'start':
+                    self.output_filepath = record['output']
+                elif record['type'] == 'notice':
+                    self.notices[record['key']] = [ShipNoticeRow(*values) for values in record['rows']]
+                elif record['type'] == 'page_done':
+                    self.written_keys.update(record['keys'])
+                    self.last_page = record['page']
+        print(f"Resuming crawl: {len(self.written_keys)} ship notices already saved, {len(self.notices) - len(self.written_keys)} more already extracted.")
+
+    def _append(self, record: dict):
+        with open(self.filepath, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def start(self, output_filepath: str):
+        # New journal for a fresh crawl
+        self.output_filepath = output_filepath
+        with open(self.filepath, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'type': 'start', 'output': output_filepath, 'started_at': time.time()}) + '\n')
+
+    def written_asns(self) -> set:
+        return {rows[0].ship_notice_num for key, rows in self.notices.items() if key in self.written_keys and rows}
+
+    def is_written(self, row: dict) -> bool:
+        return listing_key(row) in self.written_keys
+
+    def notice_rows(self, row: dict) -> Optional[List[ShipNoticeRow]]:
+        return self.notices.get(listing_key(row))
+
+    def record_notice(self, page: int, row: dict, notice: List[ShipNoticeRow]):
+        key = listing_key(row)
+        self.notices[key] = notice
+        self._append({'type': 'notice', 'page': page, 'row': row['index'], 'key': key, 'rows': [r.as_tuple() for r in notice]})
+
+    def page_done(self, page: int, shipnotice_rows: List[dict]):
+        # Call after the page's rows are flushed to the output file
+        keys = [listing_key(row) for row in shipnotice_rows]
+        self.written_keys.update(keys)
+        self.last_page = page
+        self._append({'type': 'page_done', 'page': page, 'keys': keys})
+
+    def finish(self):
+        # The crawl completed, nothing to resume
+        if self.exists():
+            os.remove(self.filepath)
@@ -1,8 +1,10 @@
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from utils import setup_logger
-from core_logic import SeleniumApp
-from utils import setup_logger, read_cli_arguments, get_userinput_cli
+from core_logic import SeleniumApp, LOGIN_URL
+from startup import BackgroundStartup
+from driver_backend import make_backend
+from utils import setup_logger, configure_logging, read_cli_arguments, get_userinput_cli
 from dotenv import load_dotenv
 
 logger = setup_logger()  # Setup logging
@@ -11,28 +13,66 @@ load_dotenv()
 
 def main(args):
     app_env = args.env
+    configure_logging(log_format=args.log_format, hot_level=args.hot_log_level)
+    try:
+        backend = make_backend(args.backend, args.grid_url)
+    except ValueError as e:
+        print(e)
+        return
+    # Boot the browser while the credentials are being typed
+    startup = BackgroundStartup(lean_profile=args.lean_browser, backend=backend).start()
+    
+    login_url = LOGIN_URL
+    fake_server = None
     
     # Get username, password, and crawl date
     if app_env=='prod': # input from script argurments (user input from GUI)
         username, password, crawl_year, crawl_month, crawl_day = get_userinput_cli()
-    else: # app_env is 'dev' or 'test': 
+    elif app_env=='test': # crawl the whole synthetic mailbox of the local fake_iexweb.py server
+        from fake_iexweb import FakeMailbox, FakeIExWebServer, FAKE_PORT
+        mailbox = FakeMailbox(int(os.environ.get("IEXWEB_FAKE_MAILS", 2000)))
+        fake_server = FakeIExWebServer(mailbox, FAKE_PORT).serve_in_background()
+        # the browser reaches the host from inside the container through host.docker.internal
+        fake_host = 'host.docker.internal' if backend.name == 'docker' else 'localhost'
+        login_url = os.environ.get("IEXWEB_FAKE_URL", f"http://{fake_host}:{FAKE_PORT}/ieweb/general/login")
+        username, password = 'test', 'test'
+        crawl_year, crawl_month, crawl_day = mailbox.oldest.year, mailbox.oldest.month, mailbox.oldest.day
+    else: # app_env is 'dev'
         username, password = os.environ["DEV_USERNAME"], os.environ["DEV_PASSWORD"]
         crawl_year, crawl_month, crawl_day = os.environ["DEV_CRAWL_YEAR"], os.environ["DEV_CRAWL_MONTH"], os.environ["DEV_CRAWL_DAY"]
      
     # Check if any essential inputs is null
     if not username or not password or not crawl_year or not crawl_month or not crawl_day:
+        startup.shutdown()
         raise ValueError('username or password or crawl date is abnormal!')
     # Check validity of date:
     try:
         crawluntil_time = datetime(year=int(crawl_year), month=int(crawl_month), day=int(crawl_day))
+        # the window end day is included
+        crawlto_time = datetime.strptime(args.crawl_to, "%Y-%m-%d") + timedelta(days=1) if args.crawl_to else None
     except ValueError as e:
         logger.error(f"Error occurred during validity of date: {e}")
         print('Invalid date...')
+        startup.shutdown()
+        return
+    if crawlto_time is not None and crawlto_time <= crawluntil_time:
+        print('The crawl-to date must not be before the crawl date...')
+        startup.shutdown()
         return
     
     # Run App
-    app = SeleniumApp(username, password, crawluntil_time)
+    app = SeleniumApp(username, password, crawluntil_time, workers=args.workers, grid_url=args.grid_url,
+                      http_workers=args.http_workers if args.http_fetch else 0,
+                      session_cache=not args.no_session_cache and not fake_server,
+                      incremental=not args.full_crawl and not fake_server,  # the fake mailbox is regenerated every run
+                      resume=args.resume, output_format=args.output_format,
+                      normalize=args.normalize, startup=startup,
+                      parse_workers=args.parse_workers, crawlto_time=crawlto_time,
+                      max_pages=args.max_pages or None, listing_controls=not args.no_listing_controls,
+                      login_url=login_url, archive=args.archive)
     app.run()
+    if fake_server:
+        fake_server.shutdown()
 
 
 
@@ -2,41 +2,83 @@ import os
 import time
 
 # helper functions
-from utils import setup_logger, make_shipfolder, name_shipfile, store_shipnotice_csv
-from selenium_helper import SeleniumHelper
+from utils import setup_logger, configure_logging, make_shipfolder, name_shipfile
+from startup import BackgroundStartup
+from parse_pipeline import ParsePipeline
+from crawl_pool import CrawlWorkerPool
+from http_fetch import HttpFetcher
+from session_cache import load_session, save_session, is_session_valid
+from state_store import CrawlStateStore
+from row_sink import CsvRowSink
+from checkpoint import CrawlCheckpoint
+from normalize import normalize_shipnotices, store_normalized
+from doc_archive import DocumentArchive
 
 logger = setup_logger()  # Setup logging
 
+LOGIN_URL = "https://www.iexchangeweb.com/ieweb/general/login"
+
 class SeleniumApp:
-    def __init__(self, username, password, crawluntil_time):
+    def __init__(self, username, password, crawluntil_time, workers=1, grid_url=None, http_workers=0, session_cache=True, incremental=True, resume=False, output_format='csv', normalize=False, startup=None, parse_workers=0, crawlto_time=None, max_pages=None, listing_controls=True, login_url=LOGIN_URL, job_name=None, interactive=True, archive=False, keep_browser=False):
         self.username = username
         self.password = password
         self.crawluntil_time = crawluntil_time
-        self.script_start_time = time.time()
-        self.selhelp = SeleniumHelper(script_start_time=self.script_start_time)
+        self.crawlto_time = crawlto_time  # end of a "from X to Y" date window (exclusive), None crawls from the newest mail
+        self.workers = workers
+        self.grid_url = grid_url
+        self.pool = None
+        self.http_workers = http_workers  # > 0 enables the http fetch mode
+        self.fetcher = None
+        self.session_cache = session_cache
+        self.state = CrawlStateStore(username) if incremental else None
+        self.checkpoint = CrawlCheckpoint(username, crawluntil_time, crawlto_time)
+        self.resume = resume
+        self.output_format = output_format
+        self.normalize = normalize
+        self.max_pages = max_pages  # None crawls until the crawl date or the last page
+        self.listing_controls = listing_controls
+        self.login_url = login_url  # the fake_iexweb.py stand-in in --env test
+        self.job_name = job_name  # batch job: output under shipnotices/<job_name>/, metrics labelled with it
+        configure_logging(account=job_name or username)  # account id of the JSON log records
+        self.interactive = interactive  # False: no "Press Enter to exit" prompt and no exit() at the end of run()
+        self.keep_browser = keep_browser  # service mode: leave the browser logged in for the next crawl, metrics are written by the caller
+        self.completed = False  # set when the crawl and the output file are done
+        self.parse_workers = parse_workers  # > 0 parses item documents in a process pool while the browser navigates
+        self.pipeline = None
+        self.sink = None
+        self.archive = DocumentArchive(username) if archive else None  # raw item documents for reparse.py
+        # The browser is usually already booting since launch (cli_main / GUI), else start it now
+        self.startup = startup or BackgroundStartup(grid_url=grid_url).start()
+        self.script_start_time = self.startup.script_start_time
+        self.selhelp = self.startup.selhelp
+        self.metrics = self.startup.metrics
+        self.selhelp.archive = self.archive
     
     def mainapp(self):
-        print(f"Hi {self.username}, I see you want to crawl from today to {self.crawluntil_time}. No Problem...")
+        if self.crawlto_time:
+            print(f"Hi {self.username}, I see you want to crawl from {self.crawluntil_time} to {self.crawlto_time}. No Problem...")
+        else:
+            print(f"Hi {self.username}, I see you want to crawl from today to {self.crawluntil_time}. No Problem...")
         
-        shipnotice_folderpath = make_shipfolder() # make folder and return folder name
-        shipnotice_filename = name_shipfile(self.crawluntil_time) # only return file name
+        shipnotice_folderpath = make_shipfolder(self.job_name) # make folder and return folder name
+        shipnotice_filename = name_shipfile(self.crawluntil_time, self.output_format) # only return file name
         shipnotice_filepath = os.path.join(shipnotice_folderpath, shipnotice_filename)
+        if self.resume and self.checkpoint.exists():
+            # Continue the interrupted crawl into its own output file
+            self.checkpoint.load()
+            shipnotice_filepath = self.checkpoint.output_filepath or shipnotice_filepath
+        else:
+            if self.resume:
+                print('No interrupted crawl to resume, starting a new one.')
+            self.checkpoint.start(shipnotice_filepath)
         
-        # Setup selenium environment
+        # Wait for the browser started in the background (daemon session, Docker container or Grid)
         try:
-            self.selhelp.setup_selenium_env()
-        except Exception as e:
-            logger.error(f"Error occurred during Selenium Docker setup: {e}")
-            print('Something went wrong...')
-            return
-
-        # Start WebDriver
-        try:
-            self.selhelp.init_webdriver(timeout=60)
-        except Exception as e:
-            logger.error(f"Error occurred while initializing WebDriver: {e}")
-            print('WebDriver initialization failed, it happens...you can try again or restart machine.')
+            with self.metrics.stage('wait_for_browser'):
+                self.startup.wait()
+        except Exception:
             return
+        daemon_session = self.startup.daemon_session
 
         if self.selhelp.driver is None:
             logger.error("WebDriver not initialized.")
@@ -46,13 +88,42 @@ class SeleniumApp:
 
         # Perform login and other operations
         try:
-            url = "https://www.iexchangeweb.com/ieweb/general/login"
-            self.selhelp.login_iExWeb(url, self.username, self.password)
+            url = self.login_url
+            resumed = False
+            if self.selhelp.logged_in and self.selhelp.username == self.username:
+                # Browser kept up since the previous crawl (service mode), check its session still holds
+                resumed = self.selhelp.resume_login(self.selhelp.homeurl)
+            if not resumed and daemon_session and daemon_session.get('homeurl') and daemon_session.get('username') == self.username:
+                resumed = self.selhelp.resume_login(daemon_session['homeurl'])
+            if not resumed and self.session_cache:
+                # Reuse the cached session cookies if the site still accepts them
+                cached = load_session(self.username, self.password)
+                if cached and is_session_valid(cached):
+                    resumed = self.selhelp.restore_session(url, cached)
+            if not resumed:
+                self.selhelp.login_iExWeb(url, self.username, self.password)
+            if self.session_cache:
+                save_session(self.username, self.password, self.selhelp.homeurl, self.selhelp.driver.get_cookies())
         except Exception as e:
             logger.error(f"Error occurred during login: {e}")
             print('Login failed...')
             return
 
+        # Start the extra crawl workers
+        if self.workers > 1:
+            try:
+                self.pool = CrawlWorkerPool(self.workers, self.script_start_time, backend=self.startup.backend)
+                self.pool.start(self.selhelp, url, self.username, self.password)
+            except Exception as e:
+                logger.error(f"Error occurred while starting crawl workers: {e}")
+                print('Crawl workers could not be started, continuing with a single session.')
+                self.pool = None
+
+        # Hand the authenticated session over to the http client
+        if self.http_workers > 0:
+            self.fetcher = HttpFetcher(max_workers=self.http_workers, archive=self.archive)
+            self.fetcher.load_driver_session(self.selhelp.driver)
+
         print('Locating ship notice data...')
 
         # Navigate to sentmail page...
@@ -62,10 +133,21 @@ class SeleniumApp:
             logger.error(f"Error occurred during navigating to sentmail page: {e}")
             print('Something went wrong when navigating to the sentmail page, sorry...')
             return
-
-        # Start crawling shipnotices (across pages)
+        # Let the site filter and size the listing pages where it can (probed, falls back to client-side)
+        if self.listing_controls:
+            self.selhelp.use_listing_controls()
+
+        # Start crawling shipnotices (across pages), rows are streamed to the output file as pages finish
+        if self.output_format == 'parquet':
+            from parquet_sink import ParquetRowSink  # pyarrow is only needed for this format
+            self.sink = ParquetRowSink(shipnotice_filepath)
+        else:
+            self.sink = CsvRowSink(shipnotice_filepath)
+        if self.parse_workers > 0:
+            self.pipeline = ParsePipeline(processes=self.parse_workers)
         try:
-            df_shipNotice = self.selhelp.crawl_shipnotices_until(crawluntil_time=self.crawluntil_time, maxpages=5)
+            with self.metrics.stage('crawl'):
+                rows_written = self.selhelp.crawl_shipnotices_until(crawluntil_time=self.crawluntil_time, sink=self.sink, maxpages=self.max_pages, pool=self.pool, fetcher=self.fetcher, state=self.state, checkpoint=self.checkpoint, pipeline=self.pipeline, crawlto_time=self.crawlto_time)
         except ValueError as e:
             logger.error(f"Error occurred at crawl_shipnotices: {repr(e)}")
             print('Something went wrong when crawling the shipnotices, sorry...')
@@ -74,15 +156,40 @@ class SeleniumApp:
             logger.error(f"Error occurred at crawl_shipnotices: {repr(e)}")
             print('Something went wrong when crawling the shipnotices, sorry...')
             return
+        if rows_written is None:
+            self.sink.flush()
+            if self.sink.count:
+                print(f"Saved {self.sink.count} rows scraped before the error to {self.sink.filepath}")
+            print('Run again with resume to continue from where it stopped.')
+            return
         
-        # Store DataFrame
+        # Finish the output file
         try:
-            store_shipnotice_csv(df_shipNotice, shipnotice_filepath)
+            self.sink.close()
         except Exception as e:
-            logger.error(f"Error occurred at store_shipnotice_csv: {repr(e)}")
+            logger.error(f"Error occurred while storing the shipnotices: {repr(e)}")
             print('Something went wrong when storing the shipnotices, sorry...')
             return
-        print("Saved data to shipnotice folder!")
+        if rows_written:
+            print("Saved data to shipnotice folder!")
+        if self.pipeline:
+            self.pipeline.report()
+
+        # Clean, typed copy of the output plus a report of the rows that failed the schema check
+        if self.normalize and self.sink.count:
+            try:
+                clean, rejects = normalize_shipnotices(self.sink.to_dataframe())
+                clean_filepath, rejects_filepath = store_normalized(clean, rejects, self.sink.filepath, self.output_format)
+                print(f"Saved {len(clean)} normalized rows to {clean_filepath}")
+                if len(rejects):
+                    print(f"{len(rejects)} rows were rejected, see {rejects_filepath}")
+            except Exception as e:
+                logger.error(f"Error occurred while normalizing the shipnotices: {repr(e)}")
+                print('Something went wrong when normalizing the shipnotices, the raw output is kept.')
+        if self.state:
+            self.state.flush()
+        self.checkpoint.finish()
+        self.completed = True
         logger.info(f"total time spent: {(time.time()-self.script_start_time):.2f}s")
 
     def run(self):
@@ -95,7 +202,25 @@ class SeleniumApp:
             logger.error(f"Unhandled exception in main: {e}")
         finally:
             # Ensure proper cleanup and exit gracefully
-            self.selhelp.quit_scraper()
+            if self.sink and self.sink.buffer:
+                # keep the rows scraped before the interruption
+                self.sink.flush()
+                print(f"Saved {self.sink.count} rows scraped so far to {self.sink.filepath}")
+            if self.pipeline:
+                self.pipeline.close()
+            if self.pool:
+                self.pool.quit()
+            if self.archive:
+                self.archive.close()
+                print(f"Archived {self.archive.documents} item documents ({self.archive.new_documents} new) in {self.archive.folderpath}")
+            if self.state:
+                self.state.close()
+            if not self.keep_browser:
+                try:
+                    print(f"Run metrics saved to {self.metrics.write_json(label=self.job_name)}")
+                except Exception as e:
+                    logger.error(f"Error occurred while writing the run metrics: {repr(e)}")
+                self.selhelp.quit_scraper(prompt=self.interactive)
 
         
 
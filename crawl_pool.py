@@ -0,0 +1,127 @@
+import time
+import queue
+import threading
+from typing import List, Optional
+from selenium_helper import SeleniumHelper
+from shipnotice_parser import ShipNoticeRow
+from driver_backend import DriverBackend, DockerBackend
+from utils import setup_logger
+
+logger = setup_logger()
+
+
+class CrawlWorker:
+    """One logged-in WebDriver session of the pool, with its own throughput counters."""
+    def __init__(self, worker_id, helper:SeleniumHelper):
+        self.worker_id = worker_id
+        self.helper = helper
+        self.notices = 0
+        self.busy_seconds = 0.0
+
+    def throughput(self) -> float:
+        return self.notices / self.busy_seconds if self.busy_seconds > 0 else 0.0
+
+
+class CrawlWorkerPool:
+    """
+    # N logged-in WebDriver sessions that scrape item pages from a shared queue.
+    # Worker 0 is the main (listing) session; workers 1..N-1 get their browser from backend.for_worker(i):
+    # extra standalone-chrome containers on distinct ports, more slots of the same Grid hub, or more local Chromes.
+    """
+    def __init__(self, workers:int, script_start_time, backend:Optional[DriverBackend]=None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.n_workers = workers
+        self.backend = backend  # defaults to the main session's backend
+        self.script_start_time = script_start_time
+        self.workers: List[CrawlWorker] = []
+
+    def start(self, main_helper:SeleniumHelper, login_url, username, password):
+        # Boot and log in the extra worker sessions concurrently
+        errors = []
+        # Workers reuse the main session's cookies instead of typing the credentials again
+        cached = {'username': username, 'homeurl': main_helper.homeurl, 'cookies': main_helper.driver.get_cookies()}
+        # a main session attached to the browser daemon runs on Docker
+        backend = self.backend or main_helper.backend or DockerBackend()
+        def boot(i):
+            helper = SeleniumHelper(script_start_time=self.script_start_time, backend=backend.for_worker(i), lean_profile=main_helper.lean_profile)
+            helper.archive = main_helper.archive
+            try:
+                helper.setup_selenium_env()
+                helper.init_webdriver(timeout=60)
+                if not helper.restore_session(login_url, cached):
+                    helper.login_iExWeb(login_url, username, password)
+                self.workers.append(CrawlWorker(i, helper))
+            except Exception as e:
+                logger.error(f"Error occurred while starting crawl worker {i}: {e}")
+                errors.append(e)
+                if helper.driver:
+                    helper.driver.quit()
+                helper.backend.stop()
+        threads = [threading.Thread(target=boot, args=(i,)) for i in range(1, self.n_workers)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        # The main session takes part in scraping too
+        self.workers.append(CrawlWorker(0, main_helper))
+        self.workers.sort(key=lambda w: w.worker_id)
+        if errors:
+            print(f'{len(errors)} crawl workers failed to start, continuing with {len(self.workers)}.')
+        print(f'{len(self.workers)} crawl workers are logged in.')
+
+    def scrape_items(self, item_urls:List[str]) -> List[List[ShipNoticeRow]]:
+        """
+        # Scrape the given item pages concurrently. Returns the rows of every notice in the same order as item_urls,
+        # so the caller can merge them newest-first. Every worker navigates its current window,
+        # so the main session must be switched to its item tab before calling this.
+        """
+        results = [None] * len(item_urls)
+        errors = []
+        jobs = queue.Queue()
+        for position, url in enumerate(item_urls):
+            jobs.put((position, url))
+
+        def work(worker:CrawlWorker):
+            while not errors:
+                try:
+                    position, url = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                start = time.time()
+                try:
+                    worker.helper.driver.get(url)
+                    # ASN de-duplication happens when the results are merged in listing order
+                    results[position] = worker.helper.scrape_current_item(set())
+                except Exception as e:
+                    logger.error(f"worker {worker.worker_id} failed at {url}: {repr(e)}")
+                    errors.append(e)
+                    return
+                finally:
+                    worker.busy_seconds += time.time() - start
+                worker.notices += 1
+                print(f"worker {worker.worker_id} finished item #{position+1}! Total runtime at: {(time.time()-self.script_start_time):.2f}s")
+
+        threads = [threading.Thread(target=work, args=(w,)) for w in self.workers]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        if errors:
+            raise errors[0]
+        return results
+
+    def report(self):
+        # Per-worker throughput
+        for w in self.workers:
+            msg = f"worker {w.worker_id}: {w.notices} notices in {w.busy_seconds:.2f}s ({w.throughput():.2f} notices/s)"
+            print(msg)
+            logger.info(msg)
+
+    def quit(self):
+        self.report()
+        for w in self.workers:
+            if w.worker_id == 0:
+                continue  # main session, quit by SeleniumHelper.quit_scraper
+            try:
+                w.helper.driver.quit()
+                # the worker's own container, a no-op for backends shared with the main session (Grid, local)
+                w.helper.backend.stop()
+            except Exception as e:
+                logger.error(f"Error occurred while stopping crawl worker {w.worker_id}: {e}")
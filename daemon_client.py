@@ -0,0 +1,80 @@
+import os
+import time
+import threading
+import requests
+from utils import setup_logger
+
+logger = setup_logger()
+
+DAEMON_URL = os.environ.get("IEXWEB_DAEMON_URL", "http://localhost:4455")
+# attach may (re)boot the container and Chrome before it answers
+ATTACH_TIMEOUT = (0.5, 150)  # (connect, read) seconds
+# how long a run waits for the session another run has leased
+BUSY_WAIT = int(os.environ.get("IEXWEB_DAEMON_BUSY_WAIT", 300))
+LEASE_RENEW_INTERVAL = 30  # seconds, well below the daemon's lease TTL
+
+_lease_keepers = {}  # daemon_url -> Event that stops the renew thread
+
+
+class DaemonBusyError(RuntimeError):
+    """The daemon is running but its session could not be leased (in use, or attach timed out)."""
+
+
+def _keep_lease(daemon_url, stop: threading.Event):
+    # Renew the lease while the run holds it, so a crashed run's lease expires on its own
+    while not stop.wait(LEASE_RENEW_INTERVAL):
+        try:
+            requests.post(f"{daemon_url}/renew", timeout=5)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error occurred while renewing the browser daemon lease: {e}")
+
+
+def get_daemon_session(daemon_url=DAEMON_URL, timeout=ATTACH_TIMEOUT, busy_wait=BUSY_WAIT):
+    """
+    # Lease the daemon's warm WebDriver session. Returns the session info dict, or None if no daemon is running.
+    # While another run holds the lease, waits up to busy_wait seconds for it, then raises DaemonBusyError:
+    # the caller must not fall back to its own container, that would stop the daemon's one.
+    """
+    if not daemon_url:
+        return None
+    deadline = time.time() + busy_wait
+    while True:
+        try:
+            response = requests.post(f"{daemon_url}/attach", timeout=timeout)
+        except requests.exceptions.ConnectionError:
+            return None  # nothing listening
+        except requests.exceptions.RequestException as e:
+            raise DaemonBusyError(f"browser daemon did not answer the attach request: {e}")
+        if response.status_code == 409 and time.time() < deadline:
+            logger.info("browser daemon session is in use by another run, waiting for it")
+            time.sleep(5)
+            continue
+        if response.status_code != 200:
+            raise DaemonBusyError(f"browser daemon refused attach: {response.status_code} {response.text}")
+        stop = threading.Event()
+        _lease_keepers[daemon_url] = stop
+        threading.Thread(target=_keep_lease, args=(daemon_url, stop), name='daemon-lease', daemon=True).start()
+        return {**response.json(), 'daemon_url': daemon_url}
+
+
+def is_daemon_running(daemon_url=DAEMON_URL) -> bool:
+    if not daemon_url:
+        return False
+    try:
+        requests.get(f"{daemon_url}/health", timeout=2)
+    except requests.exceptions.ConnectionError:
+        return False
+    except requests.exceptions.RequestException:
+        pass  # listening, but busy (e.g. booting the session for an attach)
+    return True
+
+
+def release_daemon_session(daemon_url=DAEMON_URL, homeurl=None, username=None):
+    # Give the session back, remembering where (and as whom) it is logged in
+    stop = _lease_keepers.pop(daemon_url, None)
+    if stop is not None:
+        stop.set()
+    try:
+        requests.post(f"{daemon_url}/release", json={'homeurl': homeurl, 'username': username}, timeout=2)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error occurred while releasing browser daemon session: {e}")
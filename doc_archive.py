@@ -0,0 +1,143 @@
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from sentmail_listing import MESSAGE_ID_RE
+from shipnotice_parser import parse_shipnotice_header
+from utils import setup_logger, parse_creation_date
+
+logger = setup_logger()
+
+ARCHIVE_FOLDER = 'archive'
+INDEX_DB_FILENAME = 'index.db'
+
+
+def object_relpath(sha256: str) -> str:
+    # objects/ab/abcdef....html.gz, fanned out so no folder holds every document
+    return os.path.join('objects', sha256[:2], f"{sha256}.html.gz")
+
+
+def read_document(path: str) -> str:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+class DocumentArchive:
+    """
+    # Local archive of every fetched contentFrame document, so extraction can be re-run without crawling
+    # (reparse.py). Documents are stored gzip-compressed under the sha256 of their content (a resent or
+    # re-crawled identical document is stored once) and indexed in SQLite by account, ASN and message id.
+    # put() returns right away: hashing, compression, writes and the ASN lookup run on a background writer thread.
+    """
+    def __init__(self, account: str, folderpath: Optional[str]=None):
+        self.account = account
+        self.folderpath = folderpath or os.path.join(os.getcwd(), ARCHIVE_FOLDER)
+        os.makedirs(os.path.join(self.folderpath, 'objects'), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(self.folderpath, INDEX_DB_FILENAME), check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS document (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL,
+                archived_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS notice (
+                account TEXT NOT NULL,
+                sha256 TEXT NOT NULL REFERENCES document (sha256),
+                asn TEXT,
+                message_id TEXT,
+                item_url TEXT,
+                create_datetime TEXT,
+                archived_at REAL NOT NULL,
+                PRIMARY KEY (account, sha256)
+            );
+            CREATE INDEX IF NOT EXISTS notice_asn ON notice (account, asn);
+            CREATE INDEX IF NOT EXISTS notice_message_id ON notice (account, message_id);
+        """)
+        self.conn.commit()
+        self.lock = threading.Lock()  # the writer thread and lookups share the connection
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='doc-archive')
+        self.documents = 0
+        self.new_documents = 0
+
+    def put(self, html: str, item_url: Optional[str]=None, message_id: Optional[str]=None):
+        self.writer.submit(self._store, html, item_url, message_id)
+
+    def _store(self, html: str, item_url: Optional[str], message_id: Optional[str]):
+        try:
+            data = html.encode('utf-8')
+            sha256 = hashlib.sha256(data).hexdigest()
+            path = os.path.join(self.folderpath, object_relpath(sha256))
+            now = time.time()
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                compressed = gzip.compress(data, compresslevel=6)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp_path, path)
+                with self.lock:
+                    self.conn.execute("INSERT OR IGNORE INTO document VALUES (?, ?, ?, ?)", (sha256, len(data), len(compressed), now))
+                self.new_documents += 1
+            try:
+                header = parse_shipnotice_header(html)
+            except ValueError:
+                header = {}
+            create_datetime = header.get('create_datetime')
+            try:
+                create_datetime = parse_creation_date(create_datetime).isoformat() if create_datetime else None
+            except ValueError:
+                pass
+            if message_id is None and item_url:
+                ids = MESSAGE_ID_RE.findall(item_url)
+                message_id = ids[-1] if ids else None
+            with self.lock:
+                self.conn.execute("INSERT OR REPLACE INTO notice VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                  (self.account, sha256, header.get('ship_notice_num'), message_id, item_url, create_datetime, now))
+                self.conn.commit()
+            self.documents += 1
+        except Exception as e:
+            logger.error(f"Error occurred while archiving a ship notice document: {repr(e)}")
+
+    def close(self):
+        self.writer.shutdown(wait=True)
+        self.conn.close()
+        logger.info(f"archived {self.documents} documents ({self.new_documents} new) in {self.folderpath}")
+
+    def paths_by_asn(self, asn: str) -> List[str]:
+        with self.lock:
+            cur = self.conn.execute("SELECT sha256 FROM notice WHERE account=? AND asn=? ORDER BY create_datetime DESC", (self.account, asn)).fetchall()
+        return [os.path.join(self.folderpath, object_relpath(sha256)) for (sha256,) in cur]
+
+    def paths_by_message_id(self, message_id: str) -> List[str]:
+        with self.lock:
+            cur = self.conn.execute("SELECT sha256 FROM notice WHERE account=? AND message_id=?", (self.account, message_id)).fetchall()
+        return [os.path.join(self.folderpath, object_relpath(sha256)) for (sha256,) in cur]
+
+
+def archived_notices(folderpath: str, account: Optional[str]=None, created_from: Optional[str]=None, created_to: Optional[str]=None) -> List[tuple]:
+    """
+    # (account, object path) of the archived notices, newest ship notice first, so merging them keeps
+    # the newest notice per ASN like a crawl does. created_from/created_to are ISO dates, created_to excluded.
+    """
+    conn = sqlite3.connect(os.path.join(folderpath, INDEX_DB_FILENAME))
+    clauses, params = [], []
+    if account:
+        clauses.append("account = ?")
+        params.append(account)
+    if created_from:
+        clauses.append("create_datetime >= ?")
+        params.append(created_from)
+    if created_to:
+        clauses.append("create_datetime < ?")
+        params.append(created_to)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    try:
+        cur = conn.execute(f"SELECT account, sha256 FROM notice {where} ORDER BY create_datetime DESC, archived_at DESC", params)
+        return [(acct, os.path.join(folderpath, object_relpath(sha256))) for acct, sha256 in cur]
+    finally:
+        conn.close()
@@ -0,0 +1,126 @@
+import time
+from typing import List
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from utils import setup_logger, setup_hot_logger
+
+logger = setup_logger()
+hot_logger = setup_hot_logger()  # per-notice / per-page messages
+
+# Resolve as soon as the DOM conditions hold, instead of polling them from Python every 0.5s.
+# A MutationObserver on the page (and on same-origin frame documents once they exist) re-checks the conditions
+# on every change, the load events of frames are caught too. A slow timer is only a backstop for changes
+# no observer reports (e.g. a stylesheet hiding an element).
+# Condition: {'xpath' or 'css': locator, 'frame': iframe id the locator applies to, 'visible': bool,
+#             'text': substring of the element text, 'url': substring of the page URL}, all keys optional.
+# arguments: conditions, any_of, timeout in ms. Resolves to {'ok', 'met': [bool per condition], 'inaccessible': [frame ids]}.
+WAIT_FOR_DOM_JS = """
+const [conditions, anyOf, timeoutMs, done] = arguments;
+const observed = new WeakSet();
+const inaccessible = new Set();
+let finished = false, observer = null, backstop = null, timer = null;
+
+function frameDocument(id) {
+    const frame = document.getElementById(id);
+    if (!frame) return null;
+    try {
+        const doc = frame.contentDocument;
+        if (doc && doc.readyState !== 'uninitialized' && doc.location.href !== 'about:blank') return doc;
+        return null;
+    } catch (e) {
+        inaccessible.add(id);  // cross-origin frame, checked with a frame switch instead
+        return null;
+    }
+}
+function find(doc, c) {
+    if (c.xpath) return doc.evaluate(c.xpath, doc, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    return doc.querySelector(c.css);
+}
+function isVisible(el) {
+    const view = el.ownerDocument.defaultView;
+    const style = view ? view.getComputedStyle(el) : null;
+    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length) && !(style && style.visibility === 'hidden');
+}
+function check(c) {
+    if (c.url && !location.href.includes(c.url)) return false;
+    if (!c.xpath && !c.css) return true;
+    const doc = c.frame ? frameDocument(c.frame) : document;
+    if (!doc) return false;
+    if (c.frame && !observed.has(doc)) {
+        observed.add(doc);
+        observer.observe(doc, {childList: true, subtree: true, attributes: true, characterData: true});
+    }
+    const el = find(doc, c);
+    if (!el) return false;
+    if (c.visible && !isVisible(el)) return false;
+    if (c.text && !(el.textContent || '').includes(c.text)) return false;
+    return true;
+}
+function finish(ok, met) {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearInterval(backstop);
+    clearTimeout(timer);
+    document.removeEventListener('load', evaluate, true);
+    done({ok: ok, met: met, inaccessible: Array.from(inaccessible)});
+}
+function evaluate() {
+    if (finished) return;
+    const met = conditions.map(check);
+    const ok = anyOf ? met.some(Boolean) : met.every(Boolean);
+    if (ok || inaccessible.size) finish(ok, met);
+}
+observer = new MutationObserver(evaluate);
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+document.addEventListener('load', evaluate, true);  // frame loads do not bubble, capture them
+backstop = setInterval(evaluate, 250);
+timer = setTimeout(() => finish(false, conditions.map(check)), timeoutMs);
+evaluate();
+"""
+
+# outerHTML of a same-origin iframe document, null if it is not accessible from the page
+FRAME_HTML_JS = """
+const frame = document.getElementById(arguments[0]);
+try {
+    return frame && frame.contentDocument ? frame.contentDocument.documentElement.outerHTML : null;
+} catch (e) {
+    return null;
+}
+"""
+
+# Script errors of a wait interrupted by a navigation: the document unloaded while waiting, or the new one is not there yet
+NAVIGATION_ERROR_MESSAGES = ('document unloaded', 'execution context was destroyed', 'cannot find context with specified id',
+                             'no such execution context', 'target frame detached')
+
+
+def interrupted_by_navigation(e: WebDriverException) -> bool:
+    message = (e.msg or '').lower()
+    return any(text in message for text in NAVIGATION_ERROR_MESSAGES)
+
+
+def wait_for_dom(driver, conditions: List[dict], timeout: float=60, any_of: bool=False) -> dict:
+    """
+    # Wait in one browser call until all (or any_of) the conditions hold, see WAIT_FOR_DOM_JS.
+    # Dependent conditions (page URL, container, frame content) go in one call instead of chained WebDriverWaits.
+    # A navigation unloads the page the script runs in, the wait is then re-issued on the new page.
+    # timeout is only the failure ceiling: raises TimeoutException if the conditions don't hold by then.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutException(f"DOM conditions not met within {timeout}s: {conditions}")
+        driver.set_script_timeout(remaining + 5)
+        try:
+            result = driver.execute_async_script(WAIT_FOR_DOM_JS, conditions, any_of, int(remaining * 1000))
+        except TimeoutException:
+            raise
+        except WebDriverException as e:
+            if not interrupted_by_navigation(e):
+                raise  # dead session or window, bad locator in the conditions, ...
+            hot_logger.debug("DOM wait re-issued: %r", e)
+            time.sleep(0.05)
+            continue
+        if result['ok'] or result['inaccessible']:
+            return result
+        raise TimeoutException(f"DOM conditions not met within {timeout}s: {conditions}, met: {result['met']}")
@@ -0,0 +1,149 @@
+import os
+import time
+import requests
+from typing import Optional
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium_docker_ctrl import selenium_docker_ctrl, check_docker_installed
+from daemon_client import is_daemon_running
+from utils import setup_logger
+
+logger = setup_logger()
+
+BACKENDS = ('docker', 'local', 'grid')
+CONTAINER_NAME = 'selenium-chrome-container'  # also the browser daemon's container
+
+
+def is_selenium_server_up(status_url) -> bool:
+    # The Grid /status endpoint answers {"value": {"ready": true, ...}} once a new session can be created
+    try:
+        response = requests.get(status_url, timeout=1)
+        if response.status_code == 200:
+            return bool(response.json().get('value', {}).get('ready'))
+    except (requests.exceptions.RequestException, ValueError):
+        return False
+    return False
+
+
+def wait_until_selenium_server_up(status_url, timeout=60):
+    # Wait for the Selenium server to be ready
+    # timeout=Total wait time (seconds), polls start at 0.1s and back off to 1s
+    poll_interval = 0.1
+    start_time = time.time()
+
+    while time.time() - start_time < timeout:
+        if is_selenium_server_up(status_url):
+            print("Selenium server is up and running.")
+            logger.info(f"selenium server ready after {(time.time()-start_time):.2f}s")
+            break
+        time.sleep(poll_interval)
+        poll_interval = min(poll_interval * 2, 1.0)
+    else:
+        raise RuntimeError("Selenium server did not start within the timeout period.")
+
+
+def selenium_status_url(webdriver_port=4444):
+    return f'http://localhost:{webdriver_port}/status'
+
+
+class DriverBackend:
+    """
+    # Where the browser of a WebDriver session runs. start() gets the host ready (e.g. boots a container),
+    # new_driver() opens a session on it, stop() tears down what start() created.
+    # for_worker(i) is the backend of the i-th extra session of a CrawlWorkerPool.
+    """
+    name = None
+
+    def start(self):
+        pass
+
+    def new_driver(self, options: webdriver.ChromeOptions):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def for_worker(self, i: int) -> 'DriverBackend':
+        return self
+
+
+class DockerBackend(DriverBackend):
+    """The selenium/standalone-chrome container on localhost, driven over webdriver.Remote."""
+    name = 'docker'
+
+    def __init__(self, container_name=CONTAINER_NAME, webdriver_port=4444, vnc_port=7900):
+        self.container_name = container_name
+        self.webdriver_port = webdriver_port
+        self.vnc_port = vnc_port
+
+    def start(self):
+        # Setup Selenium Docker Environment
+        check_docker_installed()
+        status_url = selenium_status_url(self.webdriver_port)
+        # Stop container first if previous execution failed to stop selenium docker.
+        if is_selenium_server_up(status_url):
+            if self.container_name == CONTAINER_NAME and is_daemon_running():
+                # not a leftover: the browser daemon's session (and maybe another run) lives in it
+                raise RuntimeError(f"{self.container_name} belongs to the running browser daemon, not stopping it")
+            selenium_docker_ctrl('stop', self.container_name, self.webdriver_port, self.vnc_port)
+        selenium_docker_ctrl('start', self.container_name, self.webdriver_port, self.vnc_port)
+        print("Waiting for Selenium server to start...")
+        wait_until_selenium_server_up(status_url, timeout=60)
+
+    def new_driver(self, options):
+        return webdriver.Remote(command_executor=f'http://localhost:{self.webdriver_port}/wd/hub', options=options)
+
+    def stop(self):
+        selenium_docker_ctrl('stop', self.container_name, self.webdriver_port, self.vnc_port)
+
+    def for_worker(self, i):
+        # Extra workers get their own container on distinct ports (noVNC 7901..)
+        return DockerBackend(f"{self.container_name}-{i}", self.webdriver_port + i, self.vnc_port + i)
+
+
+class GridBackend(DriverBackend):
+    """An existing Selenium Grid hub (or standalone server), nothing to start or stop."""
+    name = 'grid'
+
+    def __init__(self, grid_url: str):
+        self.grid_url = grid_url
+
+    def new_driver(self, options):
+        return webdriver.Remote(command_executor=self.grid_url, options=options)
+
+
+class LocalChromeBackend(DriverBackend):
+    """
+    # Chrome launched on this machine through a local chromedriver: no container lifecycle and
+    # no network hop per command. Always headless. chromedriver is found by Selenium Manager
+    # unless chromedriver_path (env IEXWEB_CHROMEDRIVER) is given, chrome_binary (env IEXWEB_CHROME_BINARY) likewise.
+    """
+    name = 'local'
+
+    def __init__(self, chromedriver_path: Optional[str]=None, chrome_binary: Optional[str]=None):
+        self.chromedriver_path = chromedriver_path or os.environ.get('IEXWEB_CHROMEDRIVER')
+        self.chrome_binary = chrome_binary or os.environ.get('IEXWEB_CHROME_BINARY')
+
+    def new_driver(self, options):
+        if not any(argument.startswith('--headless') for argument in options.arguments):
+            options.add_argument('--headless=new')
+        if hasattr(os, 'geteuid') and os.geteuid() == 0:
+            options.add_argument('--no-sandbox')  # Chrome refuses to start as root with the sandbox
+        if self.chrome_binary:
+            options.binary_location = self.chrome_binary
+        service = ChromeService(executable_path=self.chromedriver_path) if self.chromedriver_path else ChromeService()
+        return webdriver.Chrome(service=service, options=options)
+
+
+def make_backend(name: Optional[str]=None, grid_url: Optional[str]=None) -> DriverBackend:
+    # --backend / IEXWEB_BACKEND, a Grid URL alone selects the grid backend
+    name = name or ('grid' if grid_url else 'docker')
+    if name == 'docker':
+        return DockerBackend()
+    if name == 'local':
+        return LocalChromeBackend()
+    if name == 'grid':
+        if not grid_url:
+            raise ValueError("the grid backend needs --grid-url (or env IEXWEB_GRID_URL)")
+        return GridBackend(grid_url)
+    raise ValueError(f"unknown driver backend {name!r}, expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,296 @@
+import time
+import html
+import random
+import secrets
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import urlsplit, parse_qs, urlencode
+from utils import setup_logger
+
+logger = setup_logger()
+
+FAKE_PORT = 8808
+PAGE_SIZES = (10, 25, 50, 100)
+SHIPNOTICE_SUBJECT = 'Accepted -Ship Notice'
+OTHER_SUBJECTS = ('Accepted -Invoice', 'Accepted -Purchase Order Acknowledgment', 'Delivered -Functional Acknowledgment')
+# Page assets like the real site's theme: (content type, size in bytes). The stylesheet pulls in the font.
+STATIC_ASSETS = {
+    'site.css': ('text/css', 120_000),
+    'site.woff2': ('font/woff2', 80_000),
+    'logo.png': ('image/png', 40_000),
+    'avatar.png': ('image/png', 25_000),
+}
+STATIC_HEAD = '<link rel="stylesheet" href="/ieweb/static/site.css">'
+
+
+class FakeMailbox:
+    """
+    # Synthetic sent mailbox: n_mails mails, newest first, a ship_notice_ratio share of them ship notices.
+    # Only (id, subject, creation time) is kept per mail, item documents are generated from the id on request,
+    # so tens of thousands of notices cost a few MB. Some ship notices are resent with the same ASN.
+    """
+    def __init__(self, n_mails: int=2000, ship_notice_ratio: float=0.6, resent_ratio: float=0.02, seed: int=0,
+                 newest: Optional[datetime]=None):
+        rng = random.Random(seed)
+        self.seed = seed
+        created = (newest or datetime.now()).replace(second=0, microsecond=0)
+        self.mails = []  # (id, subject, created, asn)
+        asns = []
+        for i in range(n_mails):
+            mail_id = 100000 + i
+            if rng.random() < ship_notice_ratio:
+                if asns and rng.random() < resent_ratio:
+                    asn = rng.choice(asns[-50:])
+                else:
+                    asn = f"ASN{700000 + len(asns)}"
+                    asns.append(asn)
+                self.mails.append((mail_id, f"{SHIPNOTICE_SUBJECT} {asn}", created, asn))
+            else:
+                self.mails.append((mail_id, f"{rng.choice(OTHER_SUBJECTS)} {mail_id}", created, None))
+            created -= timedelta(minutes=rng.randint(1, 180))
+        self.by_id = {mail[0]: mail for mail in self.mails}
+
+    @property
+    def oldest(self) -> datetime:
+        return self.mails[-1][2]
+
+    def listing(self, search: str='') -> List[tuple]:
+        if not search:
+            return self.mails
+        return [mail for mail in self.mails if search.lower() in mail[1].lower()]
+
+    def items_of(self, mail_id: int) -> List[dict]:
+        rng = random.Random(f"{self.seed}-{mail_id}")
+        items = []
+        for _ in range(rng.randint(1, 5)):
+            if rng.random() < 0.5:
+                items.append({'PO #': str(rng.randint(10000000, 99999999))})
+            else:
+                items.append({'Buyer Order #': f"O-{rng.randint(1000, 9999)}"})
+            items[-1]['Buyer Part #'] = f"BP-{rng.randint(1, 5000)}"
+            items[-1]['Ship Quantity'] = f"{rng.randint(1, 5000):,}"
+        return items
+
+
+def _format_created(created: datetime) -> str:
+    # Same format as the real site: 6/28/24 11:34 AM
+    return f"{created.month}/{created.day}/{created.strftime('%y')} {created.strftime('%I:%M %p').lstrip('0')}"
+
+
+def _layout(title: str, breadcrumb: str, section: str) -> str:
+    # body/div[1] header, body/div[2] with aside[1] (menu) and aside[2] (breadcrumb + content section)
+    return f"""<!DOCTYPE html>
+<html><head><title>iExchangeWeb - {title}</title>{STATIC_HEAD}</head><body>
+<div class="header"><img src="/ieweb/static/logo.png" alt="iExchangeWeb"><img src="/ieweb/static/avatar.png" alt=""></div>
+<div class="wrapper">
+<aside class="left-side"><section><ul><li><a href="inbox">Mailbox</a><ul><li><a href="sent">Sent</a></li></ul></li></ul></section></aside>
+<aside class="right-side"><ol class="breadcrumb"><li>Mailbox</li><li>{breadcrumb}</li></ol>
+<section class="content">{section}</section>
+</aside></div></body></html>"""
+
+
+def login_page(error: bool=False) -> str:
+    error_div = '<div id="login_error" style="display:block">Invalid username or password</div>' if error else ''
+    return f"""<!DOCTYPE html>
+<html><head><title>iExchangeWeb - Login</title>{STATIC_HEAD}</head><body>
+<div id="login-box"><form method="post" action="/ieweb/general/login">
+<input id="userName" name="userName" type="text"><input id="password" name="password" type="password">
+<button type="submit" class="btn btn-primary">Sign In</button></form>{error_div}</div>
+</body></html>"""
+
+
+# Page scripts of the listing variants: a view button that only calls a function (no URL in the row)
+# and a search box that filters the rows of the current page in place (the URL does not change)
+OPEN_ITEM_JS = "function openItem(id) { location.href = '/ieweb/mailbox/item?id=' + id; }"
+FILTER_ROWS_JS = """function filterRows(query) {
+    document.querySelectorAll('section.content table tbody tr').forEach(tr => {
+        if (!tr.children[9].textContent.toLowerCase().includes(query.toLowerCase())) tr.remove();
+    });
+    return false;
+}"""
+
+
+def sent_page(mailbox: FakeMailbox, page: int, size: int, search: str, inplace_search: bool=False, script_view: bool=False) -> str:
+    mails = mailbox.listing(search)
+    n_pages = max((len(mails) + size - 1) // size, 1)
+    rows = []
+    for mail_id, subject, created, _ in mails[(page - 1) * size: page * size]:
+        fillers = ''.join(f"<td>{value}</td>" for value in ('<input type="checkbox">', 'EDI', 'Partner', '856', 'X12', '', '', 'Sent', ''))
+        onclick = "openItem(this.dataset.id)" if script_view else f"location.href='/ieweb/mailbox/item?id={mail_id}'"
+        view = f"""<button type="button" class="btn btn-xs" data-id="{mail_id}" onclick="{onclick}">View</button>"""
+        rows.append(f"<tr>{fillers}<td>{html.escape(subject)}</td><td>{_format_created(created)}</td><td></td><td></td><td>{view}</td></tr>")
+
+    if not rows:
+        rows.append('<tr class="odd"><td valign="top" colspan="14" class="dataTables_empty">No data available in table</td></tr>')
+
+    def page_link(n):
+        return 'sent?' + urlencode({'page': n, 'size': size, **({'search': search} if search else {})})
+    # ul: li[1] Previous, li[2..7] page numbers, li[8] Next (the crawler's NEXT_PAGE_XPATH)
+    first = max(1, min(page - 2, n_pages - 5))
+    numbers = [n for n in range(first, first + 6)]
+    items = ['<li class="disabled"><a href="#">Previous</a></li>' if page == 1 else f'<li><a href="{page_link(page - 1)}">Previous</a></li>']
+    for n in numbers:
+        if n <= n_pages:
+            items.append(f'<li{" class=active" if n == page else ""}><a href="{page_link(n)}">{n}</a></li>')
+        else:
+            items.append('<li class="disabled"><a href="#"></a></li>')
+    items.append('<li class="disabled"><a href="#">Next</a></li>' if page >= n_pages else f'<li><a href="{page_link(page + 1)}">Next</a></li>')
+
+    options = ''.join(f'<option value="{n}"{" selected" if n == size else ""}>{n}</option>' for n in PAGE_SIZES)
+    onsubmit = ' onsubmit="return filterRows(this.search.value)"' if inplace_search else ''
+    controls = f"""<form method="get" action="sent"{onsubmit}><input type="search" name="search" value="{html.escape(search)}" placeholder="Search">
+<select name="size" onchange="this.form.submit()">{options}</select></form>"""
+    scripts = [js for js, used in ((OPEN_ITEM_JS, script_view), (FILTER_ROWS_JS, inplace_search)) if used]
+    header = ''.join(f"<th>{name}</th>" for name in ('', 'Type', 'Partner', 'Doc', 'Standard', '', '', 'Status', '', 'Subject', 'Creation Date', '', '', ''))
+    section = f"""<div><table class="table"><thead><tr>{header}</tr></thead><tbody>{''.join(rows)}</tbody></table>
+<div>{controls}</div><div><ul class="pagination">{''.join(items)}</ul></div></div>{''.join(f"<script>{js}</script>" for js in scripts)}"""
+    return _layout('Sent', 'Sent', section)
+
+
+def item_page(mail_id: int) -> str:
+    return _layout('Item', 'Sent', f'<div><iframe id="contentFrame" src="document?id={mail_id}" width="100%" height="800"></iframe></div>')
+
+
+def static_asset(name: str) -> bytes:
+    content_type, size = STATIC_ASSETS[name]
+    if name.endswith('.css'):
+        rule = "@font-face{font-family:Site;src:url(site.woff2) format('woff2')} body{font-family:Site,sans-serif}\n"
+        return (rule + '/*' + 'x' * (size - len(rule) - 4) + '*/').encode('utf-8')
+    return bytes(size)
+
+
+def _caption_table(pairs) -> str:
+    # table/tbody/tr/td[1]/table with caption/data cells, the layout shipnotice_parser walks
+    rows = ''.join(f'<tr><td class="caption">{html.escape(caption)}</td><td class="data">{value}</td></tr>' for caption, value in pairs)
+    return f"<table><tbody><tr><td><table><tbody>{rows}</tbody></table></td></tr></tbody></table>"
+
+
+def document_page(mailbox: FakeMailbox, mail_id: int) -> str:
+    _, _, created, asn = mailbox.by_id[mail_id]
+    tables = ['<table><tbody><tr><td><h3>Ship Notice</h3></td></tr></tbody></table>',
+              _caption_table([('Ship To', f"Store #{mail_id % 40}<br>{mail_id % 900} Main St")]),
+              _caption_table([('Ship Notice #', asn), ('Create Date/Time', _format_created(created)), ('Ship Date', created.strftime('%m/%d/%Y'))])]
+    for item in mailbox.items_of(mail_id):
+        tables.append(_caption_table(item.items()))
+    return f"<html><head><title>Ship Notice</title></head><body>{''.join(tables)}</body></html>"
+
+
+class FakeIExWebServer:
+    """
+    # Local stand-in for the iExchangeWeb pages the crawler touches: login box, mailbox/inbox, the paginated
+    # mailbox/sent table (with search and rows-per-page controls) and mailbox/item with its contentFrame document.
+    # Any non-empty username/password pair logs in, unless username/password are given.
+    # Static assets (stylesheet, font, images) are served after asset_delay seconds, to stand in for their network cost.
+    # inplace_search and script_view switch the sent mail page to the variants of sent_page.
+    """
+    def __init__(self, mailbox: FakeMailbox, port: int=FAKE_PORT, username: str=None, password: str=None, host: str='0.0.0.0',
+                 asset_delay: float=0.0, inplace_search: bool=False, script_view: bool=False):
+        self.mailbox = mailbox
+        self.asset_delay = asset_delay
+        self.inplace_search = inplace_search
+        self.script_view = script_view
+        self.port = port
+        self.host = host
+        self.username = username
+        self.password = password
+        self.sessions = set()
+        self.server = None
+
+    def serve_in_background(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self.port = self.server.server_address[1]  # port=0 picks a free one (tests)
+        threading.Thread(target=self.server.serve_forever, name='fake-iexweb', daemon=True).start()
+        logger.info(f"fake iExchangeWeb serving {len(self.mailbox.mails)} mails on port {self.port}")
+        return self
+
+    def shutdown(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, body='', headers=None, content_type='text/html; charset=utf-8'):
+                data = body if isinstance(body, bytes) else body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _logged_in(self):
+                cookies = dict(part.strip().split('=', 1) for part in (self.headers.get('Cookie') or '').split(';') if '=' in part)
+                return cookies.get('IEWEBSESSION') in fake.sessions
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+                if parts.path.startswith('/ieweb/static/'):
+                    name = parts.path.rsplit('/', 1)[1]
+                    if name not in STATIC_ASSETS:
+                        return self._reply(404, 'not found')
+                    time.sleep(fake.asset_delay)
+                    return self._reply(200, static_asset(name), {'Cache-Control': 'no-store'}, STATIC_ASSETS[name][0])
+                if parts.path in ('/', '/ieweb/general/login'):
+                    return self._reply(200, login_page())
+                if not self._logged_in():
+                    return self._reply(302, headers={'Location': '/ieweb/general/login'})
+                if parts.path == '/ieweb/mailbox/inbox':
+                    return self._reply(200, _layout('Inbox', 'Inbox', '<div><table class="table"><tbody></tbody></table></div>'))
+                if parts.path == '/ieweb/mailbox/sent':
+                    page, size = int(query.get('page', 1)), int(query.get('size', PAGE_SIZES[0]))
+                    return self._reply(200, sent_page(fake.mailbox, page, size, query.get('search', ''), fake.inplace_search, fake.script_view))
+                if parts.path in ('/ieweb/mailbox/item', '/ieweb/mailbox/document'):
+                    mail_id = int(query.get('id', 0))
+                    if mail_id not in fake.mailbox.by_id:
+                        return self._reply(404, 'not found')
+                    if parts.path.endswith('item'):
+                        return self._reply(200, item_page(mail_id))
+                    return self._reply(200, document_page(fake.mailbox, mail_id))
+                self._reply(404, 'not found')
+
+            def do_POST(self):
+                if urlsplit(self.path).path != '/ieweb/general/login':
+                    return self._reply(404, 'not found')
+                length = int(self.headers.get('Content-Length') or 0)
+                form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+                username, password = form.get('userName', ''), form.get('password', '')
+                valid = username and password and (fake.username is None or (username, password) == (fake.username, fake.password))
+                if not valid:
+                    return self._reply(200, login_page(error=True))
+                token = secrets.token_hex(16)
+                fake.sessions.add(token)
+                self._reply(302, headers={'Location': '/ieweb/mailbox/inbox', 'Set-Cookie': f'IEWEBSESSION={token}; Path=/ieweb'})
+
+            def log_message(self, format, *args):
+                pass  # one line per request would dominate the log during benchmarks
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a synthetic iExchangeWeb mailbox for offline crawling and benchmarks.")
+    parser.add_argument('--mails', type=int, default=2000, help="Number of sent mails to generate.")
+    parser.add_argument('--ship-notice-ratio', type=float, default=0.6, help="Share of the mails that are ship notices.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=FAKE_PORT)
+    parser.add_argument('--asset-delay', type=float, default=0.0, help="Seconds before each stylesheet, font or image is served.")
+    parser.add_argument('--inplace-search', action='store_true', help="The search box filters the listed rows without reloading the page.")
+    parser.add_argument('--script-view', action='store_true', help="View buttons open the item page from a script, the rows carry no item URL.")
+    args = parser.parse_args()
+
+    mailbox = FakeMailbox(args.mails, args.ship_notice_ratio, seed=args.seed)
+    server = FakeIExWebServer(mailbox, args.port, asset_delay=args.asset_delay, inplace_search=args.inplace_search,
+                              script_view=args.script_view).serve_in_background()
+    print(f"Fake iExchangeWeb on http://localhost:{args.port}/ieweb/general/login, {len(mailbox.mails)} mails back to {mailbox.oldest}. Hit Ctrl-C to stop.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,137 @@
+import re
+from html.parser import HTMLParser
+from typing import Callable, Iterator, List, Optional
+
+# Elements that never have a closing tag
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+# Elements whose boundaries become line breaks in rendered text (what Selenium's element.text returns)
+BLOCK_TAGS = {"address", "article", "aside", "blockquote", "div", "dl", "dt", "dd", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+              "header", "hr", "li", "ol", "p", "pre", "section", "table", "tbody", "thead", "tfoot", "tr", "ul", "caption"}
+SKIP_TEXT_TAGS = {"script", "style", "head", "title", "noscript"}
+
+
+class Node:
+    """A minimal element node. Children are Nodes or text strings, in document order."""
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(self, tag, attrs=None, parent=None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.children = []
+        self.parent = parent
+
+    @property
+    def classes(self) -> List[str]:
+        return (self.attrs.get("class") or "").split()
+
+    def element_children(self, tag: Optional[str]=None) -> List["Node"]:
+        return [c for c in self.children if isinstance(c, Node) and (tag is None or c.tag == tag)]
+
+    def iter_descendants(self) -> Iterator["Node"]:
+        # depth first, document order (same order as find_elements)
+        stack = list(reversed(self.element_children()))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.element_children()))
+
+    def find_all(self, predicate: Callable[["Node"], bool]) -> List["Node"]:
+        return [n for n in self.iter_descendants() if predicate(n)]
+
+    def find(self, predicate: Callable[["Node"], bool]) -> Optional["Node"]:
+        for n in self.iter_descendants():
+            if predicate(n):
+                return n
+        return None
+
+    def find_by_class(self, class_name: str) -> List["Node"]:
+        # equivalent of find_elements(By.CLASS_NAME, class_name)
+        return self.find_all(lambda n: class_name in n.classes)
+
+    def following_siblings(self) -> List["Node"]:
+        if self.parent is None:
+            return []
+        siblings = self.parent.element_children()
+        return siblings[siblings.index(self) + 1:]
+
+    @property
+    def text(self) -> str:
+        # Approximates Selenium's element.text: whitespace collapsed, block boundaries and <br> become newlines,
+        # every line stripped and blank lines dropped.
+        parts = []
+        def walk(node):
+            for child in node.children:
+                if isinstance(child, str):
+                    parts.append(child)
+                elif child.tag in SKIP_TEXT_TAGS:
+                    continue
+                elif child.tag == "br":
+                    parts.append("\n")
+                else:
+                    is_block = child.tag in BLOCK_TAGS
+                    if is_block: parts.append("\n")
+                    walk(child)
+                    if is_block: parts.append("\n")
+                    elif child.tag in ("td", "th"): parts.append(" ")
+        walk(self)
+        raw = "".join(parts).replace("\xa0", " ")
+        lines = (" ".join(line.split()) for line in raw.split("\n"))
+        return "\n".join(line for line in lines if line)
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document")
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr" and self.stack[-1].tag == "table":
+            # browsers insert the implicit <tbody>, do the same so raw server HTML matches page_source
+            tbody = Node("tbody", parent=self.stack[-1])
+            self.stack[-1].children.append(tbody)
+            self.stack.append(tbody)
+        node = Node(tag, {k: (v if v is not None else "") for k, v in attrs}, parent=self.stack[-1])
+        self.stack[-1].children.append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        node = Node(tag, {k: (v if v is not None else "") for k, v in attrs}, parent=self.stack[-1])
+        self.stack[-1].children.append(node)
+
+    def handle_endtag(self, tag):
+        # close up to the matching open element, ignore stray end tags
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+
+def parse_html(html: str) -> Node:
+    """Parse a serialized DOM (e.g. driver.page_source) into a Node tree rooted at '#document'."""
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def select_first(node: Node, path: str) -> Optional[Node]:
+    """Resolve a simple XPath of child steps such as 'html/body/div[2]/aside[2]' (tag names with optional position)."""
+    nodes = [node]
+    for step in path.strip("/").split("/"):
+        match = re.fullmatch(r"([\w-]+)(?:\[(\d+)\])?", step)
+        if match is None:
+            raise ValueError(f"unsupported path step: {step}")
+        tag, position = match.group(1), match.group(2)
+        next_nodes = []
+        for n in nodes:
+            children = n.element_children(tag)
+            if position:
+                children = children[int(position) - 1:int(position)]
+            next_nodes.extend(children)
+        nodes = next_nodes
+    return nodes[0] if nodes else None
@@ -0,0 +1,81 @@
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from html_dom import parse_html
+from sentmail_listing import parse_sentmail_listing_html, parse_next_page_url
+from shipnotice_parser import ShipNoticeRow, parse_shipnotice_html
+from utils import setup_logger, setup_hot_logger
+
+logger = setup_logger()
+hot_logger = setup_hot_logger()  # per-notice / per-page messages
+
+
+class UnexpectedPageError(Exception):
+    """Raised when a fetched document does not look like the page the crawler expected (e.g. the login page)."""
+    pass
+
+
+class HttpFetcher:
+    """
+    # Fetch sent mail pages and contentFrame documents with plain HTTP, reusing the cookies of the
+    # logged-in Selenium session. The browser is then only needed for login (and as a fallback).
+    # URLs are taken from the pages themselves, so it works the same against a local stand-in server.
+    """
+    def __init__(self, max_workers:int=8, timeout:int=30, archive=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.archive = archive  # DocumentArchive, every fetched contentFrame document is stored in it
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def load_driver_session(self, driver):
+        # Copy the authenticated cookies and the user agent from the WebDriver session
+        for cookie in driver.get_cookies():
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        self.session.headers['User-Agent'] = driver.execute_script("return navigator.userAgent;")
+
+    def get(self, url:str) -> Tuple[str, str]:
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        if 'login-box' in response.text or '/login' in response.url:
+            raise UnexpectedPageError(f"got the login page for {url}, session expired?")
+        return response.url, response.text
+
+    def scan_listing(self, url:str) -> Tuple[List[dict], Optional[str]]:
+        # Rows of one sent mail page and the URL of the next page (None if pagination needs the browser)
+        final_url, html = self.get(url)
+        rows = parse_sentmail_listing_html(html, final_url)
+        if rows is None:
+            raise UnexpectedPageError(f"no sent mail table at {url}")
+        return rows, parse_next_page_url(html, final_url)
+
+    def fetch_item(self, item_url:str, crawled_ASN:set) -> List[ShipNoticeRow]:
+        final_url, html = self.get(item_url)
+        iframe = parse_html(html).find(lambda n: n.tag == 'iframe' and n.attrs.get('id') == 'contentFrame')
+        if iframe is None or not iframe.attrs.get('src'):
+            raise UnexpectedPageError(f"iframe with ID 'contentFrame' not found at {item_url}")
+        _, frame_html = self.get(urljoin(final_url, iframe.attrs['src']))
+        if self.archive is not None:
+            self.archive.put(frame_html, item_url=item_url)
+        try:
+            return parse_shipnotice_html(frame_html, crawled_ASN)
+        except ValueError as e:
+            raise UnexpectedPageError(f"unexpected contentFrame document at {item_url}: {e}")
+
+    def fetch_items(self, item_urls:List[str], crawled_ASN:set) -> List[Optional[List[ShipNoticeRow]]]:
+        """
+        # Fetch and parse item pages concurrently (at most max_workers requests in flight).
+        # Returns rows per item in the given order, None for items that must be retried with the browser.
+        """
+        def fetch(item_url):
+            try:
+                return self.fetch_item(item_url, crawled_ASN)
+            except (UnexpectedPageError, requests.RequestException) as e:
+                hot_logger.info("http fetch fell back to the browser for %s: %r", item_url, e)
+                return None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(fetch, item_urls))
@@ -1,18 +1,25 @@
 import tkinter as tk
 from tkinter import messagebox
 from core_logic import SeleniumApp
-from datetime import datetime
+from startup import BackgroundStartup
+from datetime import datetime, timedelta
 from utils import setup_logger
 
 logger = setup_logger()
 
 def main():
+    # Boot the browser while the form is being filled in
+    startup = BackgroundStartup().start()
+    submitted = False
+
     def on_submit():
+        nonlocal submitted
         username = username_entry.get()
         password = password_entry.get()
         crawl_year = crawl_year_entry.get()
         crawl_month = crawl_month_entry.get()
         crawl_day = crawl_day_entry.get()
+        crawl_to = crawl_to_entry.get().strip()
 
         # Check if any field is empty
         if not username or not password or not crawl_year or not crawl_month or not crawl_day:
@@ -25,15 +32,26 @@ def main():
         except ValueError:
             messagebox.showerror("Error", "Invalid date! Please enter a valid date.")
             return
+        # Optional end of the date window, the day itself is included
+        try:
+            crawlto_time = datetime.strptime(crawl_to, "%Y-%m-%d") + timedelta(days=1) if crawl_to else None
+        except ValueError:
+            messagebox.showerror("Error", "Invalid crawl-to date! Please use YYYY-MM-DD or leave it empty.")
+            return
+        if crawlto_time is not None and crawlto_time <= crawluntil_time:
+            messagebox.showerror("Error", "The crawl-to date must not be before the target date.")
+            return
 
         messagebox.showinfo("Info", "You can hit Ctrl+C to safely terminate the program anytime. ")
-        messagebox.showwarning("Warning", "Data will only be saved if the program has finished running. ")
+        messagebox.showinfo("Info", "Rows are saved page by page. If the run stops, tick 'Resume interrupted crawl' next time to continue it. ")
+        resume = resume_var.get()
 
         # Close the GUI after getting input
+        submitted = True
         root.destroy()
 
         # If all inputs are valid, proceed to run the crawler
-        app = SeleniumApp(username, password, crawluntil_time)
+        app = SeleniumApp(username, password, crawluntil_time, resume=resume, startup=startup, crawlto_time=crawlto_time)
         app.run()
 
     root = tk.Tk()
@@ -61,10 +79,20 @@ def main():
     crawl_day_entry = tk.Entry(root)
     crawl_day_entry.grid(row=5, column=1)
 
+    tk.Label(root, text="Crawl to (YYYY-MM-DD, optional):").grid(row=6, column=0)
+    crawl_to_entry = tk.Entry(root)
+    crawl_to_entry.grid(row=6, column=1)
+
+    resume_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(root, text="Resume interrupted crawl", variable=resume_var).grid(row=7, columnspan=2)
+
     submit_button = tk.Button(root, text="Run Crawler", command=on_submit)
-    submit_button.grid(row=6, columnspan=2)
+    submit_button.grid(row=8, columnspan=2)
 
     root.mainloop()
+    if not submitted:
+        # window closed without running the crawler
+        startup.shutdown()
 
 if __name__ == "__main__":
     main()
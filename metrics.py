@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import bisect
+import random
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List
+from utils import setup_logger
+
+logger = setup_logger()
+
+METRICS_FOLDER = 'metrics'
+# Upper bounds (seconds) of the latency histogram buckets, the last bucket is everything slower
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+# Samples kept per histogram for the percentiles, a uniform random sample of everything observed
+RESERVOIR_SIZE = 1024
+# SeleniumHelper steps timed as stages. Everything they send to the browser is also counted per WebDriver command.
+HELPER_STAGES = (
+    'setup_selenium_env', 'init_webdriver', 'attach_webdriver', 'login_iExWeb', 'restore_session', 'resume_login',
+    'navigate_sentmail', 'use_listing_controls', 'seek_window_start', 'scan_sentmail_rows', 'click_view_button',
+    'fetch_current_item_html', 'parse_item_html',
+)
+
+
+class Histogram:
+    """
+    # Latency samples of one kind (e.g. per notice), summarized as percentiles and bucket counts.
+    # Memory stays fixed however long the run (the service re-crawls for days, every WebDriver command is one sample):
+    # count, total, min, max and the buckets are exact, the percentiles come from a reservoir of RESERVOIR_SIZE samples.
+    """
+    def __init__(self, reservoir_size: int=RESERVOIR_SIZE):
+        self.reservoir_size = reservoir_size
+        self.reservoir: List[float] = []
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        self.random = random.Random()
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        self.buckets[bisect.bisect_left(HISTOGRAM_BUCKETS, seconds)] += 1
+        if len(self.reservoir) < self.reservoir_size:
+            self.reservoir.append(seconds)
+        else:
+            # reservoir sampling: the n-th sample replaces a kept one with probability size/n
+            slot = self.random.randrange(self.count)
+            if slot < self.reservoir_size:
+                self.reservoir[slot] = seconds
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {'count': 0}
+        ordered = sorted(self.reservoir)
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+        return {
+            'count': self.count,
+            'total': round(self.total, 4),
+            'mean': round(self.total / self.count, 4),
+            'min': round(self.min, 4),
+            'p50': round(percentile(0.5), 4),
+            'p90': round(percentile(0.9), 4),
+            'p99': round(percentile(0.99), 4),
+            'max': round(self.max, 4),
+            'buckets': {**{f"le_{bound}": count for bound, count in zip(HISTOGRAM_BUCKETS, self.buckets)}, 'le_inf': self.buckets[-1]},
+        }
+
+
+class RunMetrics:
+    """
+    # Timings of one crawl run: stages (container boot, login, listing, item fetch, parsing, ...),
+    # every WebDriver command by name (count and time), and latency histograms (per notice, per page).
+    # Thread safe, the browser boots in a background thread. Written as JSON by write_json() at the end of the run.
+    """
+    def __init__(self):
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.stages: Dict[str, Histogram] = {}
+        self.commands: Dict[str, Histogram] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+
+    @staticmethod
+    def _observe(table: Dict[str, Histogram], name: str, seconds: float):
+        if name not in table:
+            table[name] = Histogram()
+        table[name].observe(seconds)
+
+    def observe(self, name: str, seconds: float):
+        with self.lock:
+            self._observe(self.histograms, name, seconds)
+
+    def count(self, name: str, n: int=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self._observe(self.stages, name, elapsed)
+
+    def instrument_driver(self, driver):
+        # Every WebDriver command (get, findElement, switchToFrame, executeScript, ...) goes through driver.execute
+        if getattr(driver, '_metrics_instrumented', False):
+            return
+        execute = driver.execute
+        def timed_execute(driver_command, params=None):
+            start = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    self._observe(self.commands, driver_command, elapsed)
+        driver.execute = timed_execute
+        driver._metrics_instrumented = True
+
+    def instrument_helper(self, helper):
+        # Time the SeleniumHelper steps as stages, and instrument the driver as soon as one is created or attached
+        for name in HELPER_STAGES:
+            method = getattr(helper, name, None)
+            if method is None:
+                continue
+            def timed(*args, _name=name, _method=method, **kwargs):
+                with self.stage(_name):
+                    result = _method(*args, **kwargs)
+                if helper.driver is not None:
+                    self.instrument_driver(helper.driver)
+                return result
+            setattr(helper, name, functools.wraps(method)(timed))
+        helper.metrics = self
+
+    def summary(self) -> dict:
+        with self.lock:
+            commands = {name: hist.summary() for name, hist in sorted(self.commands.items())}
+            return {
+                'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+                'wall_seconds': round(time.time() - self.started_at, 3),
+                'stages': {name: hist.summary() for name, hist in self.stages.items()},
+                'webdriver': {
+                    'commands': sum(c['count'] for c in commands.values()),
+                    'seconds': round(sum(c.get('total', 0) for c in commands.values()), 3),
+                    'by_command': commands,
+                },
+                'histograms': {name: hist.summary() for name, hist in self.histograms.items()},
+                'counters': dict(self.counters),
+            }
+
+    def write_json(self, filepath: str=None, label: str=None) -> str:
+        if filepath is None:
+            folderpath = os.path.join(os.getcwd(), METRICS_FOLDER)
+            os.makedirs(folderpath, exist_ok=True)
+            suffix = f"-{label}" if label else ''  # runs started in the same second (batch jobs) keep their own file
+            filepath = os.path.join(folderpath, f"run-{datetime.fromtimestamp(self.started_at).strftime('%Y%m%d-%H%M%S')}{suffix}.json")
+        summary = self.summary()
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        notices = summary['histograms'].get('notice_seconds', {}).get('count', 0)
+        logger.info(f"metrics: {summary['webdriver']['commands']} WebDriver commands, {notices} notices, written to {filepath}")
+        return filepath
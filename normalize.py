@@ -0,0 +1,76 @@
+import os
+import pandas as pd
+from typing import Tuple
+from shipnotice_parser import SHIPNOTICE_COLUMNS, REQUIRED_COLUMNS
+from utils import setup_logger
+
+logger = setup_logger()
+
+CREATE_DATETIME_FORMAT = "%m/%d/%y %I:%M %p"  # e.g. 6/28/24 11:34 AM, same as utils.parse_creation_date
+STRING_COLUMNS = ("ship_to", "ship_notice_num", "order_num", "buyer_part_num")
+
+
+def parse_create_datetime(values: pd.Series) -> pd.Series:
+    # Whole column at once, NaT where the text doesn't parse.
+    # Every item row of a notice repeats its creation time, so only the distinct strings are parsed.
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values  # already typed (read back from the parquet output)
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(pd.Index(uniques, dtype=object), format=CREATE_DATETIME_FORMAT, errors='coerce')
+    return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT), index=values.index)
+
+
+def parse_ship_quantity(values: pd.Series) -> pd.Series:
+    # "1,200" -> 1200.0, NaN where the text isn't a number
+    return pd.to_numeric(values.astype('string').str.replace(',', '', regex=False).str.strip(), errors='coerce').astype('Float64')
+
+
+def normalize_shipnotices(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    # Post-crawl cleanup of the scraped rows, one vectorized pass per column:
+    # trims the text columns, parses create_datetime and ship_quantity, rejects rows that miss a required
+    # column or don't parse, and keeps only the newest notice of every ASN (the crawl order doesn't matter).
+    # Returns (clean typed frame, rejected rows with a 'reject_reason' column).
+    """
+    raw = df.reindex(columns=list(SHIPNOTICE_COLUMNS))
+    clean = pd.DataFrame(index=raw.index)
+    for col in STRING_COLUMNS:
+        clean[col] = raw[col].astype('string').str.strip().replace('', pd.NA)
+    clean['create_datetime'] = parse_create_datetime(raw['create_datetime'])
+    clean['ship_quantity'] = parse_ship_quantity(raw['ship_quantity'])
+    clean = clean[list(SHIPNOTICE_COLUMNS)]
+
+    # One reason per rejected row: the first check it fails
+    reason = pd.Series(pd.NA, index=raw.index, dtype='string')
+    for col in REQUIRED_COLUMNS:
+        missing = raw[col].astype('string').str.strip().fillna('') == ''
+        reason = reason.mask(reason.isna() & missing, f'missing {col}')
+    reason = reason.mask(reason.isna() & clean['create_datetime'].isna(), 'invalid create_datetime')
+    reason = reason.mask(reason.isna() & clean['ship_quantity'].isna(), 'invalid ship_quantity')
+    rejected_mask = reason.notna()
+    rejects = raw[rejected_mask].assign(reject_reason=reason[rejected_mask])
+    clean = clean[~rejected_mask]
+
+    # Duplicate ASNs: a resent ship notice replaces the older one. Identical item rows within
+    # one notice are separate line items and stay.
+    newest = clean.groupby('ship_notice_num', sort=False)['create_datetime'].transform('max')
+    deduped = clean[clean['create_datetime'] == newest]
+    if len(deduped) < len(clean):
+        logger.info(f"normalize: dropped {len(clean) - len(deduped)} rows of duplicate ASNs")
+    if len(rejects):
+        logger.info(f"normalize: rejected {len(rejects)} rows, {rejects['reject_reason'].value_counts().to_dict()}")
+    return deduped, rejects
+
+
+def store_normalized(clean: pd.DataFrame, rejects: pd.DataFrame, filepath: str, output_format: str='csv') -> Tuple[str, str]:
+    # Next to the raw output: <name>-normalized.<format> and <name>-rejects.csv (only if rows were rejected)
+    stem = os.path.splitext(filepath)[0]
+    clean_filepath = f"{stem}-normalized.{output_format}"
+    if output_format == 'parquet':
+        clean.to_parquet(clean_filepath, compression='zstd')
+    else:
+        clean.to_csv(clean_filepath, index_label='id')
+    rejects_filepath = f"{stem}-rejects.csv"
+    if len(rejects):
+        rejects.to_csv(rejects_filepath, index_label='id')
+    return clean_filepath, rejects_filepath
@@ -0,0 +1,84 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from typing import Iterable, List
+from shipnotice_parser import SHIPNOTICE_COLUMNS, ShipNoticeRow
+from normalize import parse_create_datetime, parse_ship_quantity
+from utils import setup_logger
+
+logger = setup_logger()
+
+PARTITION_COLUMN = 'create_date'
+
+SHIPNOTICE_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('ship_to', pa.string()),
+    ('ship_notice_num', pa.string()),
+    ('create_datetime', pa.timestamp('s')),
+    ('order_num', pa.string()),
+    ('buyer_part_num', pa.string()),
+    ('ship_quantity', pa.float64()),
+    (PARTITION_COLUMN, pa.string()),
+])
+
+
+def shipnotice_table(rows: List[ShipNoticeRow], first_id: int=0) -> pa.Table:
+    # Typed Arrow table of scraped rows: create_datetime as a timestamp, ship_quantity as a number.
+    # Values that don't parse become nulls instead of failing the batch (the raw text stays in the CSV mode).
+    df = pd.DataFrame([row.as_tuple() for row in rows], columns=list(SHIPNOTICE_COLUMNS), dtype=object)
+    df.insert(0, 'id', range(first_id, first_id + len(df)))
+    df['create_datetime'] = parse_create_datetime(df['create_datetime'])
+    df['ship_quantity'] = parse_ship_quantity(df['ship_quantity'])
+    df[PARTITION_COLUMN] = df['create_datetime'].dt.strftime('%Y-%m-%d').fillna('unknown')
+    return pa.Table.from_pandas(df, schema=SHIPNOTICE_SCHEMA, preserve_index=False)
+
+
+class ParquetRowSink:
+    """
+    # Same interface as CsvRowSink, but every flush writes a compressed Parquet part per creation date
+    # under <dirpath>/create_date=YYYY-MM-DD/ (hive partitioning), with the typed SHIPNOTICE_SCHEMA.
+    # Readers can then load only the columns and dates they need, e.g.
+    # pd.read_parquet(dirpath, columns=[...], filters=[('create_date', '>=', '2024-06-01')]).
+    """
+    def __init__(self, dirpath: str, batch_size: int=2000, compression: str='zstd'):
+        self.filepath = dirpath
+        self.batch_size = batch_size
+        self.compression = compression
+        self.buffer: List[ShipNoticeRow] = []
+        self.count = 0  # rows written so far, also the next id
+        self.parts = 0
+        if os.path.exists(dirpath):
+            # resuming an interrupted crawl: keep adding parts after the rows already saved
+            dataset = ds.dataset(dirpath, format='parquet', partitioning='hive')
+            self.count = dataset.count_rows()
+            self.parts = len(dataset.files)
+
+    def write(self, rows: Iterable[ShipNoticeRow]):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        table = shipnotice_table(self.buffer, self.count)
+        pq.write_to_dataset(table, self.filepath, partition_cols=[PARTITION_COLUMN], compression=self.compression,
+                            basename_template=f"part-{self.parts:05d}-{{i}}.parquet")
+        self.parts += 1
+        self.count += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        if self.count == 0:
+            print('No ship notice crawled!')
+        else:
+            logger.info(f"wrote {self.count} rows to {self.filepath}")
+
+    def to_dataframe(self):
+        self.flush()
+        if self.count == 0:
+            return pd.DataFrame(columns=[name for name in SHIPNOTICE_SCHEMA.names if name != PARTITION_COLUMN])
+        return pd.read_parquet(self.filepath).drop(columns=[PARTITION_COLUMN]).set_index('id').sort_index()
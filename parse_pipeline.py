@@ -0,0 +1,72 @@
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+from shipnotice_parser import ShipNoticeRow, parse_shipnotice_html
+from utils import setup_logger
+
+logger = setup_logger()
+
+
+def _parse_document(html: str) -> Tuple[List[ShipNoticeRow], float]:
+    # Runs in a parse worker process. ASN de-duplication happens when the results are merged in listing order.
+    start = time.perf_counter()
+    rows = parse_shipnotice_html(html, set())
+    return rows, time.perf_counter() - start
+
+
+class ParsePipeline:
+    """
+    # Overlaps parsing with browser navigation: the driver thread only pulls raw contentFrame documents
+    # and submits them here, a process pool parses them while the browser loads the next item page.
+    # At most max_pending documents are in flight, submit() blocks when the parse workers fall behind.
+    """
+    def __init__(self, processes: int=None, max_pending: int=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.processes
+        self.executor = ProcessPoolExecutor(max_workers=self.processes)
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.futures = {}  # listing position -> future of the current batch
+        # throughput bookkeeping
+        self.documents = 0
+        self.fetch_seconds = 0.0  # driver time spent loading item pages
+        self.parse_seconds = 0.0  # worker time spent parsing
+        self.wall_seconds = 0.0
+
+    def submit(self, position: int, html: str, fetch_seconds: float=0.0):
+        self.slots.acquire()
+        future = self.executor.submit(_parse_document, html)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures[position] = future
+        self.fetch_seconds += fetch_seconds
+
+    def collect(self, batch_start: float) -> List[Tuple[int, List[ShipNoticeRow]]]:
+        # Wait for the batch, results come back sorted by listing position
+        results = []
+        for position in sorted(self.futures):
+            rows, parse_seconds = self.futures[position].result()
+            self.parse_seconds += parse_seconds
+            self.documents += 1
+            results.append((position, rows))
+        self.futures = {}
+        self.wall_seconds += time.time() - batch_start
+        return results
+
+    def report(self):
+        if not self.documents:
+            return
+        # Not a measurement of the sequential path: it assumes fetch and parse would run back to back on the
+        # driver thread at the speed they ran here (the parse time is taken in the workers, without pickling).
+        # bench_crawl.py --parse-workers N times both paths on the same mailbox.
+        sequential_seconds = self.fetch_seconds + self.parse_seconds
+        speedup = sequential_seconds / self.wall_seconds if self.wall_seconds else 0
+        message = (f"parse pipeline: {self.documents} documents in {self.wall_seconds:.2f}s "
+                   f"({self.documents / self.wall_seconds:.2f}/s) with {self.processes} parse workers, "
+                   f"estimated sequential time {sequential_seconds:.2f}s (fetch {self.fetch_seconds:.2f}s + parse {self.parse_seconds:.2f}s), "
+                   f"estimated speedup x{speedup:.2f} (not measured)")
+        print(message)
+        logger.info(message)
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
@@ -0,0 +1,72 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional
+from doc_archive import ARCHIVE_FOLDER, archived_notices, read_document
+from shipnotice_parser import ShipNoticeRow, parse_shipnotice_html, merge_notice_rows
+from row_sink import CsvRowSink
+from utils import setup_logger, make_shipfolder
+
+logger = setup_logger()
+
+
+def _reparse_document(path: str) -> Optional[List[ShipNoticeRow]]:
+    # Runs in a worker process: read, decompress and parse one archived document. None if it does not parse.
+    try:
+        return parse_shipnotice_html(read_document(path), set())
+    except (OSError, ValueError) as e:
+        logger.error(f"could not reparse {path}: {repr(e)}")
+        return None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Rebuild the ship notice output from the document archive, without a browser")
+    arg_parser.add_argument("--archive", default=os.path.join(os.getcwd(), ARCHIVE_FOLDER), help="Archive folder written by crawls with --archive")
+    arg_parser.add_argument("--account", help="Only the notices of this username (default: every account in the archive)")
+    arg_parser.add_argument("--from", dest="created_from", help="YYYY-MM-DD, only notices created on or after this day")
+    arg_parser.add_argument("--to", dest="created_to", help="YYYY-MM-DD, only notices created up to this day")
+    arg_parser.add_argument("--processes", type=int, default=os.cpu_count(), help="Parse worker processes (default: all cores)")
+    arg_parser.add_argument("--format", dest="output_format", default="csv", choices=["csv", "parquet"])
+    arg_parser.add_argument("--output", help="Output file (csv) or folder (parquet), default shipnotices/ship-notices-reparse-<timestamp>")
+    args = arg_parser.parse_args()
+
+    try:
+        created_from = datetime.strptime(args.created_from, "%Y-%m-%d").isoformat() if args.created_from else None
+        # the end day is included
+        created_to = (datetime.strptime(args.created_to, "%Y-%m-%d") + timedelta(days=1)).isoformat() if args.created_to else None
+    except ValueError as e:
+        print(f'Invalid date: {e}')
+        return
+    notices = archived_notices(args.archive, args.account, created_from, created_to)
+    if not notices:
+        print('No archived documents match.')
+        return
+    output = args.output or os.path.join(make_shipfolder(), f"ship-notices-reparse-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{args.output_format}")
+    if args.output_format == 'parquet':
+        from parquet_sink import ParquetRowSink  # pyarrow is only needed for this format
+        sink = ParquetRowSink(output)
+    else:
+        sink = CsvRowSink(output)
+
+    start = time.perf_counter()
+    failed = 0
+    # Results come back in archive order (newest first), ASN de-duplication keeps the newest notice like a crawl
+    crawled_ASN = {acct: set() for acct, _ in notices}
+    paths = [path for _, path in notices]
+    with ProcessPoolExecutor(max_workers=args.processes) as executor:
+        chunksize = max(1, len(paths) // (4 * args.processes))
+        for (acct, _), rows in zip(notices, executor.map(_reparse_document, paths, chunksize=chunksize)):
+            if rows is None:
+                failed += 1
+                continue
+            sink.write(merge_notice_rows([rows], crawled_ASN[acct]))
+    sink.close()
+    elapsed = time.perf_counter() - start
+    print(f"Reparsed {len(paths)} documents into {sink.count} rows in {elapsed:.2f}s "
+          f"({len(paths) / elapsed:.0f} documents/s, {args.processes} processes), {failed} failed. Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import os
+import csv
+import pandas as pd
+from typing import Iterable, List
+from shipnotice_parser import SHIPNOTICE_COLUMNS, ShipNoticeRow
+from utils import setup_logger
+
+logger = setup_logger()
+
+
+class CsvRowSink:
+    """
+    # Streams ship notice rows to a CSV file in batches while the crawl runs, so memory stays flat
+    # and rows scraped before a failure are already on disk. The file is only created once there is a row.
+    """
+    def __init__(self, filepath: str, batch_size: int=200, idx_label: str='id'):
+        self.filepath = filepath
+        self.batch_size = batch_size
+        self.idx_label = idx_label
+        self.buffer: List[ShipNoticeRow] = []
+        self.count = 0  # rows written so far, also the next id
+        if os.path.exists(filepath):
+            # resuming an interrupted crawl: keep appending after the rows already saved
+            with open(filepath, newline='', encoding='utf-8') as f:
+                self.count = max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+    def write(self, rows: Iterable[ShipNoticeRow]):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        new_file = not os.path.exists(self.filepath)
+        with open(self.filepath, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow([self.idx_label, *SHIPNOTICE_COLUMNS])
+            for row in self.buffer:
+                writer.writerow([self.count, *row.as_tuple()])
+                self.count += 1
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        if self.count == 0:
+            print('No ship notice crawled!')
+        else:
+            logger.info(f"wrote {self.count} rows to {self.filepath}")
+
+    def to_dataframe(self):
+        # Build the DataFrame once, from the finished file (only when a caller needs one)
+        self.flush()
+        if self.count == 0:
+            return pd.DataFrame(columns=list(SHIPNOTICE_COLUMNS))
+        return pd.read_csv(self.filepath, index_col=self.idx_label, dtype=str, keep_default_na=False)
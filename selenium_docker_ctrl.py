@@ -14,7 +14,7 @@ def check_docker_installed():
         print('\nDocker is not installed. Please install Docker at https://docs.docker.com/get-docker/')
         raise
 
-def start_container(client, image_name, container_name):
+def start_container(client, image_name, container_name, webdriver_port=4444, vnc_port=7900):
     # Check if the Docker image exists locally
     try:
         client.images.get(image_name)
@@ -36,8 +36,10 @@ def start_container(client, image_name, container_name):
             image_name,
             name=container_name,
             detach=True,
-            ports={'4444/tcp': 4444, '7900/tcp': 7900},
-            shm_size="2g"
+            ports={'4444/tcp': webdriver_port, '7900/tcp': vnc_port},
+            shm_size="2g",
+            # lets the browser reach a server on the host, e.g. the fake_iexweb.py stand-in
+            extra_hosts={'host.docker.internal': 'host-gateway'}
         )
         logger.info(f"Container {container_name} started successfully.")
 
@@ -52,13 +54,13 @@ def stop_container(client, container_name):
         logger.info(f"\nContainer {container_name} not found, cannot stop.")
         raise
 
-def selenium_docker_ctrl(action):
+def selenium_docker_ctrl(action, container_name="selenium-chrome-container", webdriver_port=4444, vnc_port=7900):
+    # Extra containers (e.g. for a crawl worker pool) use their own name and host ports
     client = docker.from_env()
     image_name = "selenium/standalone-chrome"
-    container_name = "selenium-chrome-container"
     if action=='start':
         print('Starting selenium docker...')
-        start_container(client, image_name, container_name)
+        start_container(client, image_name, container_name, webdriver_port, vnc_port)
     elif action=='stop':
         print('Stopping selenium docker...')
         stop_container(client, container_name)
@@ -69,6 +71,9 @@ def selenium_docker_ctrl(action):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Start or stop a Docker container for Selenium Chrome.")
     parser.add_argument('action', choices=['start', 'stop'], help="Action to perform on the Docker container.")
+    parser.add_argument('--name', default="selenium-chrome-container", help="Docker container name.")
+    parser.add_argument('--webdriver-port', type=int, default=4444, help="Host port for the WebDriver endpoint.")
+    parser.add_argument('--vnc-port', type=int, default=7900, help="Host port for noVNC.")
     args = parser.parse_args()
 
-    selenium_docker_ctrl(args.action)
\ No newline at end of file
+    selenium_docker_ctrl(args.action, args.name, args.webdriver_port, args.vnc_port)
\ No newline at end of file
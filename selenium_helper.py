@@ -1,19 +1,27 @@
 import os
 import requests
 import time
+import itertools
 from selenium import webdriver
 from selenium.webdriver.common.by import By 
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import ElementClickInterceptedException
-from selenium_docker_ctrl import selenium_docker_ctrl, check_docker_installed
-from utils import format_elapsed_seconds, setup_logger, parse_creation_date, format_elapsed_seconds
-import pandas as pd
+from selenium.common.exceptions import ElementClickInterceptedException, NoSuchElementException, TimeoutException
+from driver_backend import DockerBackend
+from utils import format_elapsed_seconds, setup_logger, setup_hot_logger, parse_creation_date, format_elapsed_seconds
+from shipnotice_parser import REQUIRED_COLUMNS, ShipNoticeRow, parse_shipnotice_html, merge_notice_rows
+from row_sink import CsvRowSink
+from http_fetch import UnexpectedPageError
+from daemon_client import release_daemon_session
+from dom_wait import wait_for_dom, FRAME_HTML_JS
+from browser_profile import chrome_options, block_url_patterns, url_patterns, IMAGE_EXTENSIONS, FONT_EXTENSIONS, STYLESHEET_EXTENSIONS
+from sentmail_listing import SCAN_SENTMAIL_JS, SENTMAIL_TABLE_XPATH, SENTMAIL_PAGE_CONDITIONS, NEXT_PAGE_XPATH, SHIPNOTICE_SUBJECT_PREFIX, PROBE_LISTING_CONTROLS_JS, APPLY_LISTING_CONTROLS_JS, select_shipnotice_rows, resolve_item_targets, learn_item_url_template, learn_page_url_template, page_url_from_template
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 timeout = 60
 logger = setup_logger()
+hot_logger = setup_hot_logger()  # per-notice / per-page messages
 
 class MyLoginError(Exception):
     """Exception raised for errors in the login process."""
@@ -26,79 +34,77 @@ class MaxAttemptsExceededError(Exception):
     def __init__(self, message="Exceeded max login attempts."):
         super().__init__(message)
 
+class AttachedRemote(webdriver.Remote):
+    """Remote WebDriver that attaches to an existing session (e.g. the browser daemon's) instead of creating one."""
+    def __init__(self, command_executor, session_id, options):
+        self._attach_session_id = session_id
+        super().__init__(command_executor=command_executor, options=options)
+
+    def start_session(self, capabilities, *args, **kwargs):
+        self.session_id = self._attach_session_id
+        self.caps = {}
+
 class SeleniumHelper:
-    def __init__(self, script_start_time):
+    def __init__(self, script_start_time, backend=None, lean_profile=False):
         self.driver = None
+        self.lean_profile = lean_profile  # headless, eager page loads, no images/fonts/stylesheets (browser_profile.py)
+        self.backend = backend or DockerBackend()  # where the browser runs (driver_backend.py), None once attached to the daemon
+        self.daemon_url = None  # set when the session is leased from the browser daemon
         self.logged_in = False
         self.homeurl = None
+        self.username = None
+        self.item_url_template = None  # learned from the first click-through when rows carry only a message id
+        self.metrics = None  # RunMetrics, set by RunMetrics.instrument_helper
+        self.archive = None  # DocumentArchive keeping every fetched item document (--archive)
         self.script_run_time = script_start_time
     
-    @staticmethod
-    def is_selenium_server_up(url):
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                return True
-        except requests.exceptions.ConnectionError:
-            return False
-        return False
-
-    @staticmethod
-    def wait_until_selenium_server_up(selenium_url, timeout = timeout):
-        # Wait for the Selenium server to be ready
-        # timeout=Total wait time (seconds)
-        poll_interval = 2  # Time between polls (seconds)
-        start_time = time.time()
+    def setup_selenium_env(self):
+        # Get the browser host ready: boot the Selenium container (docker backend), nothing for local Chrome or a Grid
+        self.backend.start()
 
-        while time.time() - start_time < timeout:
-            if SeleniumHelper.is_selenium_server_up(selenium_url):
-                print("Selenium server is up and running.")
-                break
-            print("Waiting for Selenium server to start...")
-            time.sleep(poll_interval)
-        else:
-            raise RuntimeError("Selenium server did not start within the timeout period.")
-
-    @staticmethod
-    def setup_selenium_env():
-        # Setup Selenium Docker Environment
-        check_docker_installed()        
-        selenium_url = 'http://localhost:7900/?autoconnect=1&resize=scale&password=secret'
-        # Stop container first if previous execution failed to stop selenium docker. 
-        if SeleniumHelper.is_selenium_server_up(selenium_url):   
-            selenium_docker_ctrl('stop')        
-        selenium_docker_ctrl('start')
-        SeleniumHelper.wait_until_selenium_server_up(selenium_url, timeout=60)
-
-
-    def init_webdriver(self, timeout=timeout):
-        # giving the path of chromedriver to selenium webdriver
-        # Set up Chrome options
-        poll_interval = 2  # Time between polls (seconds)
+    def init_webdriver(self, timeout=timeout, command_executor=None):
+        # Open a session on the backend, or on the given Selenium server URL
+        poll_interval = 0.1  # Time between attempts (seconds), backs off to 1s
         start_time = time.time()
 
         while time.time() - start_time < timeout:
             try:
-                chrome_options = webdriver.ChromeOptions()
-                chrome_options.add_argument("--disable-features=SidePanelPinning")
-                chrome_options.add_argument("--incognito")
-                self.driver = webdriver.Remote(
-                    command_executor='http://localhost:4444/wd/hub',
-                    options=chrome_options
-                )
+                options = chrome_options(self.lean_profile)
+                if command_executor:
+                    self.driver = webdriver.Remote(command_executor=command_executor, options=options)
+                else:
+                    self.driver = self.backend.new_driver(options)
+                if self.lean_profile:
+                    block_url_patterns(self.driver, url_patterns(IMAGE_EXTENSIONS + FONT_EXTENSIONS))
                 return
-            except:
+            except Exception as e:
+                logger.info(f'WebDriver session not created yet: {repr(e)}')
                 print(f'Driver not yet initialized, please WAIT until timeout={timeout} seconds.')
                 time.sleep(poll_interval)
+                poll_interval = min(poll_interval * 2, 1.0)
         else:
             raise RuntimeError("Selenium server did not start within the timeout period.")
 
-    def quit_scraper(self):
-        if self.driver:
+    def attach_webdriver(self, command_executor, session_id, daemon_url):
+        # Attach to the warm session of the browser daemon (no container boot, no new Chrome)
+        self.driver = AttachedRemote(command_executor, session_id, webdriver.ChromeOptions())
+        self.driver.switch_to.window(self.driver.window_handles[0])
+        self.daemon_url = daemon_url
+        self.backend = None  # the daemon owns the browser and its container
+
+    def quit_scraper(self, prompt=True):
+        # prompt=False for unattended runs (batch jobs), which must not wait on stdin or exit the process
+        if self.daemon_url:
+            # leave browser and container running for the next run
+            release_daemon_session(self.daemon_url, self.homeurl if self.logged_in else None, self.username)
+        elif self.driver:
             self.driver.quit()
-        selenium_docker_ctrl('stop')
+        if self.backend:
+            self.backend.stop()
         elapsed_seconds = time.time() - self.script_run_time
         print(f'script run time = {format_elapsed_seconds(elapsed_seconds)}')
+        if not prompt:
+            return
         input("\nPress Enter to exit...")
         print("Have a Nice Day!  (Exiting...)")
         exit(1)
@@ -107,22 +113,47 @@ class SeleniumHelper:
     def check_login_athome(self):
         # Wait for either login success (URL contains 'mailbox/inbox') or login failure (login_error element)
         print("Check for login status at homepage")
-        WebDriverWait(self.driver, 60).until(
-            lambda d: ("mailbox/inbox" in d.current_url) or 
-                    EC.visibility_of_element_located((By.ID, "login_error"))(d)
-        )
+        wait_for_dom(self.driver, [{'url': 'mailbox/inbox'}, {'css': '#login_error', 'visible': True}], timeout=60, any_of=True)
         
         # Check if login was successful by URL
         if "mailbox/inbox" in self.driver.current_url:
             print("Login successful! Now at homepage. ")
             self.logged_in = True
             self.homeurl = self.driver.current_url
+            self.block_stylesheets()
             return
         elif EC.visibility_of_element_located((By.ID, "login_error"))(self.driver):
             raise MyLoginError
         else:
             raise Exception("Unexpected Login Error: Login Failed but Login Error Element not present.")
 
+    def resume_login(self, homeurl, timeout=10) -> bool:
+        # A session that is still logged in lands on the inbox, an expired one on the login box
+        self.logged_in = False
+        self.driver.get(homeurl)
+        wait_for_dom(self.driver, [{'url': 'mailbox/inbox'}, {'css': '#login-box'}], timeout=timeout, any_of=True)
+        if "mailbox/inbox" in self.driver.current_url:
+            print("Still logged in! Now at homepage. ")
+            self.logged_in = True
+            self.homeurl = self.driver.current_url
+            self.block_stylesheets()
+        return self.logged_in
+
+    def block_stylesheets(self):
+        # Lean profile: stylesheets are blocked only once logged in, the login check relies on
+        # the site's css to tell whether the login error box is visible
+        if self.lean_profile:
+            block_url_patterns(self.driver, url_patterns(IMAGE_EXTENSIONS + FONT_EXTENSIONS + STYLESHEET_EXTENSIONS))
+
+    def restore_session(self, url, cached) -> bool:
+        # Load cached session cookies into the browser instead of typing the credentials.
+        # Cookies can only be added for the current domain, so open the login page first.
+        self.driver.get(url)
+        for cookie in cached['cookies']:
+            self.driver.add_cookie({k: v for k, v in cookie.items() if k != 'sameSite' or v in ('Strict', 'Lax', 'None')})
+        self.username = cached['username']
+        return self.resume_login(cached['homeurl'])
+
     def login_iExWeb(self, url, username, password, attempts=3):
         def login():
             # opening the website in chrome.
@@ -131,17 +162,17 @@ class SeleniumHelper:
 
             assert "iExchangeWeb" in self.driver.title, "not iExchangeWeb"
 
-            loginBox = WebDriverWait(self.driver, timeout).until( \
-                EC.presence_of_element_located((By.ID, "login-box")))
+            # the login box, both inputs and the submit button, in one wait
+            wait_for_dom(self.driver, [{'css': '#login-box #userName'}, {'css': '#login-box #password'},
+                                       {'css': '#login-box .btn-primary', 'visible': True}], timeout=timeout)
+            loginBox = self.driver.find_element(By.ID, "login-box")
             
             # find username input box
-            userNameForm = WebDriverWait(loginBox, timeout).until( \
-                EC.presence_of_element_located((By.ID, "userName")))
+            userNameForm = loginBox.find_element(By.ID, "userName")
             userNameForm.send_keys(username)
             
             # find password input box
-            passwordForm = WebDriverWait(loginBox, timeout).until( \
-                EC.presence_of_element_located((By.ID, "password")))
+            passwordForm = loginBox.find_element(By.ID, "password")
             passwordForm.send_keys(password)
             # find submit button
             signin_button = WebDriverWait(loginBox, timeout).until(
@@ -151,6 +182,7 @@ class SeleniumHelper:
             # click the submit button
             signin_button.click()
         
+        self.username = username
         max_attempts=attempts
         while attempts > 0:
             if max_attempts>1:
@@ -176,19 +208,9 @@ class SeleniumHelper:
     
     def check_sentmailpage_status(self):
         try:
-            # Check if the URL contains 'mailbox/sent'
-            WebDriverWait(self.driver, 60).until(
-                EC.url_contains('mailbox/sent')
-            )
+            # The URL contains 'mailbox/sent' and the "Sent" text appears in the upper bar
+            wait_for_dom(self.driver, SENTMAIL_PAGE_CONDITIONS, timeout=60)
             logger.info('Successfully navigated to the Sent Mail page!')
-
-            # Check if the "Sent" text appears in the upper bar
-            WebDriverWait(self.driver, 60).until(
-                EC.text_to_be_present_in_element(
-                    (By.XPATH, "/html/body/div[2]/aside[2]/ol/li[2]"), "Sent"
-                )
-            )
-            logger.info('"Sent" text is visible in the upper bar.')
         except Exception as e:
             raise RuntimeError(f"Failed to verify Sent Mail page status: {e}")
 
@@ -210,22 +232,165 @@ class SeleniumHelper:
 
 
     def __getSentmailrows(self):
-        # need to make sure is in sentmail page.
-        self.check_sentmailpage_status()
+        # need to make sure is in sentmail page, with the table rows rendered.
+        try:
+            wait_for_dom(self.driver, SENTMAIL_PAGE_CONDITIONS + [{'xpath': SENTMAIL_TABLE_XPATH + '/tbody/tr', 'visible': True}], timeout=60)
+        except Exception as e:
+            raise RuntimeError(f"Failed to verify Sent Mail page status: {e}")
         # Locate the <tbody> tag where the table is at, and get all the rows. 
-        table = WebDriverWait(self.driver, 60).until(
-            EC.visibility_of_element_located((By.XPATH, "/html/body/div[2]/aside[2]//section[@class='content']//table"))
-        )
-        tbody = WebDriverWait(table, 60).until(
-            EC.visibility_of_element_located((By.TAG_NAME, 'tbody'))
-        )    
-        rows = WebDriverWait(tbody, 60).until(
-            EC.visibility_of_all_elements_located((By.TAG_NAME, 'tr'))
-        )
+        return self.driver.find_elements(By.XPATH, SENTMAIL_TABLE_XPATH + '/tbody/tr')
+
+
+    def scan_sentmail_rows(self, timeout=60) -> List[dict]:
+        """
+        # Read subject, creation date, row index and view-button target of every row on the current
+        # sent mail page in a single script call (instead of several WebDriverWaits per row).
+        """
+        # need to make sure is in sentmail page, with the table rows rendered (an empty mailbox has its placeholder row).
+        wait_for_dom(self.driver, SENTMAIL_PAGE_CONDITIONS + [{'xpath': SENTMAIL_TABLE_XPATH + '/tbody/tr'}], timeout=timeout)
+        rows = self.driver.execute_script(SCAN_SENTMAIL_JS, SENTMAIL_TABLE_XPATH)
+        if rows is None:
+            raise TimeoutException("sent mail table rows disappeared after the wait")
         return rows
 
+    def use_listing_controls(self) -> dict:
+        """
+        # Let the site do the listing work when the sent mail page has the controls for it: select the largest
+        # rows-per-page option and search for the ship notice subject, so every page load returns as many
+        # ship notice rows as the site allows. Each control is kept only if the listed rows show it worked and the
+        # page URL carries it: the listing is reloaded later (click-through fallback, page URL jumps) and a control
+        # applied in place would be lost, with row indexes that no longer match. Else the listing is restored
+        # and the client-side filter (select_shipnotice_rows) does the job alone.
+        # Returns what is in use: {'page_size': rows per page or None, 'server_filter': bool}.
+        """
+        used = {'page_size': None, 'server_filter': False}
+        listing_url = self.driver.current_url
+        try:
+            controls = self.driver.execute_script(PROBE_LISTING_CONTROLS_JS)
+            rows = self.scan_sentmail_rows()
+        except Exception as e:
+            logger.info(f'listing controls probe failed: {repr(e)}')
+            return used
+        logger.info(f'listing controls: {controls}')
+
+        def apply(size, query, before, timeout=10):
+            # Apply and wait until the listed rows change (page reload or in-place redraw), None if they don't
+            def changed_rows(d):
+                try:
+                    scanned = d.execute_script(SCAN_SENTMAIL_JS, SENTMAIL_TABLE_XPATH)
+                except Exception:
+                    return None  # page is reloading
+                return scanned if scanned and scanned != before else None
+            self.driver.execute_script(APPLY_LISTING_CONTROLS_JS, size, query)
+            try:
+                return WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(changed_rows)
+            except TimeoutException:
+                return None
+
+        def restore():
+            self.driver.get(listing_url)
+            self.check_sentmailpage_status()
+
+        def in_url():
+            # the reload of the new URL shows the same listing, an in-place redraw keeps the old URL
+            return self.driver.current_url != listing_url
+
+        largest = max(controls['page_sizes'], default=None)
+        if largest and largest > (controls['page_size'] or 0):
+            sized = apply(largest, None, rows)
+            if sized is not None and len(sized) > len(rows) and in_url():
+                used['page_size'] = largest
+                rows = sized
+                listing_url = self.driver.current_url
+            else:
+                restore()
+        if controls['search']:
+            filtered = apply(None, SHIPNOTICE_SUBJECT_PREFIX, rows)
+            if filtered and all((row['subject'] or '').startswith(SHIPNOTICE_SUBJECT_PREFIX) for row in filtered) and in_url():
+                used['server_filter'] = True
+            else:
+                restore()
+        if used['page_size'] or used['server_filter']:
+            print(f"Using the site's listing controls: {used['page_size'] or 'default'} rows per page, server-side filter {'on' if used['server_filter'] else 'off'}.")
+        else:
+            logger.info('no usable listing controls, filtering the sent mail rows client-side')
+        return used
 
-    def get_shipnotice_idxs(self, crawluntil:datetime) -> List[int]:
+    def current_next_page_url(self) -> Optional[str]:
+        # href of the pagination "Next" link on the current sent mail page, None if it is javascript only
+        try:
+            href = (self.driver.find_element(By.XPATH, NEXT_PAGE_XPATH).get_attribute('href') or '').strip()
+        except NoSuchElementException:
+            return None
+        if not href or href.endswith('#') or href.lower().startswith('javascript'):
+            return None
+        return href
+
+    def scan_sentmail_page(self, page_url:str, fetcher=None, timeout=10):
+        # Rows and next page URL of any sent mail page, [] for a page past the end of the mailbox
+        if fetcher is not None:
+            try:
+                return fetcher.scan_listing(page_url)
+            except (UnexpectedPageError, requests.RequestException) as e:
+                logger.info(f"http listing fell back to the browser at {page_url}: {repr(e)}")
+        self.driver.get(page_url)
+        try:
+            rows = self.scan_sentmail_rows(timeout=timeout)
+        except TimeoutException:
+            rows = []
+        return rows, self.current_next_page_url()
+
+    def seek_window_start(self, crawlto:datetime, fetcher=None):
+        """
+        # For a "from X to Y" crawl: find the first sent mail page (newest first) holding mail created before crawlto
+        # without walking the newer pages. Page URLs are learned from the "Next" link, then pages are probed
+        # by their oldest creation date: doubling jumps to bracket the boundary, binary search inside.
+        # Returns (0-based page, page URL), (0, first page) if pages are not addressable by URL,
+        # None if the whole mailbox is newer than crawlto.
+        """
+        first_url = self.driver.current_url
+        rows, next_url = self.scan_sentmail_page(first_url, fetcher, timeout=60)
+        if not rows or parse_creation_date(rows[-1]['creation_date']) < crawlto:
+            return 0, first_url
+        learned = learn_page_url_template(next_url, first_url)
+        if learned is None:
+            logger.info('sent mail pages are not addressable by URL, walking the pages from the first one')
+            return 0, first_url
+        template, second_page_value = learned
+
+        oldest = {}  # page -> creation date of its oldest row, None past the end
+        def before_window_end(page):
+            if page not in oldest:
+                page_rows, _ = self.scan_sentmail_page(page_url_from_template(template, second_page_value, page), fetcher)
+                oldest[page] = parse_creation_date(page_rows[-1]['creation_date']) if page_rows else None
+                logger.info(f'window search probed page {page+1}: oldest mail {oldest[page]}')
+            return oldest[page] is None or oldest[page] < crawlto
+
+        lo, step = 0, 1  # page lo is entirely newer than crawlto
+        while not before_window_end(lo + step):
+            lo += step
+            step *= 2
+        hi = lo + step
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if before_window_end(mid):
+                hi = mid
+            else:
+                lo = mid
+        if oldest[hi] is None:
+            return None
+        print(f'Date window starts at page {hi+1} ({len(oldest)+1} pages probed).')
+        return hi, page_url_from_template(template, second_page_value, hi)
+
+    def sentmail_page_url(self, page:int, fetcher=None) -> Optional[str]:
+        # URL of the 0-based sent mail page, learned from the "Next" link of the current (first) page.
+        # None if pages are not addressable by URL.
+        first_url = self.driver.current_url
+        _, next_url = self.scan_sentmail_page(first_url, fetcher, timeout=60)
+        learned = learn_page_url_template(next_url, first_url)
+        return page_url_from_template(*learned, page) if learned else None
+
+    def get_shipnotice_rows(self, crawluntil:datetime) -> List[dict]:
         """
         # Inside sent mails, find the rows where Subject="Accepted -Ship Notice....."
         # If dev, use env var: daterange=> datetime.now().date()~os.environ["DEV_CRAWL_UNTIL"]
@@ -233,47 +398,48 @@ class SeleniumHelper:
         """
         if crawluntil is None:
             raise ValueError("crawluntil cannot be None")
-        # Set date format of 'creation_date' in iExchangeWeb
-        date_format = "%m/%d/%Y %I:%M %p"
-        
-        rows = self.__getSentmailrows()
-        ship_notice_idxs=[]
-        for i, row in enumerate(rows):
-            # get creationdate string and parse it to date object for comparison
-            creation_date_str = WebDriverWait(row, 60).until( \
-                EC.presence_of_element_located((By.XPATH, "./td[11]"))).text
-            creation_date = parse_creation_date(creation_date_str, date_format)
-            # stop including the idx if creation_date earlier than crawluntil
-            if creation_date < crawluntil: 
-                logger.info(f'early stop at creation_date: {creation_date}')
-                break            
-            # get the text that indicates shipnotice or not (column "subject") 
-            subject_str = WebDriverWait(row, 60).until( \
-                EC.presence_of_element_located((By.XPATH, "./td[10]"))).text
-            # find the rows that indicates its a ship notice
-            if subject_str.startswith('Accepted -Ship Notice'):
-                ship_notice_idxs.append(i)
-            else: continue
-        return ship_notice_idxs
-        
-    def crawl_shipnotices(self, shipnotice_idxs:List[int], df_shipNotice:pd.DataFrame, crawled_ASN:set) -> pd.DataFrame:
-        def check_EDIpage_status():
-            # Make sure that the navigated EDI item page is normal. 
-            # checks url and section element's presence
-            assert WebDriverWait(self.driver, 60).until(
-                    EC.url_contains('mailbox/item')
-            ), "url doesnt contain 'mailbox/item'"
-            assert WebDriverWait(self.driver, 60).until( \
-                EC.visibility_of_all_elements_located((By.XPATH, "/html/body/div[2]/aside[2]/section"))
-            ), "section XPATH not all elements are not visible"
+        # date cutoff and subject filter run locally over the scanned rows
+        return select_shipnotice_rows(self.scan_sentmail_rows(), crawluntil)
+
+    def get_shipnotice_idxs(self, crawluntil:datetime) -> List[int]:
+        return [row['index'] for row in self.get_shipnotice_rows(crawluntil)]
         
+    def scrape_current_item(self, crawled_ASN:set) -> List[ShipNoticeRow]:
+        """
+        # Scrape the EDI item page the driver is currently on. Returns the item rows of the ship notice.
+        """
+        return self.parse_item_html(self.fetch_current_item_html(), crawled_ASN)
+
+    def parse_item_html(self, html:str, crawled_ASN:set) -> List[ShipNoticeRow]:
+        # Extraction step of scrape_current_item, separate so it is timed apart from the browser work
+        return parse_shipnotice_html(html, crawled_ASN)
+
+    def fetch_current_item_html(self) -> str:
+        """
+        # Raw contentFrame document of the EDI item page the driver is currently on (parsed by the caller).
+        # With an archive, the document is also stored for offline re-parsing.
+        """
+        item_url = self.driver.current_url
+        html = self.__read_item_document()
+        if self.archive is not None:
+            self.archive.put(html, item_url=item_url)
+        return html
+
+    def __read_item_document(self) -> str:
+        def wait_for_EDIpage():
+            # Make sure that the navigated EDI item page is normal (url, section element visible) and that
+            # the contentFrame document has its tables, all in one wait.
+            # Returns False if the frame document is not readable from the page (cross-origin).
+            result = wait_for_dom(self.driver, [
+                {'url': 'mailbox/item', 'xpath': "/html/body/div[2]/aside[2]/section", 'visible': True},
+                {'frame': 'contentFrame', 'xpath': '/html/body/table'},
+            ], timeout=60)
+            return not result['inaccessible']
+
         def switch_to_iframe():
             # Need to Switch to iFrame first, because all the data (#document) is in under an iframe! 
             # Find the iframe element by id
-            iframe_locator = WebDriverWait(self.driver, 60).until(
-                EC.presence_of_element_located((By.ID, 'contentFrame'))
-            )
-            assert iframe_locator is not None, "iframe with ID 'contentFrame' not found"
+            iframe_locator = self.driver.find_element(By.ID, 'contentFrame')
             
             # Switch to the iframe context
             WebDriverWait(self.driver, 60).until(
@@ -281,188 +447,284 @@ class SeleniumHelper:
                 EC.frame_to_be_available_and_switch_to_it(iframe_locator)
             )
 
-        def get_tables_from_iframe():
-            # driver now represents iframe
-            ship_notice_body = WebDriverWait(self.driver, 60).until(
-                EC.presence_of_element_located((By.XPATH, '/html/body'))
-            )
-            
-            # get all tables
-            tables = WebDriverWait(ship_notice_body, 60).until(
-                EC.presence_of_all_elements_located((By.XPATH, './table'))
+        def get_iframe_source():
+            # driver now represents iframe. Wait until the tables are attached,
+            # then pull the whole document in one round-trip and parse it locally.
+            wait_for_dom(self.driver, [{'xpath': '/html/body/table'}], timeout=60)
+            return self.driver.page_source
+
+        if wait_for_EDIpage():
+            # Same-origin frame: pull its document without switching into it
+            html = self.driver.execute_script(FRAME_HTML_JS, 'contentFrame')
+            if html is not None:
+                return html
+        # Before getting the desired data, need to switch to iframe first
+        switch_to_iframe()
+        # Get the desired data
+        html = get_iframe_source()
+        self.driver.switch_to.default_content()
+        return html
+
+    def click_view_button(self, listing_url:str, idx:int):
+        # Fallback when a row has no item URL: open the EDI page with the view button of the row.
+        # Reload the listing page the row was scanned on (not always page 1) to avoid stale elements.
+        self.driver.get(listing_url)
+        row = self.__getSentmailrows()[idx]
+        try:
+            # Access through relative XPATH
+            view_button = WebDriverWait(row, 60).until(
+                EC.element_to_be_clickable((By.XPATH, './td[14]/button[1]'))
             )
-            assert tables is not None, "tables in ship_notice_body are not found!"
-            return tables
-
-        def crawl_tables_to_df(tables, df_shipNotice):
-            sharedAttr_dict = dict()
-            for j, table in enumerate(tables):
-                if j==0:
-                    ship_notice_title = WebDriverWait(table, 60).until(
-                        EC.presence_of_element_located((By.XPATH, './tbody/tr[1]/td/h1'))
-                    ).text
-                else:
-                    upperleftmost_element = WebDriverWait(table, 60).until(
-                        EC.presence_of_element_located((By.XPATH, "./tbody/tr/td[1]/table/tbody/tr[1]"))
-                    )
-                    upperleftmost_caption_element = WebDriverWait(upperleftmost_element, 60).until(
-                        EC.presence_of_element_located((By.CLASS_NAME, "caption"))
-                    )
-                    upperlefmost_caption = upperleftmost_caption_element.text.strip()
-                    if upperlefmost_caption == "Ship To":
-                        data_element = WebDriverWait(upperleftmost_caption_element, 60).until(
-                            EC.presence_of_element_located((By.XPATH, "following-sibling::td[@class='data']"))
-                        )
-                        sharedAttr_dict['ship_to'] = data_element.text
-                    elif upperlefmost_caption == "Ship Notice #":
-                        # get all elements with "caption" classes in the table.tbody element (table.tbody)
-                        all_caption_elements = WebDriverWait(table, 60).until(
-                            EC.presence_of_all_elements_located((By.CLASS_NAME, "caption"))
-                        )
-                        for count, caption_element in enumerate(all_caption_elements):
-                            if caption_element.text.strip() == 'Ship Notice #':
-                                # find sibling (data)
-                                data_element = WebDriverWait(caption_element, 60).until(
-                                    EC.presence_of_element_located((By.XPATH, "following-sibling::td[@class='data']"))
-                                )
-                                
-                                ASN = data_element.text
-                                # crawl from today no reverse, then if duplicate shipnotice#, skip return. 
-                                if ASN in crawled_ASN:
-                                    logger.info(f"skipped duplicate ASN {ASN}")
-                                    return df_shipNotice
-
-                                # verified that it's a uncrawled ship notice, include and continue
-                                sharedAttr_dict['ship_notice_num'] = ASN
-
-                            elif caption_element.text.strip() == 'Create Date/Time':
-                                # find sibling (data)
-                                data_element = WebDriverWait(caption_element, 60).until(
-                                    EC.presence_of_element_located((By.XPATH, "following-sibling::td[@class='data']"))
-                                )
-                                sharedAttr_dict['create_datetime'] = data_element.text
-                            elif count>=2: break
-                    elif "Order #" in upperlefmost_caption or "PO #" in upperlefmost_caption: # items
-                        itemAttr_dict = {}
-                        all_caption_elements = WebDriverWait(table, 60).until(
-                            EC.presence_of_all_elements_located((By.CLASS_NAME, "caption"))
-                        )
-                        
-                        # Specify wanted caption elements (wanted data attributes)
-                        wanted_keywords = {"Order #", "PO #", "Buyer Part #", "Ship Quantity"}
-                        wanted_caption_elements = []
-                        for caption_element in all_caption_elements:
-                            if len(wanted_caption_elements) > 3: break
-                            caption = caption_element.text
-                            # Check if the caption contains any of the wanted keywords
-                            if any(keyword in caption for keyword in wanted_keywords):
-                                wanted_caption_elements.append(caption_element)
-
-                        for caption_element in wanted_caption_elements:
-                            caption = caption_element.text
-                            if "Order #" in caption or "PO #" in caption:
-                                # find sibling (data)                                
-                                data_element = WebDriverWait(caption_element, 60).until(
-                                    EC.presence_of_element_located((By.XPATH, "following-sibling::td[@class='data']"))
-                                )
-                                if 'Order #' in caption:
-                                    # itemAttr_dict['order_type'] = 'Buyer'
-                                    itemAttr_dict['order_num'] = data_element.text
-                                else: # PO num
-                                    # itemAttr_dict['order_type'] = 'Purchase'
-                                    itemAttr_dict['order_num'] = data_element.text[:6] # first 6 digits
-                            elif 'Buyer Part #' in caption: 
-                                data_element = WebDriverWait(caption_element, 60).until(
-                                    EC.presence_of_element_located((By.XPATH, "following-sibling::td[@class='data']"))
-                                )
-                                itemAttr_dict['buyer_part_num'] = data_element.text
-                            elif 'Ship Quantity' in caption: 
-                                data_element = WebDriverWait(caption_element, 60).until(
-                                    EC.presence_of_element_located((By.XPATH, "following-sibling::td[@class='data']"))
-                                )
-                                itemAttr_dict['ship_quantity'] = data_element.text
-                        
-                        # combine a attributes for a single item at a column level
-                        df_row = pd.DataFrame.from_dict([{**sharedAttr_dict, **itemAttr_dict}])
-                        # concat items to a allItems ship notice list at a row level
-                        df_shipNotice = pd.concat([df_shipNotice, df_row], ignore_index=True)
-                    else: continue
-            return df_shipNotice
-        
-        
+            view_button.click()
+        except ElementClickInterceptedException:
+            # Click using JavaScript as a fallback. Occassionally there's an element blocking the button. 
+            hot_logger.info('Click using JavaScript as a fallback at idx=%s', idx)
+            self.driver.execute_script("arguments[0].click();", view_button)
+
+    def crawl_shipnotices(self, shipnotice_rows:List[dict], crawled_ASN:set, pool=None, fetcher=None, state=None, checkpoint=None, page=0, pipeline=None) -> List[ShipNoticeRow]:
+        """
+        # Visit the item page of every ship notice row found in the listing pass.
+        # Rows with a known 'mailbox/item' URL are opened directly in a second tab, so the listing page
+        # (whatever page number it is) stays loaded and is never reloaded per notice.
+        # With a CrawlWorkerPool, rows with a URL are scraped concurrently by the pool's sessions.
+        # With an HttpFetcher, rows with a URL are fetched without the browser first; the browser only
+        # handles the ones whose response did not look like a ship notice.
+        # With a CrawlCheckpoint, every extracted notice is journaled and notices extracted before an interruption are reused.
+        # With a ParsePipeline, the browser only pulls the item documents, parse workers parse them meanwhile.
+        # Returns the item rows of the page, newest notice first.
+        """
+        listing_handle = self.driver.current_window_handle
+        listing_url = self.driver.current_url
+        listing_reloaded = False
+        resolve_item_targets(shipnotice_rows, listing_url, self.item_url_template)
+        notices = [None] * len(shipnotice_rows)  # rows of every notice, in listing (newest first) order
+
+        def set_notice(i, notice):
+            notices[i] = notice
+            if checkpoint and notice is not None:
+                checkpoint.record_notice(page, shipnotice_rows[i], notice)
+
+        if checkpoint:
+            for i, row in enumerate(shipnotice_rows):
+                notices[i] = checkpoint.notice_rows(row)
+
+        if fetcher is not None:
+            positions = [i for i, row in enumerate(shipnotice_rows) if row['item_url'] and notices[i] is None]
+            fetched = fetcher.fetch_items([shipnotice_rows[i]['item_url'] for i in positions], crawled_ASN)
+            for i, notice in zip(positions, fetched):
+                set_notice(i, notice)
+            print(f'Fetched {sum(notice is not None for notice in fetched)} of {len(shipnotice_rows)} ship notices over http.')
+            if self.metrics:
+                self.metrics.count('http_notices', sum(notice is not None for notice in fetched))
+
+        if all(notice is not None for notice in notices):
+            if state:
+                state.record_notices(shipnotice_rows, notices)
+            return merge_notice_rows(notices, crawled_ASN)
         
-        # To avoid stale element exception, find all rows every iteration. Think of a better way later
-        sentmail_url = self.homeurl.replace("inbox", "sent")
-        # for i, idx in enumerate(reversed(shipnotice_idxs)): # reversed, start processing from earliest non-crawled date.
-        for i, idx in enumerate(shipnotice_idxs):  # dont reverse to make sure when skipping duplicate ASN we keep the newest. 
-            # Access EDI page using the view button in a single row. 
-            # To avoid stale element exception, go back to sentmail page and find all rows everytime.
-            self.driver.get(sentmail_url)
-            row = self.__getSentmailrows()[idx]
-            try:
-                # Access through relative XPATH
-                view_button = WebDriverWait(row, 60).until(
-                    EC.element_to_be_clickable((By.XPATH, './td[14]/button[1]'))
-                )
-                view_button.click()
-            except ElementClickInterceptedException:
-                # Click using JavaScript as a fallback. Occassionally there's an element blocking the button. 
-                logger.info(f'Click using JavaScript as a fallback at idx={idx}')
-                self.driver.execute_script("arguments[0].click();", view_button)
-            check_EDIpage_status()
+        self.driver.switch_to.new_window('tab')
+        item_handle = self.driver.current_window_handle
+        batch_start = time.time()
+        # for i, row in enumerate(reversed(shipnotice_rows)): # reversed, start processing from earliest non-crawled date.
+        for i, row in enumerate(shipnotice_rows):  # dont reverse to make sure when skipping duplicate ASN we keep the newest. 
+            if notices[i] is not None:
+                continue
+            idx = row['index']
+            fetch_start = time.time()
+            if row['item_url']:
+                if pool is not None:
+                    continue  # scraped by the pool below
+                self.driver.get(row['item_url'])
+            else:
+                # No URL for this row yet: click through once in the listing tab and learn the item URL pattern
+                self.driver.switch_to.window(listing_handle)
+                self.click_view_button(listing_url, idx)
+                listing_reloaded = True
+                template = learn_item_url_template(self.driver.current_url, row['message_id'])
+                if template and template != self.item_url_template:
+                    logger.info(f'learned item url template: {template}')
+                    self.item_url_template = template
+                    resolve_item_targets(shipnotice_rows[i+1:], listing_url, self.item_url_template)
             print(f'Navigated to edi page at row={idx}')
 
-            # Before getting the desired data, need to switch to iframe first
-            switch_to_iframe()
-
-            # Get the desired data
-            tables = get_tables_from_iframe()
-            df_shipNotice = crawl_tables_to_df(tables, df_shipNotice)
+            if pipeline is not None:
+                pipeline.submit(i, self.fetch_current_item_html(), time.time() - fetch_start)
+            else:
+                set_notice(i, self.scrape_current_item(crawled_ASN))
+            if self.metrics:
+                self.metrics.observe('notice_seconds', time.time() - fetch_start)
+            if self.driver.current_window_handle != item_handle:
+                self.driver.switch_to.window(item_handle)
             print(f"#{i+1} finished row {idx}! Total runtime at: {(time.time()-self.script_run_time):.2f}s")
-        self.driver.get(sentmail_url)
-        return df_shipNotice
 
-    def crawl_shipnotices_until(self, crawluntil_time:datetime, df_shipNotice:pd.DataFrame=pd.DataFrame(), maxpages:int=10) -> pd.DataFrame:
-        def navigate_to_next_page():
+        if pipeline is not None:
+            for i, notice in pipeline.collect(batch_start):
+                set_notice(i, notice)
+
+        if pool is not None:
+            positions = [i for i, notice in enumerate(notices) if notice is None]
+            if positions:
+                print(f'Scraping {len(positions)} ship notices with {len(pool.workers)} workers...')
+                pooled = pool.scrape_items([shipnotice_rows[i]['item_url'] for i in positions])
+                for i, notice in zip(positions, pooled):
+                    set_notice(i, notice)
+        
+        # Back to the listing page this batch of rows was found on
+        self.driver.close()
+        self.driver.switch_to.window(listing_handle)
+        if listing_reloaded:
+            self.driver.get(listing_url)
+
+        if state:
+            state.record_notices(shipnotice_rows, notices)
+        return merge_notice_rows(notices, crawled_ASN)
+
+    def crawl_shipnotices_until(self, crawluntil_time:datetime, sink:CsvRowSink, maxpages:Optional[int]=None, pool=None, fetcher=None, state=None, checkpoint=None, pipeline=None, crawlto_time:Optional[datetime]=None) -> Optional[int]:
+        """
+        # Crawl ship notices page by page until crawluntil_time (or the last page, or maxpages pages if given),
+        # streaming the rows into sink.
+        # Returns the number of rows written, None if the crawl failed (rows written so far stay in the sink).
+        # With a CrawlCheckpoint (resumed or fresh), notices already written by the interrupted run are skipped.
+        # With crawlto_time, only mail created in [crawluntil_time, crawlto_time) is crawled, starting at the page
+        # found by seek_window_start instead of the newest page.
+        """
+        def navigate_to_next_page() -> bool:
+            # False only on the last page (no "Next" link, or a disabled one). Any other failure raises:
+            # treating it as the last page would mark the older notices as covered by the high-water mark.
+            next_links = self.driver.find_elements(By.XPATH, NEXT_PAGE_XPATH)
+            if not next_links or 'disabled' in (next_links[0].find_element(By.XPATH, '..').get_attribute('class') or ''):
+                print("Reached the last sent mail page.")
+                return False
+            # Wait for the "Next" button to be clickable
+            next_button = WebDriverWait(self.driver, 10).until(
+                EC.visibility_of_element_located((By.XPATH, NEXT_PAGE_XPATH)),
+                EC.element_to_be_clickable((By.XPATH, NEXT_PAGE_XPATH))
+            )
             try:
-                # Wait for the "Next" button to be clickable
-                next_button = WebDriverWait(self.driver, 10).until(
-                    EC.visibility_of_element_located((By.XPATH, "/html/body/div[2]/aside[2]/section/div/div[2]/ul/li[8]/a")),
-                    EC.element_to_be_clickable((By.XPATH, "/html/body/div[2]/aside[2]/section/div/div[2]/ul/li[8]/a"))
-                )
                 next_button.click()
-                print("Navigating to the next page...")
             except ElementClickInterceptedException:
                 # Click using JavaScript as a fallback. Occassionally there's an element blocking the button. 
                 logger.info(f'Click using JavaScript as a fallback when navigating to next page.')
                 self.driver.execute_script("arguments[0].click();", next_button)
+            print("Navigating to the next page...")
+            return True
+
+        def scan_listing_http(page_url):
+            # Sent mail page over http, None if the browser has to take over the listing
+            try:
+                return fetcher.scan_listing(page_url)
+            except (UnexpectedPageError, requests.RequestException) as e:
+                logger.info(f"http listing fell back to the browser at {page_url}: {repr(e)}")
+                return None
+
+        crawled_ASN = state.known_asns() if state else set() # ship notice num
+        # With a CrawlStateStore, listing stops at the high-water mark and rows opened by earlier runs are skipped
+        known_keys = state.known_keys() if state else set()
+        if checkpoint:
+            crawled_ASN |= checkpoint.written_asns()
+        # the high-water mark only describes crawls that start at the newest mail
+        cutoff = state.listing_cutoff(crawluntil_time) if state and crawlto_time is None else crawluntil_time
+        newest = None  # creation date of the newest listed mail
+        reached_cutoff = False
+        start_page = 0
+        resume_url = None
+        if checkpoint and checkpoint.last_page:
+            try:
+                resume_url = self.sentmail_page_url(checkpoint.last_page, fetcher)
+            except Exception as e:
+                logger.info(f"could not learn the sent mail page URLs to resume at: {repr(e)}")
+            if resume_url is None:
+                print(f'Cannot jump to sent mail page {checkpoint.last_page+1}, resuming from the first page.')
+        if crawlto_time is not None:
+            try:
+                window_start = self.seek_window_start(crawlto_time, fetcher)
             except Exception as e:
-                print(f"Error navigating to the next page: {e}")
+                logger.error(f"Error occurred while searching the date window: {repr(e)}")
+                print('Something went wrong when searching the date window, sorry...')
                 return
-
-        crawled_ASN = {} # ship notice num
-        for page in range(maxpages):
+            if window_start is None:
+                print(f'No mail older than {crawlto_time} in the mailbox.')
+                sink.flush()
+                return sink.count
+            start_page, start_url = window_start
+        if resume_url and checkpoint.last_page > start_page:
+            # the pages before the last one the interrupted run saved are done, that one is listed again
+            # (its saved notices are skipped) in case newer mail shifted the listing
+            start_page, start_url = checkpoint.last_page, resume_url
+            print(f'Resuming at sent mail page {start_page+1}.')
+        if start_page and fetcher is None and self.driver.current_url != start_url:
+            self.driver.get(start_url)
+        # With an HttpFetcher, sent mail pages are fetched over http while their next page links are plain URLs
+        page_url = (start_url if start_page else self.driver.current_url) if fetcher is not None else None
+        next_url = None
+        pages = range(start_page, start_page + maxpages) if maxpages else itertools.count(start_page)
+        for page in pages:
+            page_start = time.time()
             # Step 1: Within single page, find the rows where Subject="Accepted -Ship Notice....."
             try:
-                shipnotice_idxs = self.get_shipnotice_idxs(crawluntil=crawluntil_time)
-                if not shipnotice_idxs: break # early stop by creation date
-                logger.info(shipnotice_idxs)
-                logger.info(f"len={len(shipnotice_idxs)}")
+                scanned = scan_listing_http(page_url) if page_url else None
+                if scanned is not None:
+                    rows, next_url = scanned
+                else:
+                    if page_url and self.driver.current_url != page_url:
+                        self.driver.get(page_url)
+                    page_url = None
+                    rows = self.scan_sentmail_rows()
+                if not rows:
+                    # empty mailbox (or window): nothing left to list
+                    print(f'No sent mail at page {page+1}.')
+                    reached_cutoff = True
+                    break
+                if newest is None:
+                    newest = parse_creation_date(rows[0]['creation_date'])
+                reached_cutoff = parse_creation_date(rows[-1]['creation_date']) < cutoff
+                shipnotice_rows = select_shipnotice_rows(rows, cutoff, crawlto=crawlto_time)
+                if not shipnotice_rows and reached_cutoff: break # early stop by creation date
+                resolve_item_targets(shipnotice_rows, page_url or self.driver.current_url, self.item_url_template)
+                if state:
+                    new_rows = [row for row in shipnotice_rows if not state.is_known(row, known_keys)]
+                    hot_logger.info("skipped %d ship notices crawled by earlier runs at page %d", len(shipnotice_rows) - len(new_rows), page+1)
+                    shipnotice_rows = new_rows
+                if checkpoint:
+                    written_rows = [row for row in shipnotice_rows if checkpoint.is_written(row)]
+                    if state:
+                        state.record_notices(written_rows, [checkpoint.notice_rows(row) for row in written_rows])
+                    shipnotice_rows = [row for row in shipnotice_rows if not checkpoint.is_written(row)]
+                if page_url and not all(row['item_url'] for row in shipnotice_rows):
+                    # click-through fallback needs the browser on this page
+                    self.driver.get(page_url)
+                    self.check_sentmailpage_status()
+                shipnotice_idxs = [row['index'] for row in shipnotice_rows]
+                hot_logger.info("%s len=%d", shipnotice_idxs, len(shipnotice_idxs))
             except Exception as e:
                 logger.error(f"Error occurred at getting ship notice indexes: {e}")
                 print('Something went wrong when crawling the shipnotices, sorry...')
                 return
             
-            print(f'Found {len(shipnotice_idxs)} rows with ship notices at page {page+1} starting from row {min(shipnotice_idxs)} to {max(shipnotice_idxs)}.')
-
             # Step 2: Start crawling shipnotices (Within single page)
             try:
-                df_shipNotice = self.crawl_shipnotices(shipnotice_idxs, df_shipNotice, crawled_ASN)
-                # df_shipNotice = self.crawl_shipnotices(shipnotice_idxs[:3], df_shipNotice)
+                if shipnotice_idxs:
+                    print(f'Found {len(shipnotice_idxs)} rows with ship notices at page {page+1} starting from row {min(shipnotice_idxs)} to {max(shipnotice_idxs)}.')
+                    page_rows = self.crawl_shipnotices(shipnotice_rows, crawled_ASN, pool, fetcher, state, checkpoint, page, pipeline)
+                else:
+                    print(f'No new ship notices at page {page+1}.')
+                    page_rows = []
+                # page_rows = self.crawl_shipnotices(shipnotice_rows[:3], crawled_ASN)
                 print(f"finished processing page {page+1}!")
-                expected_cols = ["ship_to","ship_notice_num","order_num","buyer_part_num", "ship_quantity"]
-                if list(df_shipNotice.columns)!=expected_cols:
-                    raise ValueError(f"Schema mismatch! Expected {expected_cols}, but got {list(df_shipNotice.columns)}")
+                incomplete = [row for row in page_rows if any(getattr(row, col) is None for col in REQUIRED_COLUMNS)]
+                if incomplete:
+                    # kept in the raw output, the normalization stage reports them as rejects
+                    logger.warning(f"{len(incomplete)} rows at page {page+1} are missing required columns, e.g. {incomplete[0]}")
+                sink.write(page_rows)
+                if self.metrics:
+                    self.metrics.observe('page_seconds', time.time() - page_start)
+                    self.metrics.count('pages')
+                    self.metrics.count('notices', len(shipnotice_rows))
+                    self.metrics.count('rows', len(page_rows))
+                if checkpoint:
+                    # the page only counts as saved once its rows are on disk
+                    sink.flush()
+                    checkpoint.page_done(page, shipnotice_rows)
             except ValueError as e:
                 logger.error(f"Error occurred at crawl_shipnotices: {repr(e)}")
                 print('Something went wrong when crawling the shipnotices, sorry...')
@@ -473,13 +735,30 @@ class SeleniumHelper:
                 return
             
             # Step 3: Navigate to the next page if we haven't reached the stop condition
+            if page_url and next_url:
+                page_url = next_url
+                continue
             try:
-                navigate_to_next_page()
+                if page_url:
+                    # no plain next page link, continue the listing in the browser
+                    if self.driver.current_url != page_url:
+                        self.driver.get(page_url)
+                    page_url = None
+                if not navigate_to_next_page():
+                    # nothing older in the mailbox, so everything down to crawluntil has been seen
+                    reached_cutoff = True
+                    break
                 self.check_sentmailpage_status()
             except Exception as e:
-                logger.error(f"Error occurred when navigating to the next page: {e}")
+                # the walk stopped early: fail the crawl, the high-water mark stays where it was
+                logger.error(f"Error occurred when navigating to the next page: {repr(e)}")
+                print('Something went wrong when navigating to the next sent mail page, sorry...')
                 return
-        return df_shipNotice
+        if state and reached_cutoff and newest is not None and crawlto_time is None:
+            # everything between crawluntil and the newest mail is crawled now
+            state.update_high_water_mark(crawluntil_time, newest)
+        sink.flush()
+        return sink.count
 
 
 
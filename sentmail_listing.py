@@ -0,0 +1,239 @@
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, unquote_plus
+from html_dom import parse_html, select_first
+from utils import setup_logger, setup_hot_logger, parse_creation_date
+
+logger = setup_logger()
+hot_logger = setup_hot_logger()  # per-notice / per-page messages
+
+SHIPNOTICE_SUBJECT_PREFIX = 'Accepted -Ship Notice'
+ITEM_PATH = 'mailbox/item'
+ITEM_URL_RE = re.compile(r"(?:https?://[^'\"\s]+?)?/?[\w/.-]*mailbox/item[^'\"\s)]*")
+MESSAGE_ID_ATTRS = ('data-id', 'data-message-id', 'data-msgid', 'data-item-id', 'data-mailid', 'value', 'id')
+MESSAGE_ID_RE = re.compile(r"\d{3,}")
+SENTMAIL_TABLE_XPATH = "/html/body/div[2]/aside[2]//section[@class='content']//table"
+# dom_wait conditions of a loaded sent mail page: URL, and "Sent" in the breadcrumb of the upper bar
+SENTMAIL_PAGE_CONDITIONS = [{'url': 'mailbox/sent', 'xpath': "/html/body/div[2]/aside[2]/ol/li[2]", 'text': 'Sent'}]
+NEXT_PAGE_XPATH = "/html/body/div[2]/aside[2]/section/div/div[2]/ul/li[8]/a"
+PAGE_PARAM_RE = re.compile(r"\d+")
+# query parameters that number the listing pages, most specific first
+PAGE_PARAM_NAMES = ('page', 'pageno', 'pagenumber', 'page_num', 'pg', 'p', 'offset', 'start', 'skip')
+
+# Read every row of the sent mail table in one browser call.
+# Returns null while the table is not rendered yet: no tbody, or a tbody without rows (a script-rendered table shows
+# it before its rows), SeleniumHelper.scan_sentmail_rows waits for a row first. An empty mailbox is a table whose only
+# row is a placeholder ('No data available in table', DataTables' dataTables_empty): one cell spanning the columns,
+# scanned as [].
+# Columns follow the old per-row XPaths: td[10]=subject, td[11]=creation date, td[14]/button[1]=view button.
+SCAN_SENTMAIL_JS = """
+const table = document.evaluate(arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+if (!table) return null;
+const tbody = table.querySelector('tbody');
+if (!tbody) return null;
+const trs = Array.from(tbody.children).filter(el => el.tagName === 'TR');
+if (trs.length === 0) return null;
+const rows = trs.filter(tr => Array.from(tr.children).filter(el => el.tagName === 'TD').length > 1);
+return rows.map((tr, index) => {
+    const tds = Array.from(tr.children).filter(el => el.tagName === 'TD');
+    const cellText = (i) => (tds[i] ? tds[i].innerText.trim() : null);
+    let view_target = null;
+    const button = tds[13] ? Array.from(tds[13].children).find(el => el.tagName === 'BUTTON') : null;
+    if (button) {
+        const attributes = {};
+        for (const attr of button.attributes) attributes[attr.name] = attr.value;
+        view_target = {attributes: attributes, form_action: button.formAction || null};
+    }
+    const link = tr.querySelector("a[href*='mailbox/item']");
+    if (link) {
+        view_target = Object.assign(view_target || {}, {href: link.href});
+    }
+    return {index: index, subject: cellText(9), creation_date: cellText(10), view_target: view_target};
+});
+"""
+
+# Capability probe of the sent mail page's own listing controls: a search box and a rows-per-page select
+# (a select whose options are all numbers). Used to let the site filter and size the pages.
+_FIND_LISTING_CONTROLS_JS = """
+const section = document.evaluate("/html/body/div[2]/aside[2]//section[@class='content']", document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue || document;
+const search = section.querySelector("input[type='search'], input[name*='search' i], input[name*='keyword' i], input[name*='subject' i], input[placeholder*='search' i]");
+const pageSize = Array.from(section.querySelectorAll('select')).find(
+    s => s.options.length > 1 && Array.from(s.options).every(o => /^\\d+$/.test(o.value.trim())));
+"""
+PROBE_LISTING_CONTROLS_JS = _FIND_LISTING_CONTROLS_JS + """
+return {
+    search: !!search,
+    page_sizes: pageSize ? Array.from(pageSize.options).map(o => parseInt(o.value)) : [],
+    page_size: pageSize ? parseInt(pageSize.value) : null,
+};
+"""
+# arguments[0]: rows per page to select, or null. arguments[1]: search text, or null.
+APPLY_LISTING_CONTROLS_JS = _FIND_LISTING_CONTROLS_JS + """
+const [size, query] = arguments;
+if (size !== null && pageSize) {
+    pageSize.value = String(size);
+    pageSize.dispatchEvent(new Event('change', {bubbles: true}));
+}
+if (query !== null && search) {
+    search.value = query;
+    search.dispatchEvent(new Event('input', {bubbles: true}));
+    search.dispatchEvent(new KeyboardEvent('keyup', {bubbles: true, key: 'Enter', keyCode: 13}));
+    if (search.form) {
+        search.form.requestSubmit ? search.form.requestSubmit() : search.form.submit();
+    }
+}
+return true;
+"""
+
+
+def select_shipnotice_rows(rows: List[dict], crawluntil: datetime, date_format: str="%m/%d/%Y %I:%M %p", crawlto: Optional[datetime]=None) -> List[dict]:
+    """
+    # From the scanned rows of one sent mail page (newest first), keep the ship notices created at or after crawluntil
+    # (and before crawlto, if given). Stops at the first row older than crawluntil.
+    """
+    if crawluntil is None:
+        raise ValueError("crawluntil cannot be None")
+    shipnotice_rows = []
+    for row in rows:
+        # get creationdate string and parse it to date object for comparison
+        creation_date = parse_creation_date(row['creation_date'], date_format)
+        # stop including the row if creation_date earlier than crawluntil
+        if creation_date < crawluntil:
+            hot_logger.info('early stop at creation_date: %s', creation_date)
+            break
+        if crawlto is not None and creation_date >= crawlto:
+            continue  # newer than the date window
+        # find the rows that indicates its a ship notice (column "subject")
+        if (row['subject'] or '').startswith(SHIPNOTICE_SUBJECT_PREFIX):
+            shipnotice_rows.append(row)
+    return shipnotice_rows
+
+
+def find_item_url(view_target: Optional[dict], base_url: str) -> Optional[str]:
+    # A 'mailbox/item' URL referenced by the row (link href, button formaction, onclick or data-* attribute)
+    if not view_target:
+        return None
+    candidates = [view_target.get('href'), view_target.get('form_action')]
+    candidates += list((view_target.get('attributes') or {}).values())
+    for candidate in candidates:
+        if not candidate:
+            continue
+        match = ITEM_URL_RE.search(candidate)
+        if match:
+            return urljoin(base_url, match.group(0))
+    return None
+
+
+def find_message_id(view_target: Optional[dict]) -> Optional[str]:
+    # The message id carried by the view button (data-* attribute, value, or the argument of its onclick handler)
+    if not view_target:
+        return None
+    attributes = view_target.get('attributes') or {}
+    for name in MESSAGE_ID_ATTRS:
+        match = MESSAGE_ID_RE.search(attributes.get(name) or '')
+        if match:
+            return match.group(0)
+    match = MESSAGE_ID_RE.search(attributes.get('onclick') or '')
+    return match.group(0) if match else None
+
+
+def learn_item_url_template(item_url: str, message_id: Optional[str]) -> Optional[str]:
+    # After one click-through, turn the item page URL into a template for the other rows' message ids
+    if not message_id or ITEM_PATH not in item_url or item_url.count(message_id) != 1:
+        return None
+    return item_url.replace(message_id, '{message_id}')
+
+
+def resolve_item_targets(rows: List[dict], base_url: str, item_url_template: Optional[str]=None) -> List[dict]:
+    """
+    # Attach 'message_id' and 'item_url' to every scanned row, so item pages can be visited directly.
+    # 'item_url' stays None when the row gives no URL and no item URL template is known yet.
+    """
+    for row in rows:
+        row['message_id'] = find_message_id(row.get('view_target'))
+        row['item_url'] = find_item_url(row.get('view_target'), base_url)
+        if row['item_url'] is None and item_url_template and row['message_id']:
+            row['item_url'] = item_url_template.format(message_id=row['message_id'])
+    return rows
+
+
+def parse_sentmail_listing_html(html: str, base_url: str) -> Optional[List[dict]]:
+    """
+    # Same result as SCAN_SENTMAIL_JS, from a sent mail page fetched without the browser.
+    # Returns None when the page has no sent mail table (e.g. a login page) or a table without rows (rendered by
+    # a script, the browser has to read it), [] when its only row is the empty-table placeholder.
+    """
+    document = parse_html(html)
+    aside = select_first(document, "html/body/div[2]/aside[2]")
+    section = aside.find(lambda n: n.tag == 'section' and n.attrs.get('class') == 'content') if aside else None
+    table = section.find(lambda n: n.tag == 'table') if section else None
+    tbody = table.find(lambda n: n.tag == 'tbody') if table else None
+    trs = tbody.element_children('tr') if tbody else []
+    if not trs:
+        return None
+    trs = [tr for tr in trs if len(tr.element_children('td')) > 1]  # not the empty-table placeholder
+    rows = []
+    for index, tr in enumerate(trs):
+        tds = tr.element_children('td')
+        view_target = None
+        buttons = tds[13].element_children('button') if len(tds) > 13 else []
+        if buttons:
+            attributes = dict(buttons[0].attrs)
+            form_action = urljoin(base_url, attributes['formaction']) if attributes.get('formaction') else None
+            view_target = {'attributes': attributes, 'form_action': form_action}
+        link = tr.find(lambda n: n.tag == 'a' and ITEM_PATH in n.attrs.get('href', ''))
+        if link is not None:
+            view_target = {**(view_target or {}), 'href': urljoin(base_url, link.attrs['href'])}
+        rows.append({
+            'index': index,
+            'subject': tds[9].text if len(tds) > 9 else None,
+            'creation_date': tds[10].text if len(tds) > 10 else None,
+            'view_target': view_target,
+        })
+    return rows
+
+
+def parse_next_page_url(html: str, base_url: str) -> Optional[str]:
+    # href of the pagination "Next" link, None if it is missing or only handled by javascript
+    link = select_first(parse_html(html), NEXT_PAGE_XPATH)
+    href = link.attrs.get('href', '').strip() if link is not None else ''
+    if not href or href.startswith('#') or href.lower().startswith('javascript'):
+        return None
+    return urljoin(base_url, href)
+
+
+def learn_page_url_template(next_url: Optional[str], first_url: str='') -> Optional[Tuple[str, int]]:
+    """
+    # From the "Next" link of the first sent mail page, a URL template for any page: the numeric query parameter
+    # with a known paging name (PAGE_PARAM_NAMES), else the only numeric one that differs from a value in the
+    # first page's URL, else a trailing path number becomes '{page}'.
+    # Returns (template, value on the second page), None if the pagination is not addressable by URL
+    # (or it is not clear which parameter is the page).
+    """
+    if not next_url:
+        return None
+    parts = urlsplit(next_url)
+    first_params = dict(parse_qsl(urlsplit(first_url).query, keep_blank_values=True))
+    query_items = [item.split('=', 1) for item in parts.query.split('&') if '=' in item]
+    numeric = {unquote_plus(key): value for key, value in query_items if PAGE_PARAM_RE.fullmatch(value)}
+    by_name = {key.lower(): key for key in numeric}
+    page_key = next((by_name[name] for name in PAGE_PARAM_NAMES if name in by_name), None)
+    if page_key is None:
+        # only parameters the first page's URL has can show a change (it usually has no query at all)
+        changed = [key for key, value in numeric.items() if key in first_params and first_params[key] != value]
+        page_key = changed[0] if len(changed) == 1 else None
+    if page_key is not None:
+        query = '&'.join(f"{key}={{page}}" if unquote_plus(key) == page_key else f"{key}={value}" for key, value in query_items)
+        return urlunsplit(parts._replace(query=query)), int(numeric[page_key])
+    head, _, last_segment = parts.path.rstrip('/').rpartition('/')
+    if PAGE_PARAM_RE.fullmatch(last_segment) and not parts.query:
+        return next_url.replace(parts.path, f"{head}/{{page}}", 1), int(last_segment)
+    return None
+
+
+def page_url_from_template(template: str, second_page_value: int, page: int) -> str:
+    # page is 0-based. The second page's value tells the scheme: 2 -> 1-based numbers, 1 -> 0-based, else row offsets
+    if second_page_value == 2:
+        return template.format(page=page + 1)
+    return template.format(page=page * second_page_value)
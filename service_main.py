@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import signal
+import argparse
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from core_logic import SeleniumApp, LOGIN_URL
+from startup import BackgroundStartup
+from driver_backend import BACKENDS, make_backend
+from utils import setup_logger, configure_logging
+from dotenv import load_dotenv
+
+logger = setup_logger()  # Setup logging
+load_dotenv()
+
+SERVICE_PORT = 4456
+MAX_RECENT_ROWS = 10000  # ship notice rows kept in memory for the api
+
+
+class CrawlService:
+    """
+    # Unattended mode: re-crawl one account every `interval` seconds with the same browser and login
+    # (the session is only re-established when the site expired it, the browser only restarted when it died),
+    # and serve the newest ship notices and the crawl status on a local http api.
+    # Every cycle is an incremental crawl: listing stops at the high-water mark of the previous cycle,
+    # so a cycle only opens the notices sent since then. Each cycle writes its own output file as usual.
+    """
+    def __init__(self, username, password, crawluntil_time, interval=900, backend=None, lean_profile=False,
+                 app_options=None, max_rows=MAX_RECENT_ROWS):
+        self.username = username
+        self.password = password
+        self.crawluntil_time = crawluntil_time
+        self.interval = interval
+        self.backend = backend or make_backend()
+        self.lean_profile = lean_profile
+        self.app_options = app_options or {}  # SeleniumApp kwargs of every cycle
+        self.startup = None
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.wake = threading.Event()  # set by POST /crawl (or stop) to end the wait before the next cycle
+        self.rows = deque(maxlen=max_rows)  # newest rows at the right, every row tagged with its cycle
+        self.status = {
+            'state': 'starting', 'account': username, 'interval': interval, 'cycles': 0, 'failed_cycles': 0,
+            'last_started': None, 'last_finished': None, 'last_status': None, 'last_rows': 0, 'last_output': None,
+            'next_run': None,
+        }
+
+    def _set_status(self, **changes):
+        with self.lock:
+            self.status.update(changes)
+
+    def browser_alive(self) -> bool:
+        if self.startup.thread.is_alive():
+            return True  # still booting, the cycle waits for it
+        if self.startup.error or self.startup.selhelp.driver is None:
+            return False
+        try:
+            self.startup.selhelp.driver.current_url
+            return True
+        except Exception as e:
+            logger.error(f"service browser is unhealthy: {repr(e)}")
+            return False
+
+    def ensure_browser(self):
+        # Keep the browser of the previous cycle, replace it if Chrome or its container died
+        if self.startup is not None:
+            if self.browser_alive():
+                return
+            print('The browser is gone, starting a new one...')
+            self.startup.shutdown()
+        self.startup = BackgroundStartup(lean_profile=self.lean_profile, backend=self.backend).start()
+
+    def crawl_once(self):
+        self.ensure_browser()
+        cycle = self.status['cycles'] + 1
+        self._set_status(state='crawling', last_started=datetime.now().isoformat(timespec='seconds'), next_run=None)
+        app = SeleniumApp(self.username, self.password, self.crawluntil_time, startup=self.startup, incremental=True,
+                          interactive=False, keep_browser=True, **self.app_options)
+        app.run()
+        records = []
+        if app.completed and app.sink and app.sink.count:
+            try:
+                records = json.loads(app.sink.to_dataframe().to_json(orient='records', date_format='iso'))
+            except Exception as e:
+                logger.error(f"Error occurred while loading the rows of cycle {cycle}: {repr(e)}")
+        crawled_at = datetime.now().isoformat(timespec='seconds')
+        with self.lock:
+            self.rows.extend({'cycle': cycle, 'crawled_at': crawled_at, **record} for record in records)
+            self.status.update(cycles=cycle, last_finished=crawled_at, last_status='ok' if app.completed else 'failed',
+                               last_rows=len(records), last_output=app.sink.filepath if app.sink and app.sink.count else None)
+            if not app.completed:
+                self.status['failed_cycles'] += 1
+        try:
+            self.startup.metrics.write_json(label='service')  # one file, rewritten after every cycle
+        except Exception as e:
+            logger.error(f"Error occurred while writing the service metrics: {repr(e)}")
+        print(f"Cycle {cycle}: {'ok' if app.completed else 'failed'}, {len(records)} new rows.")
+
+    def latest_notices(self, since_cycle=0, limit=None) -> dict:
+        # Rows of the cycles after since_cycle, newest cycle first (rows of a cycle stay newest notice first)
+        with self.lock:
+            rows = [row for row in self.rows if row['cycle'] > since_cycle]
+            cycle = self.status['cycles']
+        rows.sort(key=lambda row: -row['cycle'])
+        return {'cycle': cycle, 'notices': rows[:limit] if limit else rows}
+
+    def run_forever(self):
+        try:
+            while not self.stopping.is_set():
+                try:
+                    self.crawl_once()
+                except Exception as e:
+                    logger.error(f"Error occurred in the service cycle: {repr(e)}")
+                    self._set_status(last_status='failed')
+                if self.stopping.is_set():
+                    break
+                self._set_status(state='idle', next_run=(datetime.now() + timedelta(seconds=self.interval)).isoformat(timespec='seconds'))
+                self.wake.wait(timeout=self.interval)
+                self.wake.clear()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._set_status(state='stopped', next_run=None)
+            if self.startup is not None:
+                self.startup.shutdown()
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+
+    def serve(self, host='127.0.0.1', port=SERVICE_PORT) -> ThreadingHTTPServer:
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+                if parts.path == '/status':
+                    with service.lock:
+                        status = {**service.status, 'rows_buffered': len(service.rows)}
+                    self._reply(200, status)
+                elif parts.path == '/notices':
+                    try:
+                        since, limit = int(query.get('since', 0)), int(query.get('limit', 0)) or None
+                    except ValueError:
+                        return self._reply(400, {'error': 'since and limit must be integers'})
+                    self._reply(200, service.latest_notices(since, limit))
+                else:
+                    self._reply(404, {'error': 'not found'})
+
+            def do_POST(self):
+                if urlsplit(self.path).path == '/crawl':
+                    service.wake.set()
+                    self._reply(202, {'scheduled': True, 'state': service.status['state']})
+                else:
+                    self._reply(404, {'error': 'not found'})
+
+            def log_message(self, format, *args):
+                logger.info(f"service api: {format % args}")
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='service-api', daemon=True).start()
+        return server
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Re-crawl one iExchangeWeb account on an interval and serve the newest ship notices on a local http api")
+    arg_parser.add_argument("--interval", type=int, default=int(os.environ.get("IEXWEB_SERVICE_INTERVAL", 900)), help="Seconds between the end of a crawl and the start of the next")
+    arg_parser.add_argument("--crawl-from", default=os.environ.get("IEXWEB_SERVICE_CRAWL_FROM"), help="YYYY-MM-DD, how far back the first crawl goes (default: 7 days ago), later cycles stop at the previous one")
+    arg_parser.add_argument("--host", default=os.environ.get("IEXWEB_SERVICE_HOST", "127.0.0.1"), help="Address of the http api")
+    arg_parser.add_argument("--port", type=int, default=int(os.environ.get("IEXWEB_SERVICE_PORT", SERVICE_PORT)), help="Port of the http api")
+    arg_parser.add_argument("--backend", default=os.environ.get("IEXWEB_BACKEND"), choices=BACKENDS, help="Where Chrome runs, as in cli_main.py")
+    arg_parser.add_argument("--grid-url", default=os.environ.get("IEXWEB_GRID_URL"), help="Selenium Grid hub URL for the grid backend")
+    arg_parser.add_argument("--lean-browser", action="store_true", default=os.environ.get("IEXWEB_LEAN_BROWSER") == "1", help="Headless Chrome without images, fonts or stylesheets")
+    arg_parser.add_argument("--http-fetch", action="store_true", default=os.environ.get("IEXWEB_HTTP_FETCH") == "1", help="Fetch sent mail and ship notice pages over http with the browser's cookies")
+    arg_parser.add_argument("--http-workers", type=int, default=int(os.environ.get("IEXWEB_HTTP_WORKERS", 8)), help="Maximum concurrent http requests with --http-fetch")
+    arg_parser.add_argument("--parse-workers", type=int, default=int(os.environ.get("IEXWEB_PARSE_WORKERS", 0)), help="Parse item pages in N worker processes")
+    arg_parser.add_argument("--format", dest="output_format", default=os.environ.get("IEXWEB_OUTPUT_FORMAT", "csv"), choices=["csv", "parquet"], help="Output format of every cycle's file")
+    arg_parser.add_argument("--archive", action="store_true", default=os.environ.get("IEXWEB_ARCHIVE") == "1", help="Keep every fetched item document for reparse.py")
+    arg_parser.add_argument("--login-url", default=os.environ.get("IEXWEB_LOGIN_URL", LOGIN_URL), help="Login page, e.g. of the fake_iexweb.py stand-in")
+    args = arg_parser.parse_args()
+    configure_logging(log_format=os.environ.get("IEXWEB_LOG_FORMAT"), hot_level=os.environ.get("IEXWEB_HOT_LOG_LEVEL"))
+
+    # No prompt in unattended mode: the credentials come from the environment (or .env)
+    username, password = os.environ.get("IEXWEB_USERNAME"), os.environ.get("IEXWEB_PASSWORD")
+    if not username or not password:
+        print('Set IEXWEB_USERNAME and IEXWEB_PASSWORD to run the service.')
+        return 1
+    try:
+        crawluntil_time = datetime.strptime(args.crawl_from, "%Y-%m-%d") if args.crawl_from else \
+            datetime.combine(datetime.now().date() - timedelta(days=7), datetime.min.time())
+        backend = make_backend(args.backend, args.grid_url)
+    except ValueError as e:
+        print(e)
+        return 1
+    app_options = {
+        'http_workers': args.http_workers if args.http_fetch else 0, 'parse_workers': args.parse_workers,
+        'output_format': args.output_format, 'archive': args.archive, 'login_url': args.login_url,
+    }
+    service = CrawlService(username, password, crawluntil_time, interval=args.interval, backend=backend,
+                           lean_profile=args.lean_browser, app_options=app_options)
+
+    def handle_signal(signum, frame):
+        # Let the running crawl save its rows (SeleniumApp.run handles KeyboardInterrupt), then leave the loop
+        service.stop()
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    server = service.serve(args.host, args.port)
+    print(f"Crawl service for {username}: every {args.interval}s, api on http://{args.host}:{args.port} (/status, /notices?since=<cycle>, POST /crawl). Hit Ctrl-C to stop.")
+    try:
+        service.run_forever()
+    finally:
+        server.shutdown()
+    print('Crawl service stopped.')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import requests
+from typing import Optional
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from utils import setup_logger
+
+logger = setup_logger()
+
+SESSION_CACHE_FOLDER = '.session_cache'
+SALT_BYTES = 16
+
+
+def _cache_filepath(username: str) -> str:
+    # one file per username, the name does not reveal the username
+    cache_folderpath = os.path.join(os.getcwd(), SESSION_CACHE_FOLDER)
+    os.makedirs(cache_folderpath, exist_ok=True)
+    return os.path.join(cache_folderpath, hashlib.sha256(username.encode('utf-8')).hexdigest() + '.bin')
+
+
+def _fernet(password: str, salt: bytes) -> Fernet:
+    # The key is derived from the iExchangeWeb password, which is entered on every run anyway
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=390000)
+    return Fernet(base64.urlsafe_b64encode(kdf.derive(password.encode('utf-8'))))
+
+
+def save_session(username: str, password: str, homeurl: str, cookies: list):
+    salt = os.urandom(SALT_BYTES)
+    payload = json.dumps({'username': username, 'homeurl': homeurl, 'cookies': cookies, 'saved_at': time.time()})
+    token = _fernet(password, salt).encrypt(payload.encode('utf-8'))
+    filepath = _cache_filepath(username)
+    with open(filepath, 'wb') as f:
+        f.write(salt + token)
+    os.chmod(filepath, 0o600)
+    logger.info('saved session cache')
+
+
+def load_session(username: str, password: str) -> Optional[dict]:
+    filepath = _cache_filepath(username)
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    try:
+        payload = _fernet(password, data[:SALT_BYTES]).decrypt(data[SALT_BYTES:])
+    except InvalidToken:
+        logger.info('session cache could not be decrypted (password changed?), ignoring it')
+        return None
+    return json.loads(payload)
+
+
+def clear_session(username: str):
+    filepath = _cache_filepath(username)
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+
+def is_session_valid(cached: dict, timeout: int=10) -> bool:
+    # One cheap request to mailbox/inbox: a live session stays there, an expired one is sent to the login page
+    cookies = requests.cookies.RequestsCookieJar()
+    for cookie in cached['cookies']:
+        cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    try:
+        response = requests.get(cached['homeurl'], cookies=cookies, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        logger.info(f'session cache check failed: {e}')
+        return False
+    return response.status_code == 200 and 'mailbox/inbox' in response.url and 'login-box' not in response.text
@@ -0,0 +1,187 @@
+import sys
+from typing import List, Optional
+from html_dom import Node, parse_html
+from utils import setup_logger, setup_hot_logger
+
+logger = setup_logger()
+hot_logger = setup_hot_logger()  # per-notice / per-page messages
+
+# Compiled caption -> field tables.
+# Ship Notice header table: caption text must match exactly (after strip).
+SHARED_CAPTION_FIELDS = {
+    "Ship Notice #": "ship_notice_num",
+    "Create Date/Time": "create_datetime",
+}
+# Item tables: first keyword contained in the caption wins, (keyword, field, transform)
+ITEM_CAPTION_FIELDS = (
+    ("Order #", "order_num", None),
+    ("PO #", "order_num", lambda s: s[:6]),  # PO num, first 6 digits
+    ("Buyer Part #", "buyer_part_num", None),
+    ("Ship Quantity", "ship_quantity", None),
+)
+MAX_ITEM_CAPTIONS = 4
+
+# Output columns, in the order the fields are found on the page
+SHIPNOTICE_COLUMNS = ("ship_to", "ship_notice_num", "create_datetime", "order_num", "buyer_part_num", "ship_quantity")
+# Columns every row must have, checked by the normalization stage
+REQUIRED_COLUMNS = ("ship_to", "ship_notice_num", "order_num", "buyer_part_num", "ship_quantity")
+
+
+class ShipNoticeRow:
+    """One ship notice line item. __slots__ keeps the rows of a long crawl compact."""
+    __slots__ = SHIPNOTICE_COLUMNS
+
+    def __init__(self, ship_to=None, ship_notice_num=None, create_datetime=None, order_num=None, buyer_part_num=None, ship_quantity=None):
+        self.ship_to = ship_to
+        self.ship_notice_num = ship_notice_num
+        self.create_datetime = create_datetime
+        self.order_num = order_num
+        self.buyer_part_num = buyer_part_num
+        self.ship_quantity = ship_quantity
+
+    def as_tuple(self) -> tuple:
+        return tuple(getattr(self, column) for column in SHIPNOTICE_COLUMNS)
+
+    def as_dict(self) -> dict:
+        return dict(zip(SHIPNOTICE_COLUMNS, self.as_tuple()))
+
+    def __eq__(self, other):
+        return isinstance(other, ShipNoticeRow) and self.as_tuple() == other.as_tuple()
+
+    def __repr__(self):
+        return f"ShipNoticeRow({self.as_dict()})"
+
+
+def _data_of(caption: Node) -> str:
+    # following-sibling::td[@class='data']
+    for sibling in caption.following_siblings():
+        if sibling.tag == "td" and sibling.attrs.get("class") == "data":
+            return sibling.text
+    raise ValueError(f"data cell not found for caption '{caption.text}'")
+
+
+def _upperleftmost_caption(table: Node) -> Node:
+    # ./tbody/tr/td[1]/table/tbody/tr[1], then the first '.caption' inside it
+    for tbody in table.element_children("tbody"):
+        for tr in tbody.element_children("tr"):
+            tds = tr.element_children("td")
+            if not tds:
+                continue
+            for inner_table in tds[0].element_children("table"):
+                for inner_tbody in inner_table.element_children("tbody"):
+                    inner_trs = inner_tbody.element_children("tr")
+                    if inner_trs:
+                        captions = inner_trs[0].find_by_class("caption")
+                        if not captions:
+                            raise ValueError("upper leftmost row of table has no caption")
+                        return captions[0]
+    raise ValueError("upper leftmost caption of table not found")
+
+
+def _item_field(caption_text: str):
+    for keyword, field, transform in ITEM_CAPTION_FIELDS:
+        if keyword in caption_text:
+            return field, transform
+    return None
+
+
+def get_iframe_tables(document: Node) -> List[Node]:
+    # /html/body/table
+    body = document.find(lambda n: n.tag == "body")
+    if body is None:
+        raise ValueError("body not found in ship notice document")
+    tables = body.element_children("table")
+    if not tables:
+        raise ValueError("tables in ship_notice_body are not found!")
+    return tables
+
+
+def parse_shipnotice_tables(tables: List[Node], crawled_ASN: Optional[set]=None) -> List[ShipNoticeRow]:
+    """
+    # Extract one row per item from the tables of a ship notice (contentFrame) document.
+    # Same rules as the element-by-element crawl: shared attributes (ship_to, ship_notice_num, create_datetime)
+    # are copied into every item row. Returns [] if the ASN was already crawled.
+    """
+    crawled_ASN = crawled_ASN if crawled_ASN is not None else set()
+    rows = []
+    sharedAttr_dict = dict()
+    for table in tables[1:]:  # tables[0] is the ship notice title
+        upperleftmost_caption_element = _upperleftmost_caption(table)
+        upperleftmost_caption = upperleftmost_caption_element.text.strip()
+        if upperleftmost_caption == "Ship To":
+            sharedAttr_dict['ship_to'] = _data_of(upperleftmost_caption_element)
+        elif upperleftmost_caption == "Ship Notice #":
+            for count, caption_element in enumerate(table.find_by_class("caption")):
+                caption = caption_element.text.strip()
+                field = SHARED_CAPTION_FIELDS.get(caption)
+                if field == "ship_notice_num":
+                    ASN = _data_of(caption_element)
+                    # crawl from today no reverse, then if duplicate shipnotice#, skip return.
+                    if ASN in crawled_ASN:
+                        hot_logger.info("skipped duplicate ASN %s", ASN)
+                        return rows
+                    sharedAttr_dict[field] = ASN
+                elif field is not None:
+                    sharedAttr_dict[field] = _data_of(caption_element)
+                elif count >= 2: break
+        elif "Order #" in upperleftmost_caption or "PO #" in upperleftmost_caption:  # items
+            itemAttr_dict = {}
+            wanted = []
+            for caption_element in table.find_by_class("caption"):
+                if len(wanted) >= MAX_ITEM_CAPTIONS: break
+                caption = caption_element.text
+                item_field = _item_field(caption)
+                if item_field is not None:
+                    wanted.append((caption_element, item_field))
+            for caption_element, (field, transform) in wanted:
+                data = _data_of(caption_element)
+                itemAttr_dict[field] = transform(data) if transform else data
+            # combine attributes for a single item at a column level
+            rows.append(ShipNoticeRow(**{**sharedAttr_dict, **itemAttr_dict}))
+    return rows
+
+
+def parse_shipnotice_html(html: str, crawled_ASN: Optional[set]=None) -> List[ShipNoticeRow]:
+    """Parse a whole contentFrame document (driver.page_source inside the iframe, or a saved .html file)."""
+    return parse_shipnotice_tables(get_iframe_tables(parse_html(html)), crawled_ASN)
+
+
+def parse_shipnotice_header(html: str) -> dict:
+    """Ship notice # and create date/time of a contentFrame document, also for notices without item tables."""
+    header = {}
+    for table in get_iframe_tables(parse_html(html))[1:]:
+        if _upperleftmost_caption(table).text.strip() != "Ship Notice #":
+            continue
+        for caption_element in table.find_by_class("caption"):
+            field = SHARED_CAPTION_FIELDS.get(caption_element.text.strip())
+            if field is not None:
+                header[field] = _data_of(caption_element)
+        break
+    return header
+
+
+def merge_notice_rows(notices: List[List[ShipNoticeRow]], crawled_ASN: set) -> List[ShipNoticeRow]:
+    """
+    # Flatten per-notice rows given newest first. A notice whose ASN was already crawled is skipped,
+    # so for duplicate ship notice numbers the newest notice is kept.
+    """
+    merged = []
+    for rows in notices:
+        if not rows:
+            continue
+        ASN = rows[0].ship_notice_num
+        if ASN is not None:
+            if ASN in crawled_ASN:
+                hot_logger.info("skipped duplicate ASN %s", ASN)
+                continue
+            crawled_ASN.add(ASN)
+        merged.extend(rows)
+    return merged
+
+
+if __name__ == "__main__":
+    # Parse saved contentFrame documents offline: python shipnotice_parser.py notice1.html notice2.html ...
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            for row in parse_shipnotice_html(f.read()):
+                print(row)
@@ -0,0 +1,100 @@
+import time
+import threading
+from selenium_helper import SeleniumHelper
+from driver_backend import CONTAINER_NAME, make_backend
+from daemon_client import get_daemon_session, release_daemon_session, DaemonBusyError
+from metrics import RunMetrics
+from utils import setup_logger
+
+logger = setup_logger()
+
+
+class BackgroundStartup:
+    """
+    # Gets the browser ready in a background thread: attach to the browser daemon if one is running and the
+    # backend is the default container the daemon runs in, else get the driver backend ready (boot the Selenium container, nothing for local Chrome or a Grid)
+    # and create the WebDriver session.
+    # Started as soon as the program launches, so it overlaps with the user typing credentials.
+    """
+    def __init__(self, grid_url=None, script_start_time=None, lean_profile=False, backend=None):
+        self.backend = backend or make_backend(grid_url=grid_url)
+        self.script_start_time = script_start_time or time.time()
+        self.selhelp = SeleniumHelper(script_start_time=self.script_start_time, backend=self.backend, lean_profile=lean_profile)
+        # Time the run from launch: container boot and WebDriver creation are the first stages
+        self.metrics = RunMetrics()
+        self.metrics.instrument_helper(self.selhelp)
+        self.daemon_session = None
+        self.error = None  # (exception, message for the user) if the browser could not be started
+        self.ready_time = None
+        self.thread = threading.Thread(target=self._boot, name='browser-startup', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _boot(self):
+        # Attach to the warm browser daemon session if one is running (python browser_daemon.py start).
+        # Only for the daemon's own container: batch jobs run their own containers and must not queue on its one session.
+        try:
+            daemon_session = get_daemon_session() if getattr(self.backend, 'container_name', None) == CONTAINER_NAME else None
+        except DaemonBusyError as e:
+            # The daemon owns the Selenium container: starting our own would stop its browser
+            logger.error(f"Error occurred while attaching to the browser daemon: {e}")
+            self.error = (e, 'The browser daemon is busy with another run, try again later (or use --backend local).')
+            return
+        if daemon_session:
+            try:
+                self.selhelp.attach_webdriver(daemon_session['executor'], daemon_session['session_id'], daemon_session['daemon_url'])
+                self.daemon_session = daemon_session
+                print("Attached to the browser daemon!")
+            except Exception as e:
+                logger.error(f"Error occurred while attaching to the browser daemon: {e}")
+                release_daemon_session(daemon_session['daemon_url'])
+                self.selhelp.daemon_url = None
+                self.selhelp.backend = self.backend
+
+        # Setup selenium environment
+        if not self.daemon_session:
+            try:
+                self.selhelp.setup_selenium_env()
+            except Exception as e:
+                logger.error(f"Error occurred during the {self.backend.name} backend setup: {e}")
+                self.error = (e, 'Something went wrong...')
+                return
+
+        # Start WebDriver
+        if not self.daemon_session:
+            try:
+                self.selhelp.init_webdriver(timeout=60)
+            except Exception as e:
+                logger.error(f"Error occurred while initializing WebDriver: {e}")
+                self.error = (e, 'WebDriver initialization failed, it happens...you can try again or restart machine.')
+                return
+
+        self.ready_time = time.time()
+        logger.info(f"browser ready {(self.ready_time - self.script_start_time):.2f}s after launch")
+
+    def wait(self) -> SeleniumHelper:
+        # Block until the browser is ready, returns the SeleniumHelper or raises the startup error
+        waited_from = time.time()
+        if self.thread.is_alive():
+            print('Waiting for the browser to start...')
+        self.thread.join()
+        logger.info(f"waited {(time.time() - waited_from):.2f}s for the browser startup")
+        if self.error:
+            print(self.error[1])
+            raise self.error[0]
+        return self.selhelp
+
+    def shutdown(self):
+        # The run was abandoned before crawling (e.g. invalid input): release the browser without prompting
+        self.thread.join()
+        try:
+            if self.selhelp.daemon_url:
+                release_daemon_session(self.selhelp.daemon_url)
+            elif self.selhelp.driver:
+                self.selhelp.driver.quit()
+            if self.selhelp.backend:
+                self.selhelp.backend.stop()
+        except Exception as e:
+            logger.error(f"Error occurred while shutting down the browser: {e}")
@@ -0,0 +1,129 @@
+import os
+import time
+import sqlite3
+from datetime import datetime
+from typing import List, Optional
+from utils import setup_logger
+
+logger = setup_logger()
+
+STATE_DB_FILENAME = 'crawl_state.db'
+
+
+def listing_key(row: dict) -> str:
+    # Identifies a sent mail row without opening it (works even when the row carries no message id)
+    return f"{row.get('creation_date')}|{row.get('subject')}"
+
+
+class CrawlStateStore:
+    """
+    # Local SQLite record of what an account has already crawled:
+    # every scraped ship notice (ASN, creation time, message id / listing key) and the covered date window
+    # [covered_from, covered_to], whose upper end is the high-water mark where the next run can stop listing.
+    """
+    def __init__(self, account: str, db_path: Optional[str]=None):
+        self.account = account
+        self.db_path = db_path or os.path.join(os.getcwd(), STATE_DB_FILENAME)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS crawled_notice (
+                account TEXT NOT NULL,
+                listing_key TEXT NOT NULL,
+                message_id TEXT,
+                asn TEXT,
+                create_datetime TEXT,
+                crawled_at REAL NOT NULL,
+                PRIMARY KEY (account, listing_key)
+            );
+            CREATE INDEX IF NOT EXISTS crawled_notice_asn ON crawled_notice (account, asn);
+            CREATE TABLE IF NOT EXISTS high_water_mark (
+                account TEXT PRIMARY KEY,
+                covered_from TEXT NOT NULL,
+                covered_to TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+        # Nothing is written before the run's output is saved (flush), so a failed run never marks notices as crawled
+        self.pending_notices = []
+        self.pending_window = None
+
+    def close(self):
+        self.conn.close()
+
+    def known_asns(self) -> set:
+        cur = self.conn.execute("SELECT asn FROM crawled_notice WHERE account=? AND asn IS NOT NULL", (self.account,))
+        return {asn for (asn,) in cur}
+
+    def known_keys(self) -> set:
+        # listing keys and message ids of every row already opened
+        cur = self.conn.execute("SELECT listing_key, message_id FROM crawled_notice WHERE account=?", (self.account,))
+        keys = set()
+        for key, message_id in cur:
+            keys.add(key)
+            if message_id:
+                keys.add(message_id)
+        return keys
+
+    def is_known(self, row: dict, known_keys: set) -> bool:
+        return listing_key(row) in known_keys or (row.get('message_id') is not None and row['message_id'] in known_keys)
+
+    def record_notices(self, shipnotice_rows: List[dict], notices: List[Optional[list]]):
+        # notices[i] are the item rows scraped for shipnotice_rows[i] ([] if its ASN was skipped as duplicate)
+        now = time.time()
+        for row, notice in zip(shipnotice_rows, notices):
+            if notice is None:
+                continue
+            asn = notice[0].ship_notice_num if notice else None
+            create_datetime = notice[0].create_datetime if notice else None
+            self.pending_notices.append((self.account, listing_key(row), row.get('message_id'), asn, create_datetime, now))
+
+    def flush(self):
+        # Persist the notices and high-water mark of this run, call after the output file is saved
+        self.conn.executemany("""
+            INSERT INTO crawled_notice (account, listing_key, message_id, asn, create_datetime, crawled_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (account, listing_key) DO UPDATE SET
+                message_id=COALESCE(excluded.message_id, message_id), asn=COALESCE(excluded.asn, asn),
+                create_datetime=COALESCE(excluded.create_datetime, create_datetime), crawled_at=excluded.crawled_at
+        """, self.pending_notices)
+        if self.pending_window is not None:
+            self.conn.execute("""
+                INSERT INTO high_water_mark (account, covered_from, covered_to, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (account) DO UPDATE SET
+                    covered_from=excluded.covered_from, covered_to=excluded.covered_to, updated_at=excluded.updated_at
+            """, (self.account, self.pending_window[0].isoformat(), self.pending_window[1].isoformat(), time.time()))
+        self.conn.commit()
+        logger.info(f'state store: recorded {len(self.pending_notices)} crawled ship notices')
+        self.pending_notices = []
+        self.pending_window = None
+
+    def covered_window(self):
+        cur = self.conn.execute("SELECT covered_from, covered_to FROM high_water_mark WHERE account=?", (self.account,))
+        found = cur.fetchone()
+        if found is None:
+            return None
+        return datetime.fromisoformat(found[0]), datetime.fromisoformat(found[1])
+
+    def listing_cutoff(self, crawluntil: datetime) -> datetime:
+        """
+        # Where listing can stop: at the high-water mark if the previous runs already cover everything
+        # between crawluntil and it, else at crawluntil.
+        """
+        window = self.covered_window()
+        if window is None:
+            return crawluntil
+        covered_from, covered_to = window
+        if covered_from <= crawluntil <= covered_to:
+            logger.info(f'incremental crawl: listing stops at high-water mark {covered_to}')
+            return covered_to
+        return crawluntil
+
+    def update_high_water_mark(self, crawluntil: datetime, newest: datetime):
+        # Called only after the listing reached crawluntil, so [crawluntil, newest] is fully crawled
+        window = self.covered_window()
+        covered_from, covered_to = crawluntil, newest
+        if window is not None and window[1] >= crawluntil:
+            # contiguous with what earlier runs covered
+            covered_from, covered_to = min(window[0], crawluntil), max(window[1], newest)
+        self.pending_window = (covered_from, covered_to)
@@ -0,0 +1,37 @@
+import pytest
+from selenium.common.exceptions import InvalidSessionIdException, JavascriptException
+from dom_wait import wait_for_dom
+
+
+class ScriptedDriver:
+    """Raises the given errors from execute_async_script, then resolves the wait."""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def execute_async_script(self, script, conditions, any_of, timeout_ms):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {'ok': True, 'met': [True] * len(conditions), 'inaccessible': []}
+
+
+def test_wait_is_reissued_after_a_navigation():
+    driver = ScriptedDriver(JavascriptException('javascript error: document unloaded while waiting for result'),
+                            JavascriptException('unknown error: Cannot find context with specified id'))
+    assert wait_for_dom(driver, [{'css': 'body'}], timeout=5)['ok']
+    assert driver.calls == 3
+
+
+@pytest.mark.parametrize('error', [
+    InvalidSessionIdException('invalid session id'),
+    JavascriptException("javascript error: Failed to execute 'evaluate' on 'Document': The string '//td[' is not a valid XPath expression."),
+])
+def test_other_errors_are_raised_at_once(error):
+    driver = ScriptedDriver(error)
+    with pytest.raises(type(error)):
+        wait_for_dom(driver, [{'xpath': '//td['}], timeout=5)
+    assert driver.calls == 1
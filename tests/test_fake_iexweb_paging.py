@@ -0,0 +1,37 @@
+import pytest
+import requests
+from fake_iexweb import FakeMailbox, FakeIExWebServer
+from sentmail_listing import parse_sentmail_listing_html, parse_next_page_url, learn_page_url_template, page_url_from_template
+
+
+@pytest.fixture
+def logged_in():
+    mailbox = FakeMailbox(95)
+    server = FakeIExWebServer(mailbox, port=0, host='127.0.0.1').serve_in_background()
+    session = requests.Session()
+    base = f"http://127.0.0.1:{server.port}/ieweb"
+    session.post(f"{base}/general/login", data={'userName': 'test', 'password': 'test'})
+    yield mailbox, session, base
+    server.shutdown()
+
+
+def scan(session, url):
+    response = session.get(url)
+    assert 'mailbox/sent' in response.url
+    return parse_sentmail_listing_html(response.text, response.url), parse_next_page_url(response.text, response.url)
+
+
+def test_learned_page_urls_address_the_right_pages(logged_in):
+    # Regression: the first page is the plain .../sent (no query), its Next link is sent?page=2&size=10
+    mailbox, session, base = logged_in
+    first_url = f"{base}/mailbox/sent"
+    first_rows, next_url = scan(session, first_url)
+    size = len(first_rows)
+    template, second_page_value = learn_page_url_template(next_url, first_url)
+    assert '{page}' in template and f"size={size}" in template
+
+    subjects = [subject for _, subject, _, _ in mailbox.listing()]
+    n_pages = (len(subjects) + size - 1) // size
+    for page in (0, 1, 4, n_pages - 1):
+        rows, _ = scan(session, page_url_from_template(template, second_page_value, page))
+        assert [row['subject'] for row in rows] == subjects[page * size:(page + 1) * size]
@@ -0,0 +1,80 @@
+import pytest
+import requests
+from fake_iexweb import FakeMailbox, FakeIExWebServer
+from http_fetch import HttpFetcher, UnexpectedPageError
+
+USER_AGENT = 'Mozilla/5.0 (test) Chrome/126.0'
+
+
+class FakeDriver:
+    """The two WebDriver calls load_driver_session makes, backed by a requests session that logged in."""
+    def __init__(self, session):
+        self.session = session
+
+    def get_cookies(self):
+        return [{'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain, 'path': cookie.path}
+                for cookie in self.session.cookies]
+
+    def execute_script(self, script):
+        assert 'navigator.userAgent' in script
+        return USER_AGENT
+
+
+@pytest.fixture
+def site():
+    mailbox = FakeMailbox(30, ship_notice_ratio=1.0, resent_ratio=0.0)
+    server = FakeIExWebServer(mailbox, port=0, host='127.0.0.1').serve_in_background()
+    yield mailbox, server, f"http://127.0.0.1:{server.port}/ieweb"
+    server.shutdown()
+
+
+@pytest.fixture
+def fetcher(site):
+    # An HttpFetcher carrying the cookies of a browser that logged in
+    _, _, base = site
+    browser = requests.Session()
+    browser.post(f"{base}/general/login", data={'userName': 'test', 'password': 'test'})
+    fetcher = HttpFetcher(max_workers=4, timeout=5)
+    fetcher.load_driver_session(FakeDriver(browser))
+    return fetcher
+
+
+def item_url(base, mail_id):
+    return f"{base}/mailbox/item?id={mail_id}"
+
+
+def test_driver_cookies_and_user_agent_authenticate_the_session(site, fetcher):
+    mailbox, _, base = site
+    assert fetcher.session.headers['User-Agent'] == USER_AGENT
+    rows, next_url = fetcher.scan_listing(f"{base}/mailbox/sent")
+    assert [row['subject'] for row in rows] == [subject for _, subject, _, _ in mailbox.mails[:len(rows)]]
+    assert next_url.endswith('sent?page=2&size=10')
+
+
+def test_fetch_item_follows_the_content_frame(site, fetcher):
+    mailbox, _, base = site
+    mail_id, _, _, asn = mailbox.mails[0]
+    rows = fetcher.fetch_item(item_url(base, mail_id), set())
+    assert [row.ship_notice_num for row in rows] == [asn] * len(mailbox.items_of(mail_id))
+    assert [row.buyer_part_num for row in rows] == [item['Buyer Part #'] for item in mailbox.items_of(mail_id)]
+
+
+def test_without_the_browser_cookies_the_login_redirect_is_an_unexpected_page(site):
+    _, _, base = site
+    with pytest.raises(UnexpectedPageError):
+        HttpFetcher(timeout=5).get(f"{base}/mailbox/sent")
+
+
+def test_expired_session_falls_back_to_the_browser(site, fetcher):
+    mailbox, server, base = site
+    server.sessions.clear()  # the site logged the session out, requests are redirected to the login page
+    assert fetcher.fetch_items([item_url(base, mail[0]) for mail in mailbox.mails[:3]], set()) == [None, None, None]
+
+
+def test_client_error_falls_back_for_that_item_only(site, fetcher):
+    mailbox, _, base = site
+    first, second = mailbox.mails[0][0], mailbox.mails[1][0]
+    results = fetcher.fetch_items([item_url(base, first), item_url(base, 1), item_url(base, second)], set())  # id 1 is a 404
+    assert results[1] is None
+    assert [row.ship_notice_num for row in results[0]] == [mailbox.mails[0][3]] * len(results[0])
+    assert [row.ship_notice_num for row in results[2]] == [mailbox.mails[1][3]] * len(results[2])
@@ -0,0 +1,45 @@
+import time
+import pytest
+from browser_profile import chrome_options
+from driver_backend import LocalChromeBackend
+from fake_iexweb import FakeMailbox, FakeIExWebServer
+from row_sink import CsvRowSink
+from selenium_helper import SeleniumHelper
+
+
+@pytest.fixture(scope='module')
+def selhelp():
+    # Needs Chrome and chromedriver on this machine (Selenium Manager, or env IEXWEB_CHROMEDRIVER / IEXWEB_CHROME_BINARY)
+    backend = LocalChromeBackend()
+    try:
+        driver = backend.new_driver(chrome_options())
+    except Exception as e:
+        pytest.skip(f"no local Chrome: {e!r}")
+    helper = SeleniumHelper(script_start_time=time.time(), backend=backend)
+    helper.driver = driver
+    yield helper
+    driver.quit()
+
+
+def test_inplace_search_is_not_kept_and_click_through_opens_the_listed_notice(selhelp, tmp_path):
+    # The search box filters in place (same URL) and the view buttons carry no item URL: a kept filter would be lost
+    # on the click-through reload of the listing, and the filtered row index would open another mail
+    mailbox = FakeMailbox(30, seed=3)
+    server = FakeIExWebServer(mailbox, port=0, host='127.0.0.1', inplace_search=True, script_view=True).serve_in_background()
+    try:
+        selhelp.login_iExWeb(f"http://127.0.0.1:{server.port}/ieweb/general/login", 'test', 'test')
+        selhelp.navigate_sentmail()
+        assert selhelp.use_listing_controls() == {'page_size': 100, 'server_filter': False}
+        sink = CsvRowSink(str(tmp_path / 'rows.csv'))
+        assert selhelp.crawl_shipnotices_until(crawluntil_time=mailbox.oldest, sink=sink) is not None
+        sink.close()
+    finally:
+        server.shutdown()
+
+    expected, seen = [], set()
+    for mail_id, _, _, asn in mailbox.mails:
+        if asn and asn not in seen:  # the newest notice of a resent ASN is kept
+            seen.add(asn)
+            expected += [(asn, item['Buyer Part #']) for item in mailbox.items_of(mail_id)]
+    crawled = sink.to_dataframe()
+    assert list(zip(crawled['ship_notice_num'], crawled['buyer_part_num'])) == expected
@@ -0,0 +1,25 @@
+from metrics import Histogram, HISTOGRAM_BUCKETS
+
+
+def test_histogram_memory_is_bounded_and_totals_exact():
+    histogram = Histogram(reservoir_size=100)
+    samples = [i / 1000 for i in range(10000)]  # 0 .. 9.999s
+    for seconds in samples:
+        histogram.observe(seconds)
+    summary = histogram.summary()
+    assert len(histogram.reservoir) == 100
+    assert summary['count'] == 10000
+    assert summary['total'] == round(sum(samples), 4)
+    assert (summary['min'], summary['max']) == (0.0, 9.999)
+    assert sum(summary['buckets'].values()) == 10000
+    assert summary['buckets'][f"le_{HISTOGRAM_BUCKETS[0]}"] == 51  # 0 .. 0.05s
+    assert 3 < summary['p50'] < 7  # estimated from the reservoir
+
+
+def test_small_histogram_keeps_every_sample():
+    histogram = Histogram()
+    for seconds in (0.3, 0.1, 0.2):
+        histogram.observe(seconds)
+    summary = histogram.summary()
+    assert (summary['p50'], summary['max'], summary['mean']) == (0.2, 0.3, 0.2)
+    assert Histogram().summary() == {'count': 0}
@@ -0,0 +1,25 @@
+import pandas as pd
+from normalize import normalize_shipnotices
+from shipnotice_parser import SHIPNOTICE_COLUMNS
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=list(SHIPNOTICE_COLUMNS))
+
+
+def test_identical_line_items_of_one_notice_are_kept():
+    item = ('Store 1', 'ASN1', '6/28/24 11:34 AM', 'O-1', 'BP-1', '5')
+    clean, rejects = normalize_shipnotices(frame([item, item]))
+    assert len(clean) == 2
+    assert len(rejects) == 0
+
+
+def test_older_notice_of_a_resent_asn_is_dropped():
+    clean, _ = normalize_shipnotices(frame([
+        ('Store 1', 'ASN1', '6/29/24 9:00 AM', 'O-1', 'BP-1', '7'),
+        ('Store 1', 'ASN1', '6/29/24 9:00 AM', 'O-1', 'BP-2', '1,200'),
+        ('Store 1', 'ASN1', '6/28/24 11:34 AM', 'O-1', 'BP-1', '5'),
+        ('Store 2', 'ASN2', '6/28/24 10:00 AM', 'O-2', 'BP-3', '3'),
+    ]))
+    assert list(clean['ship_notice_num']) == ['ASN1', 'ASN1', 'ASN2']
+    assert list(clean['ship_quantity']) == [7, 1200, 3]
@@ -0,0 +1,37 @@
+import time
+import requests
+from checkpoint import CrawlCheckpoint
+from fake_iexweb import FakeMailbox, FakeIExWebServer
+from http_fetch import HttpFetcher
+from row_sink import CsvRowSink
+from selenium_helper import SeleniumHelper
+
+
+class ListingDriver:
+    """The browser sits on the first sent mail page, every page and item is fetched over http."""
+    current_window_handle = 'listing'
+
+    def __init__(self, url):
+        self.current_url = url
+
+
+def test_resumed_crawl_starts_at_the_last_saved_page(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mailbox = FakeMailbox(95, ship_notice_ratio=1.0, resent_ratio=0.0)
+    server = FakeIExWebServer(mailbox, port=0, host='127.0.0.1').serve_in_background()
+    try:
+        base = f"http://127.0.0.1:{server.port}/ieweb"
+        fetcher = HttpFetcher(timeout=5)
+        fetcher.session.post(f"{base}/general/login", data={'userName': 'test', 'password': 'test'})
+        checkpoint = CrawlCheckpoint('test', mailbox.oldest)
+        checkpoint.last_page = 4  # the interrupted run saved pages 1..5
+        selhelp = SeleniumHelper(script_start_time=time.time())
+        selhelp.driver = ListingDriver(f"{base}/mailbox/sent")
+        sink = CsvRowSink(str(tmp_path / 'rows.csv'))
+        selhelp.crawl_shipnotices_until(crawluntil_time=mailbox.oldest, sink=sink, maxpages=2, fetcher=fetcher, checkpoint=checkpoint)
+        sink.close()
+    finally:
+        server.shutdown()
+    expected = [asn for mail_id, _, _, asn in mailbox.mails[40:60] for _ in mailbox.items_of(mail_id)]  # pages 5 and 6
+    assert list(sink.to_dataframe()['ship_notice_num']) == expected
+    assert checkpoint.last_page == 5
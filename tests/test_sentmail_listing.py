@@ -0,0 +1,56 @@
+from datetime import datetime
+from fake_iexweb import FakeMailbox, sent_page
+from sentmail_listing import learn_page_url_template, page_url_from_template, parse_sentmail_listing_html, select_shipnotice_rows
+
+BASE = "https://www.iexchangeweb.com/ieweb/mailbox"
+
+
+def test_page_param_found_when_first_url_has_no_query():
+    # navigate_sentmail lands on a plain .../sent, every parameter of the Next link is "new"
+    learned = learn_page_url_template(f"{BASE}/sent?page=2&size=10", f"{BASE}/sent")
+    assert learned == (f"{BASE}/sent?page={{page}}&size=10", 2)
+    assert page_url_from_template(*learned, 0) == f"{BASE}/sent?page=1&size=10"
+    assert page_url_from_template(*learned, 4) == f"{BASE}/sent?page=5&size=10"
+
+
+def test_offset_param_with_trailing_numeric_param():
+    learned = learn_page_url_template(f"{BASE}/sent?offset=25&limit=25&folder=3", f"{BASE}/sent")
+    assert learned == (f"{BASE}/sent?offset={{page}}&limit=25&folder=3", 25)
+    assert page_url_from_template(*learned, 2) == f"{BASE}/sent?offset=50&limit=25&folder=3"
+
+
+def test_unknown_param_name_uses_the_one_that_changed():
+    learned = learn_page_url_template(f"{BASE}/sent?size=10&idx=2", f"{BASE}/sent?size=10&idx=1")
+    assert learned == (f"{BASE}/sent?size=10&idx={{page}}", 2)
+
+
+def test_ambiguous_params_are_not_guessed():
+    assert learn_page_url_template(f"{BASE}/sent?a=2&b=10", f"{BASE}/sent") is None
+
+
+def test_page_param_is_not_matched_inside_another_name():
+    learned = learn_page_url_template(f"{BASE}/sent?pagesize=2&page=2", f"{BASE}/sent")
+    assert learned == (f"{BASE}/sent?pagesize=2&page={{page}}", 2)
+
+
+def test_path_segment_and_missing_link():
+    assert learn_page_url_template(f"{BASE}/sent/2", f"{BASE}/sent") == (f"{BASE}/sent/{{page}}", 2)
+    assert learn_page_url_template(None, f"{BASE}/sent") is None
+
+
+def test_empty_mailbox_lists_no_rows():
+    # the placeholder row of an empty table is an empty page, not a missing one (None would send the listing to the browser)
+    assert parse_sentmail_listing_html(sent_page(FakeMailbox(0), 1, 10, ''), f"{BASE}/sent") == []
+
+
+def test_table_without_rows_is_not_an_empty_mailbox():
+    # a table body its script has not filled yet must not end the listing
+    html = sent_page(FakeMailbox(0), 1, 10, '').replace(
+        '<tr class="odd"><td valign="top" colspan="14" class="dataTables_empty">No data available in table</td></tr>', '')
+    assert parse_sentmail_listing_html(html, f"{BASE}/sent") is None
+
+
+def test_row_without_subject_is_not_a_ship_notice():
+    rows = [{'index': 0, 'subject': None, 'creation_date': '6/28/24 11:34 AM'},
+            {'index': 1, 'subject': 'Accepted -Ship Notice ASN1', 'creation_date': '6/28/24 10:00 AM'}]
+    assert [row['index'] for row in select_shipnotice_rows(rows, datetime(2024, 6, 1))] == [1]
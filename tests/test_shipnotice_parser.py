@@ -0,0 +1,127 @@
+import os
+import re
+import json
+import pytest
+from shipnotice_parser import SHIPNOTICE_COLUMNS, parse_shipnotice_html
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+# Saved contentFrame documents, each with the rows the Selenium crawl extracted from it in <name>.rows.json
+NOTICES = ('notice_po_items', 'notice_mixed_items')
+
+CAPTION = "descendant::*[contains(concat(' ', normalize-space(@class), ' '), ' caption ')]"  # By.CLASS_NAME, "caption"
+BLOCK_TAGS = {'div', 'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'tbody', 'thead', 'tfoot', 'tr', 'ul', 'ol', 'li', 'form'}
+
+
+def read_fixture(name, ext):
+    with open(os.path.join(FIXTURES, name + ext), encoding='utf-8') as f:
+        return f.read()
+
+
+def expected_rows(name):
+    return json.loads(read_fixture(name, '.rows.json'))
+
+
+def selenium_text(element):
+    # WebElement.text: whitespace runs collapsed, <br> and block boundaries are line breaks, lines trimmed
+    lines = ['']
+    def walk(node):
+        if node.tag in ('script', 'style', 'head'):
+            return
+        if node.tag == 'br':
+            lines.append('')
+        else:
+            if node.tag in BLOCK_TAGS and lines[-1].strip():
+                lines.append('')
+            lines[-1] += re.sub(r'[ \t\n\r\f\v]+', ' ', node.text or '')
+            for child in node:
+                walk(child)
+                lines[-1] += re.sub(r'[ \t\n\r\f\v]+', ' ', child.tail or '')
+            if node.tag in BLOCK_TAGS and lines[-1].strip():
+                lines.append('')
+            elif node.tag in ('td', 'th'):
+                lines[-1] += ' '
+    walk(element)
+    lines = [line.strip(' \t\n\r\f\v') for line in lines]
+    return '\n'.join(line for line in lines if line).replace('\xa0', ' ')
+
+
+def browser_dom(html):
+    # lxml keeps <tr> directly under <table>, the browser (and page_source) inserts the implicit <tbody>
+    lxml_html = pytest.importorskip('lxml.html')
+    document = lxml_html.document_fromstring(html)
+    for table in document.iter('table'):
+        trs = [child for child in table if child.tag == 'tr']
+        if trs:
+            tbody = lxml_html.Element('tbody')
+            table.insert(table.index(trs[0]), tbody)
+            tbody.extend(trs)
+    return document
+
+
+def first(element, xpath):
+    found = element.xpath(xpath)
+    assert found, f"{xpath} not found"  # WebDriverWait would time out
+    return found[0]
+
+
+def crawl_tables_reference(html, crawled_ASN):
+    # crawl_tables_to_df of the Selenium crawl, lookup for lookup, on the browser DOM of the saved document
+    tables = first(browser_dom(html), '/html/body').xpath('./table')
+    rows = []
+    sharedAttr_dict = dict()
+    for j, table in enumerate(tables):
+        if j == 0:
+            selenium_text(first(table, './tbody/tr[1]/td/h1'))
+            continue
+        upperleftmost_element = first(table, './tbody/tr/td[1]/table/tbody/tr[1]')
+        upperleftmost_caption_element = first(upperleftmost_element, CAPTION)
+        upperlefmost_caption = selenium_text(upperleftmost_caption_element).strip()
+        if upperlefmost_caption == "Ship To":
+            sharedAttr_dict['ship_to'] = selenium_text(first(upperleftmost_caption_element, "following-sibling::td[@class='data']"))
+        elif upperlefmost_caption == "Ship Notice #":
+            for count, caption_element in enumerate(table.xpath(CAPTION)):
+                if selenium_text(caption_element).strip() == 'Ship Notice #':
+                    ASN = selenium_text(first(caption_element, "following-sibling::td[@class='data']"))
+                    if ASN in crawled_ASN:
+                        return rows
+                    sharedAttr_dict['ship_notice_num'] = ASN
+                elif selenium_text(caption_element).strip() == 'Create Date/Time':
+                    sharedAttr_dict['create_datetime'] = selenium_text(first(caption_element, "following-sibling::td[@class='data']"))
+                elif count >= 2: break
+        elif "Order #" in upperlefmost_caption or "PO #" in upperlefmost_caption:
+            itemAttr_dict = {}
+            wanted_keywords = {"Order #", "PO #", "Buyer Part #", "Ship Quantity"}
+            wanted_caption_elements = []
+            for caption_element in table.xpath(CAPTION):
+                if len(wanted_caption_elements) > 3: break
+                if any(keyword in selenium_text(caption_element) for keyword in wanted_keywords):
+                    wanted_caption_elements.append(caption_element)
+            for caption_element in wanted_caption_elements:
+                caption = selenium_text(caption_element)
+                data = selenium_text(first(caption_element, "following-sibling::td[@class='data']"))
+                if "Order #" in caption or "PO #" in caption:
+                    itemAttr_dict['order_num'] = data if 'Order #' in caption else data[:6]
+                elif 'Buyer Part #' in caption:
+                    itemAttr_dict['buyer_part_num'] = data
+                elif 'Ship Quantity' in caption:
+                    itemAttr_dict['ship_quantity'] = data
+            rows.append({**sharedAttr_dict, **itemAttr_dict})
+    # pd.concat of the rows: every column present, missing values empty
+    return [{column: row.get(column) for column in SHIPNOTICE_COLUMNS} for row in rows]
+
+
+@pytest.mark.parametrize('name', NOTICES)
+def test_parser_rows_match_the_selenium_crawl(name):
+    rows = parse_shipnotice_html(read_fixture(name, '.html'), set())
+    assert [row.as_dict() for row in rows] == expected_rows(name)
+
+
+@pytest.mark.parametrize('name', NOTICES)
+def test_expected_rows_follow_the_selenium_lookups(name):
+    assert crawl_tables_reference(read_fixture(name, '.html'), set()) == expected_rows(name)
+
+
+def test_already_crawled_asn_yields_no_rows():
+    html = read_fixture('notice_po_items', '.html')
+    assert parse_shipnotice_html(html, {'ASN123'}) == []
+    assert crawl_tables_reference(html, {'ASN123'}) == []
@@ -0,0 +1,19 @@
+import pytest
+import startup
+from driver_backend import DockerBackend
+
+
+@pytest.mark.parametrize('backend, attaches', [
+    (DockerBackend(), True),
+    (DockerBackend('selenium-chrome-batch-0', 4544, 8000), False),  # batch_main.job_backend
+])
+def test_only_the_default_container_attaches_to_the_daemon(monkeypatch, backend, attaches):
+    calls = []
+    monkeypatch.setattr(startup, 'get_daemon_session', lambda: calls.append(1))  # no daemon running
+    boot = startup.BackgroundStartup(backend=backend)
+    def setup_selenium_env():
+        raise RuntimeError('no docker in tests')
+    monkeypatch.setattr(boot.selhelp, 'setup_selenium_env', setup_selenium_env)
+    boot.start().thread.join()
+    assert bool(calls) == attaches
+    assert boot.error is not None
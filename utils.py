@@ -1,4 +1,5 @@
-import os, logging, argparse
+import os, json, uuid, queue, atexit, logging, argparse
+import multiprocessing.util
 import logging.handlers as handlers
 from datetime import datetime, timedelta
 import pandas as pd
@@ -13,9 +14,9 @@ def parse_creation_date(datetime_str: str, date_format: str="%m/%d/%Y %I:%M %p")
     creation_date = datetime.strptime(new_datetime_str, date_format)
     return creation_date
 
-def make_shipfolder():    
-    # Create shipnotices folder to save the crawled data
-    shipnotice_foldername = 'shipnotices'
+def make_shipfolder(subfolder=None):    
+    # Create shipnotices folder to save the crawled data (shipnotices/<subfolder> for e.g. one batch job)
+    shipnotice_foldername = os.path.join('shipnotices', subfolder) if subfolder else 'shipnotices'
     shipnotice_folderpath = os.path.join(os.getcwd(), shipnotice_foldername)
     if not os.path.exists(shipnotice_folderpath):
         # If it doesn't exist, create the folder
@@ -23,11 +24,11 @@ def make_shipfolder():
         print(f'Created folder: ./{shipnotice_foldername}')
     return shipnotice_folderpath
 
-def name_shipfile(crawluntil_time:datetime):
+def name_shipfile(crawluntil_time:datetime, extension:str='csv'):
     current_time = datetime.now()    
     formatted_current_time = current_time.strftime("%Y%m%d-%H%M%S") # Format it into the desired string: YYYYMMDD-HHMMSS
     formatted_crawluntil_time = crawluntil_time.strftime("%Y%m%d")
-    shipnotice_filename = f'ship-notices-{formatted_current_time}-{formatted_crawluntil_time}.csv'
+    shipnotice_filename = f'ship-notices-{formatted_current_time}-{formatted_crawluntil_time}.{extension}'
     return shipnotice_filename
 
 def format_elapsed_seconds(elapsed_seconds):
@@ -45,7 +46,51 @@ def format_elapsed_seconds(elapsed_seconds):
         timetime = formatted_time[0].split(':')
         return f'0-days, {timetime[0]}-hrs, {timetime[1]}-mins, {round(float(timetime[2]), 2)}-secs'
 
+RUN_ID = uuid.uuid4().hex[:12]  # one per process, ties together the log records of a run
+_log_context = {'run_id': RUN_ID, 'account': None}
+_log_listener = None  # QueueListener owning the file handler, started by the first setup_logger()
+_log_queue_handler = None
+
+
+class LogContextFilter(logging.Filter):
+    # Stamp every record with the run and account ids (read by JsonLogFormatter)
+    def filter(self, record):
+        record.run_id = _log_context['run_id']
+        record.account = _log_context['account']
+        return True
+
+
+class JsonLogFormatter(logging.Formatter):
+    # One JSON object per line: time, level, message, where it was logged and the run/account ids
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'module': record.module,
+            'function': record.funcName,
+            'thread': record.threadName,
+            'run_id': getattr(record, 'run_id', None),
+            'account': getattr(record, 'account', None),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def make_log_formatter(log_format='text') -> logging.Formatter:
+    if log_format == 'json':
+        return JsonLogFormatter()
+    return logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+
 def setup_logger():
+    """
+    # The app logger. Records only go through a queue on the calling thread: the rotating file handler
+    # runs in a QueueListener thread, so a crawl never waits on log file writes or rotation.
+    # The format is text or json (env IEXWEB_LOG_FORMAT, or configure_logging()).
+    """
+    global _log_listener, _log_queue_handler
     logfolder = 'logs'
     logfilename = 'app.log'
     logfolder_path = os.path.join(os.getcwd(), logfolder)
@@ -59,20 +104,93 @@ def setup_logger():
     # Set up the logger
     logger = logging.getLogger(__name__)  # Use the module's name as logger name
     if not logger.hasHandlers():  # Prevent duplicate handlers when logging is called multiple times
-        handler = handlers.RotatingFileHandler(logfile_path, maxBytes=5 * 1024 * 1024, backupCount=3)  # 5 MB per file, 3 backups
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        if multiprocessing.current_process().name == 'MainProcess':
+            handler = handlers.RotatingFileHandler(logfile_path, maxBytes=5 * 1024 * 1024, backupCount=3)  # 5 MB per file, 3 backups
+        else:
+            handler = _worker_log_handler(logfile_path)  # spawned worker process
+        handler.setFormatter(make_log_formatter(os.environ.get('IEXWEB_LOG_FORMAT', 'text')))
+        log_queue = queue.SimpleQueue()
+        _log_queue_handler = handlers.QueueHandler(log_queue)
+        _log_queue_handler.addFilter(LogContextFilter())
+        logger.addHandler(_log_queue_handler)
         logger.setLevel(logging.DEBUG)
+        _log_listener = handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _log_listener.start()
+        atexit.register(stop_logging)  # write out the queued records before the process exits
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_log_listener)
+        setup_hot_logger().setLevel(os.environ.get('IEXWEB_HOT_LOG_LEVEL', 'INFO').upper())
 
     return logger
 
+def setup_hot_logger():
+    # Child of the app logger for per-notice and per-page messages, with its own level
+    # (env IEXWEB_HOT_LOG_LEVEL, e.g. WARNING to drop them during long crawls). Log with %-style
+    # arguments so the messages below that level are never formatted.
+    return logging.getLogger(f"{__name__}.hot")
+
+def configure_logging(log_format=None, hot_level=None, account=None):
+    # Apply the --log-format / --hot-log-level options and the account of this run once they are known
+    if log_format is not None and _log_listener is not None:
+        for handler in _log_listener.handlers:
+            handler.setFormatter(make_log_formatter(log_format))
+    if hot_level is not None:
+        setup_hot_logger().setLevel(hot_level.upper())
+    if account is not None:
+        _log_context['account'] = account
+
+def _worker_log_handler(logfile_path):
+    # Worker processes append to the log file but never rotate it: only the main process renames app.log,
+    # a worker reopens the file once it was rotated away.
+    return handlers.WatchedFileHandler(logfile_path)
+
+def _restart_log_listener():
+    # A forked process (batch jobs, parse workers) inherits the queue but not the listener thread,
+    # and gets its own non-rotating handler on the same file
+    global _log_listener
+    if _log_listener is not None:
+        log_queue = queue.SimpleQueue()
+        _log_queue_handler.queue = log_queue
+        inherited = _log_listener.handlers[0]
+        handler = _worker_log_handler(inherited.baseFilename)
+        handler.setFormatter(inherited.formatter)
+        handler.setLevel(inherited.level)
+        _log_listener = handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _log_listener.start()
+        # multiprocessing workers exit without running atexit handlers
+        multiprocessing.util.Finalize(None, stop_logging, exitpriority=0)
+
+def stop_logging():
+    # Stop the listener thread after it has written every queued record
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
 def read_cli_arguments():
     # Create the argument parser
     arg_parser = argparse.ArgumentParser(description="Selenium crawler script")
 
     # Add the environment argument
     arg_parser.add_argument("--env", default="prod", choices=["prod", "dev", "test"], help="Environment to run in")
+    arg_parser.add_argument("--workers", type=int, default=int(os.environ.get("IEXWEB_WORKERS", 1)), help="Number of WebDriver sessions scraping item pages in parallel")
+    arg_parser.add_argument("--backend", default=os.environ.get("IEXWEB_BACKEND"), choices=["docker", "local", "grid"], help="Where Chrome runs: the Selenium Docker container (default), a local headless Chrome with chromedriver, or the --grid-url hub")
+    arg_parser.add_argument("--grid-url", default=os.environ.get("IEXWEB_GRID_URL"), help="Selenium Grid hub URL to run the sessions on, instead of local Docker containers")
+    arg_parser.add_argument("--http-fetch", action="store_true", default=os.environ.get("IEXWEB_HTTP_FETCH") == "1", help="After login, fetch sent mail and ship notice pages over http with the browser's cookies")
+    arg_parser.add_argument("--http-workers", type=int, default=int(os.environ.get("IEXWEB_HTTP_WORKERS", 8)), help="Maximum concurrent http requests in --http-fetch mode")
+    arg_parser.add_argument("--lean-browser", action="store_true", default=os.environ.get("IEXWEB_LEAN_BROWSER") == "1", help="Headless Chrome with eager page loads, no images, fonts or stylesheets and no background services")
+    arg_parser.add_argument("--parse-workers", type=int, default=int(os.environ.get("IEXWEB_PARSE_WORKERS", 0)), help="Parse item pages in N worker processes while the browser loads the next one (0 parses inline)")
+    arg_parser.add_argument("--no-session-cache", action="store_true", help="Always log in with the form, don't read or write the encrypted session cache")
+    arg_parser.add_argument("--full-crawl", action="store_true", help="Ignore the incremental crawl state and re-scrape every notice back to the crawl date")
+    arg_parser.add_argument("--max-pages", type=int, default=int(os.environ.get("IEXWEB_MAX_PAGES", 0)), help="Stop after N sent mail pages (0: crawl until the crawl date or the last page)")
+    arg_parser.add_argument("--no-listing-controls", action="store_true", help="Don't use the site's search and rows-per-page controls, filter the sent mail rows client-side")
+    arg_parser.add_argument("--crawl-to", default=os.environ.get("IEXWEB_CRAWL_TO"), help="YYYY-MM-DD, end of a date window: crawl only mail from the crawl date up to this day, jumping straight to its pages")
+    arg_parser.add_argument("--format", dest="output_format", default=os.environ.get("IEXWEB_OUTPUT_FORMAT", "csv"), choices=["csv", "parquet"], help="Output format: one csv file, or a folder of typed Parquet files partitioned by creation date")
+    arg_parser.add_argument("--normalize", action="store_true", default=os.environ.get("IEXWEB_NORMALIZE") == "1", help="After the crawl, also write a cleaned, typed, deduplicated copy of the output and a report of rejected rows")
+    arg_parser.add_argument("--archive", action="store_true", default=os.environ.get("IEXWEB_ARCHIVE") == "1", help="Keep every fetched item document in ./archive (compressed, de-duplicated) so reparse.py can rebuild the output without crawling")
+    arg_parser.add_argument("--log-format", default=os.environ.get("IEXWEB_LOG_FORMAT", "text"), choices=["text", "json"], help="logs/app.log records as text lines or as JSON objects with the run and account ids")
+    arg_parser.add_argument("--hot-log-level", default=os.environ.get("IEXWEB_HOT_LOG_LEVEL", "INFO"), choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper, help="Level of the per-notice and per-page log messages, WARNING drops them")
+    arg_parser.add_argument("--resume", action="store_true", help="Continue the interrupted crawl of the same account and crawl date instead of starting over")
     args, _ = arg_parser.parse_known_args()
 
     return args